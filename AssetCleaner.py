@@ -16,32 +16,43 @@ Saves package size and sanity.
 Requires the "Python Editor Scripting" plugin to be enabled in UE4.
 To run:
 
-0. Right click your mod's folder, click "Audit Assets", click "View Options" -> "Export to CSV" (save as "Report.csv" in your Downloads folder)
 1. Open the "Output Log"
 2. Switch to "Python" mode
 3. Enter the full path to this script and hit the Enter key
-4. Select your mod from the list of mods
-5. Highlight all assets you'd like to remove
-6. Press "Remove Selected Assets" and be prepared to wait a looooong time (depending on the total # assets to remove)
+4. Select your mod from the list of mods (unused assets are found by walking dependencies from its maps and scenarios)
+5. Highlight all assets you'd like to remove (filter them by typing words, all of which must match, or globs like Textures/*_N)
+6. Press "Remove Selected Assets" -- assets are removed in batches, and if the removal is interrupted
+   you'll be asked to resume it the next time you open AssetCleaner for the same mod
 
 ##########################################
 """
 
 from Tkinter import *
-import tkFileDialog as fd
+import tkFont
+import ttk
 import tkMessageBox as messagebox
 import ntpath
-import posixpath
-import csv
 import unreal
-import atexit
 import json
 import os
+import sys
+import time
 import traceback
-import atexit
+from collections import deque
 from glob import glob
 from copy import copy
 
+# Make the helper modules next to this script importable
+# when it's run from the editor's Python console
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import duplicate_finder
+from asset_graph import AssetGraph, EDGE_HARD, EDGE_MANAGEMENT, EDGE_SOFT, PACKAGE_MOD, PACKAGE_ROOT, PACKAGE_USED
+from package_sizes import format_size, get_package_sizes
+from path_rules import PathRules
+import tk_host
+from trigram_index import TrigramIndex, is_glob
+
 string = unreal.StringLibrary.conv_name_to_string
 asset_lib = unreal.EditorAssetLibrary()
 asset_tools = unreal.AssetToolsHelpers.get_asset_tools()
@@ -52,8 +63,23 @@ editor_subsystem = unreal.AssetEditorSubsystem()
 # Massive help from @mechamogera from Ricoh:
 # https://qiita-com.translate.goog/mechamogera/items/87e2d52d9bf800c04c34
 
+# Bump when the format of Saved/AssetCleaner/<mod name>.json changes
+DEPENDENCY_CACHE_VERSION = 2
+
+# How many assets we delete with a single call
+REMOVE_CHUNK_SIZE = 100
+
+# How long to wait after the last keystroke before filtering the asset list
+FILTER_DEBOUNCE_MS = 150
+
+# How many children the dependency browser shows before a "... more" node
+DEPENDENCY_PAGE_SIZE = 200
 
-DEFAULT_REPORT_NAME = "Report.csv"
+# How long the UI may spend scanning dependencies each editor frame,
+# and how often it lists the partial results of the scan
+# (the shared Tk host may give us less while other tools are busy)
+SCAN_BUDGET_SECONDS = 0.008
+SCAN_REFRESH_SECONDS = 0.5
 
 
 # Credit <3: https://its401.com/article/weixin_39874202/106600558
@@ -74,241 +100,660 @@ def slate_deco(func):
 
 class Assets:
 
-    # Exclude assets in these paths
-    exclusions = [
+    # Exclude assets in these paths (see path_rules.py for the syntax)
+    exclusions = (
         "/engine/",
         "/script/",
         "/game/",
         "/content/",
         "/niagara/"
-    ]
+    )
 
     # Specifically include files in these
     # paths (overturns exclusions)
-    inclusions = [
-        "/content/brushify"
+    inclusions = (
+        "/content/brushify",
+    )
+
+    # Packages in these (mod relative) paths are always used, along
+    # with everything they depend on (as are the mod's maps, wherever
+    # they are, and anything referencing them -- see get_root_packages)
+    root_paths = [
+        "Maps/",
+        "Scenarios/"
     ]
 
-    def __init__(self, mod_path=None, max_depth=10, skip_exclusions=True, skip_internal_assets=True, exclusions=None, inclusions=None):
+    def __init__(self, mod_path=None, skip_exclusions=True, exclusions=None, inclusions=None,
+                 always_cook_paths=None):
+        # Our own copies of the rules, so instances don't share extra rules
+        self.exclusions = tuple(Assets.exclusions) + tuple(e.lower() for e in exclusions or [])
+        self.inclusions = tuple(Assets.inclusions) + tuple(i.lower() for i in inclusions or [])
+        # Extra (mod relative) paths which are always cooked, and therefore used
+        self.always_cook_paths = list(always_cook_paths) if always_cook_paths else list()
         if mod_path:
             self.set_mod_path(mod_path)
         else:
             self.mod_path = None
             self.maps_dir = None
-        self.max_depth = max_depth
+            self.persistent_dependencies = None
+            self.path_rules = PathRules(self.exclusions, self.inclusions)
+            self.root_rules = PathRules()
+        self.root_packages = set()
         self.skip_exclusions = skip_exclusions
-        self.skip_internal_assets = skip_internal_assets
-        if exclusions:
-            self.exclusions += [e.lower() for e in exclusions]
-        if inclusions:
-            self.inclusions += [i.lower() for i in inclusions]
-        self.dependencies = dict()
+        self.graph = None
+        self.used = set()
+        self.unused = set()
+        # DuplicateGroups (of package names) from find_duplicates, and
+        # duplicated package -> the copy references are consolidated onto (and
+        # the kind of group, identical or similar, it was found in)
+        self.duplicate_groups = list()
+        self.duplicate_keepers = dict()
+        self.duplicate_kinds = dict()
+        # Package name -> bytes on disk (all of its files), and unused
+        # package name -> bytes freed by removing it (see update_package_sizes)
+        self.package_sizes = dict()
+        self.reclaimable_sizes = dict()
+        self.clear_dependency_cache()
 
     def set_mod_path(self, mod_path):
         self.mod_path = str("/" + mod_path + "/").replace("//", "/")
         self.maps_dir = "{}/Maps/".format(mod_path).replace("//", "/")
+        # Load this mod's dependency cache file the next time we need it
+        self.persistent_dependencies = None
+        # Compile our rules once for this mod
+        self.path_rules = PathRules(self.exclusions, self.inclusions, internal=[self.mod_path])
+        self.root_rules = PathRules(inclusions=[self.mod_path + p.lstrip("/") for p in self.root_paths + self.always_cook_paths])
+
+    def get_mod_packages(self):
+        """ Return the (sorted) package names of every asset in our mod """
+        assets = asset_registry.get_assets_by_path(
+            self.mod_path.rstrip("/"),
+            recursive=True,
+            include_only_on_disk_assets=False)
+        return sorted(set(string(asset.get_editor_property("package_name")) for asset in assets or []))
 
-    def find_assets(self):
-
-        # Discover default Downloads dir where report should be stored
-        documents_dir = unreal.SystemLibrary.get_platform_user_dir()
-        downloads_dir = documents_dir.replace("Documents", "Downloads")
-
-        # Ask user to select the file if it doesn't exist as DEFAULT_REPORT_NAME
-        report_file_path = ntpath.join(downloads_dir, DEFAULT_REPORT_NAME)
-        if not ntpath.isfile(report_file_path):
-            report_file_path = fd.askopenfilename(
-                title="Please select your AssetManager report.",
-                initialdir=downloads_dir,
-                filetypes=(
-                    ('AssetManager Report', 'Report.csv'),
-                    ('All files', '*.*')
-                )
-            )
-
-        unused_assets = set()
-        used_assets = set()
-        with open(report_file_path) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                asset_path = posixpath.join(row["Path"], row["Name"])
-                if int(row["TotalUsage"]) > 0:
-                    used_assets.add(asset_path)
-                else:
-                    unused_assets.add(asset_path)
+    def is_root_package(self, package_name):
+        """ Maps, scenarios and always-cooked packages are used no matter what references them """
+        return package_name in self.root_packages or self.root_rules.match(package_name).included_by is not None
 
-        # Store these asset paths (replace any existing paths stored)
-        self.used = used_assets
-        self.unused = unused_assets
+    def get_map_packages(self):
+        """ Return the package names of every map (World asset) in our mod's Maps folder,
+            straight from the asset registry (no levels are loaded)
+        """
+        ar_filter = unreal.ARFilter(
+            package_paths=[self.maps_dir.rstrip("/")],
+            class_names=["World"],
+            recursive_paths=True)
+        return set(string(asset.get_editor_property("package_name")) for asset in asset_registry.get_assets(ar_filter) or [])
+
+    def get_scenario_packages(self, map_packages):
+        """ Return the package names of the packages in our mod (IE: scenarios) referencing these maps """
+        option = unreal.AssetRegistryDependencyOptions()
+        mod_path = self.mod_path.lower()
+        scenario_packages = set()
+        for map_package in map_packages:
+            for referencer in asset_registry.get_referencers(map_package, option) or []:
+                referencer = string(referencer)
+                if referencer.lower().startswith(mod_path) and referencer not in map_packages:
+                    scenario_packages.add(referencer)
+        return scenario_packages
+
+    def get_root_packages(self, mod_packages):
+        """ Return (and remember) the packages which are used no matter what references them:
+            our mod's maps, the scenarios referencing them, and packages in root_paths and always_cook_paths
+        """
+        map_packages = self.get_map_packages()
+        scenario_packages = self.get_scenario_packages(map_packages)
+        self.root_packages = map_packages | scenario_packages
+        self.root_packages.update(p for p in mod_packages if self.root_rules.match(p).included_by is not None)
+        print("[*] Found {} maps, {} scenarios referencing them and {} root packages in all".format(
+            len(map_packages), len(scenario_packages), len(self.root_packages)))
+        return self.root_packages
+
+    def scan_assets(self):
+        """ Mark and sweep, one package at a time: every package in our mod
+            which can't be reached from a root (maps, scenarios, ...) is unused.
+            Yields (packages scanned, total packages), first before scanning anything
+            and then after each package, so callers can spread the scan over as many
+            frames as they like or stop it (close()) at any point.
+            The results are stored in graph, used and unused once it finishes
+        """
+        start_time = time.time()
+        self.clear_dependency_cache()
+
+        mod_packages = self.get_mod_packages()
+        root_packages = self.get_root_packages(mod_packages)
+        # (maps and scenarios are in our mod, but make sure we scan every root)
+        if not root_packages.issubset(mod_packages):
+            mod_packages = sorted(root_packages.union(mod_packages))
+        graph = AssetGraph()
+        self.scan_graph = graph
+        self.scan_packages = mod_packages
+        self.scan_count = 0
+        # IDs of the packages reachable from the roots we've scanned so far
+        self.scan_reachable = set()
+        root_count = 0
+        finished = False
+        try:
+            yield 0, len(mod_packages)
+            for package_name in mod_packages:
+                graph.add_dependencies(package_name, self.get_direct_dependencies(package_name))
+                package_id = graph.get_id(package_name)
+                # Roots, and packages we already know are used, pass that on to their dependencies
+                if package_name in root_packages:
+                    root_count += 1
+                    graph.extend_reachable(self.scan_reachable, [package_id])
+                elif package_id in self.scan_reachable:
+                    graph.extend_reachable(self.scan_reachable, [package_id])
+                self.scan_count += 1
+                yield self.scan_count, len(mod_packages)
+            finished = True
+        finally:
+            # Keep whatever we looked up, even if the scan was stopped
+            self.save_dependency_cache(mod_packages if finished else None)
 
-        # Return used and unused asset paths to caller
-        return self.used, self.unused
+        if not root_count:
+            print("[!] Found no maps or scenarios in {} -- every asset will be listed as unused!".format(self.mod_path))
+
+        # Store these asset paths (replace any existing paths stored)
+        used, unused = self.get_scan_results()
+        self.graph = graph
+        self.used, self.unused = set(used), set(unused)
+        self.update_package_sizes()
+
+        print("[*] Found {} used and {} unused assets from {} roots ({} packages, {} dependencies) in {:.3f}s "
+              "({} asset registry calls, {} packages unchanged since the last run)".format(
+            len(self.used), len(self.unused), root_count, len(graph), graph.edge_count, time.time() - start_time,
+            self.registry_calls, self.dependency_cache_hits))
+        self.path_rules.print_prune_counts()
+
+    def get_scan_results(self):
+        """ Return (used, unused) sorted lists of the packages scanned so far.
+            While scanning, used packages are final, but unused ones may
+            still be used by a package we haven't scanned yet
+        """
+        graph = self.scan_graph
+        reachable = self.scan_reachable
+        used = list()
+        unused = list()
+        for package_name in self.scan_packages[:self.scan_count]:
+            if graph.ids[package_name] in reachable:
+                used.append(package_name)
+            else:
+                unused.append(package_name)
+        return used, unused
+
+    def get_edge_types(self, package_name, dependency_names):
+        """ Return the EDGE_* type of each of a package's dependencies (recorded when they were scanned) """
+        edge_types = dict(zip(self.get_raw_dependencies(package_name), self.dependency_types[package_name]))
+        return [edge_types.get(d, EDGE_MANAGEMENT) for d in dependency_names]
+
+    def get_graph_export_path(self):
+        """ Saved/AssetCleaner/<mod name>.graph """
+        return os.path.join(unreal.Paths.project_saved_dir(), "AssetCleaner",
+                            "{}.graph".format(self.mod_path.strip("/")))
+
+    def export_asset_graph(self, path=None):
+        """ Write the graph of our last scan to a compact binary file, for asset_graph_cli.py
+            # path: str : File to write. If None, will use Saved/AssetCleaner/<mod name>.graph
+            return: str : The path we wrote to (None if there's no graph yet)
+        """
+        graph = self.graph
+        if not graph:
+            print("[!] Find the mod's assets before exporting their graph")
+            return None
+        path = path if path else self.get_graph_export_path()
+        start_time = time.time()
+
+        root_ids = [graph.get_id(p) for p in graph.names if self.is_root_package(p)]
+        reachable = graph.get_reachable(root_ids)
+        flags = bytearray(len(graph))
+        for package_id, package_name in enumerate(graph.names):
+            if package_name in self.used or package_name in self.unused:
+                flags[package_id] |= PACKAGE_MOD
+            if reachable[package_id]:
+                flags[package_id] |= PACKAGE_USED
+        for root_id in root_ids:
+            flags[root_id] |= PACKAGE_ROOT
+
+        # Only packages we scanned have dependencies
+        edge_types = dict()
+        for package_id, dependency_ids in enumerate(graph.dependencies):
+            if dependency_ids:
+                edge_types[package_id] = self.get_edge_types(graph.names[package_id], [graph.names[d] for d in dependency_ids])
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        graph.write(path, flags, edge_types)
+        print("[*] Exported {} packages and {} dependencies to {} in {:.3f}s".format(
+            len(graph), graph.edge_count, path, time.time() - start_time))
+        return path
+
+    def get_removal_order(self, assets):
+        """ Order assets so each asset is removed before the assets it depends on
+            (Kahn's algorithm), so we never delete an asset something we're
+            about to delete still references. Cycles are removed last.
+        """
+        assets = sorted(set(assets))
+        asset_set = set(assets)
+
+        # Count how many of the assets we're removing reference each asset
+        dependencies = dict()
+        referencer_counts = dict((asset, 0) for asset in assets)
+        for asset in assets:
+            dependencies[asset] = [d for d in self.get_direct_dependencies(asset) if d in asset_set and d != asset]
+            for dependency in dependencies[asset]:
+                referencer_counts[dependency] += 1
+
+        # Start with assets nothing else (we're removing) references
+        queue = deque(asset for asset in assets if not referencer_counts[asset])
+        order = list()
+        while queue:
+            asset = queue.popleft()
+            order.append(asset)
+            for dependency in dependencies[asset]:
+                referencer_counts[dependency] -= 1
+                if not referencer_counts[dependency]:
+                    queue.append(dependency)
+
+        # Assets in reference cycles
+        if len(order) < len(assets):
+            ordered = set(order)
+            order += [asset for asset in assets if asset not in ordered]
+        return order
+
+    def get_removal_checkpoint_path(self):
+        """ Saved/AssetCleaner/<mod name>.remove.json """
+        return os.path.join(unreal.Paths.project_saved_dir(), "AssetCleaner",
+                            "{}.remove.json".format(self.mod_path.strip("/")))
+
+    def load_removal_checkpoint(self):
+        """ Return the assets an interrupted removal didn't get to (in order), or None """
+        checkpoint_path = self.get_removal_checkpoint_path()
+        if not os.path.isfile(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, "r") as f:
+                return [str(asset) for asset in json.load(f)["pending"]]
+        except Exception:
+            print("[!] Ignoring broken removal checkpoint: {}".format(checkpoint_path))
+            return None
 
-    def remove(self, assets):
-        asset_lib = unreal.EditorAssetLibrary()
+    def save_removal_checkpoint(self, pending):
+        checkpoint_path = self.get_removal_checkpoint_path()
+        if not pending:
+            if os.path.isfile(checkpoint_path):
+                os.remove(checkpoint_path)
+            return
+        checkpoint_dir = os.path.dirname(checkpoint_path)
+        if not os.path.isdir(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+        temp_path = checkpoint_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"pending": pending}, f)
+        if os.path.isfile(checkpoint_path):
+            os.remove(checkpoint_path)
+        os.rename(temp_path, checkpoint_path)
+
+    def delete_assets(self, assets):
+        """ Delete a chunk of assets with a single call, falling back
+            to deleting them one by one if that fails
+            return: obj List str : The assets which no longer exist
+        """
+        loaded_assets = [asset_lib.load_asset(asset) for asset in assets]
+        loaded_assets = [asset for asset in loaded_assets if asset]
+        try:
+            if loaded_assets and asset_lib.delete_loaded_assets(loaded_assets):
+                return [asset for asset in assets if not asset_lib.does_asset_exist(asset)]
+        except Exception:
+            print(traceback.format_exc())
+
+        print("[!] Failed to delete {} assets at once, deleting them one by one ...".format(len(assets)))
+        deleted = list()
+        for asset in assets:
+            if not asset_lib.does_asset_exist(asset) or asset_lib.delete_asset(asset):
+                deleted.append(asset)
+        return deleted
+
+    def remove(self, assets=None, chunk_size=REMOVE_CHUNK_SIZE):
+        """ Remove these assets from our Unreal project in chunks, saving our
+            progress after every chunk so an interrupted removal can be resumed
+            # assets: obj List str : Assets to remove. If None, will resume the last interrupted removal
+            return: obj Set str : The assets we removed
+        """
+        if assets is None:
+            pending = self.load_removal_checkpoint() or list()
+        else:
+            pending = self.get_removal_order(assets)
+        total = len(pending)
+        self.save_removal_checkpoint(pending)
 
-        # Remove these assets from our Unreal project
-        current_asset = ""
-        with unreal.ScopedSlowTask(len(assets), current_asset) as task:
+        removed = set()
+        start_time = time.time()
+        with unreal.ScopedSlowTask(total, "Removing assets ...") as task:
             task.make_dialog(True)
-            for asset in assets:
-                current_asset = asset
-                asset_lib.delete_asset(asset)
+            while pending:
                 if task.should_cancel():
+                    print("[!] Cancelled removing assets -- {} assets left to remove".format(len(pending)))
                     break
-                task.enter_progress_frame(1, current_asset)
-
-    def add(self, dependency_dict, dependency_path, used_by):
-        # Add this asset to the list if we specified we wanted to add it,
-        # or it's not an asset internal to the project
-        if not self.skip_internal_assets or not dependency_path.lower().startswith(self.mod_path.lower()):
-            if dependency_path not in dependency_dict:
-                dependency_dict[dependency_path] = {}
-            if used_by not in dependency_dict[dependency_path]:
-                dependency_dict[dependency_path][used_by] = 0
-            dependency_dict[dependency_path][used_by] += 1
-
-    def get_list_dependencies(self, asset_data, depth=0):
-
-        # Return if we're past the max_depth specified
-        if depth > self.max_depth:
-            return None
-
-        asset_package_name = asset_data.get_editor_property("package_name")
-        option = unreal.AssetRegistryDependencyOptions()
-        dependencies = asset_registry.get_dependencies(asset_package_name, option)
-        dependency_dict = {}
-        unused_assets = set()
-
-        if dependencies:
-
-            for dependency in dependencies:
-
-                dependency_path = string(dependency)
-
-                # Skip any excluded package paths
-                if self.skip_exclusions:
-                    if not dependency_path.lower().startswith(tuple(self.inclusions)) \
-                        and dependency_path.lower().startswith(tuple(self.exclusions)):
-                        continue
-
-                try:
-                    dependency_asset = unreal.EditorAssetLibrary.find_asset_data(dependency)
-
-                    # Attempt to add this asset to our dict
-                    self.add(dependency_dict, dependency_path, used_by=string(asset_package_name))
-
-                    # Get asset deps
-                    dep_list, unused_deps = self.get_list_dependencies(dependency_asset, depth + 1)
-
-                    # Add unused deps to unused_assets
-                    unused_assets.update(unused_deps)
-
-                    # If there are no deps for our current mod path,
-                    # add to unused assets.
-                    # dep_list = asset_lib.find_package_referencers_for_asset(dependency_asset)
-                    if not dep_list or not [x for x in dep_list if self.mod_path in x]:
-                        unused_assets.add(dependency_path)
-                        continue
-
-                    # Add all valid asset deps
-                    for dep in dep_list:
-                        if not dep:
-                            continue
-                        self.add(dependency_dict, string(dep), used_by=dependency_path)
-
-                except:
-                    pass
-
-        return dependency_dict, unused_assets
-
-    def get_map_assets(self):
-        dependency_dict = {}
-        # if level_lib.load_level(self.maps_dir + "/" + self.mod_path.strip("/")):
-        components = level_lib.get_all_level_actors_components()
-        for component in components:
-            asset_paths = component.get_editor_property("asset_user_data")
-            print(asset_paths)
-            for asset_path in asset_paths:
-                try:
-                    asset_data = asset_lib.find_asset_data(asset_path)
-                except Exception:
-                    print(traceback.format_exc())
-                for k, v in self.get_list_dependencies(asset_data).items():
-                    for kk, vv in v.items():
-                        dependency_dict[k][kk] += vv
-        return dependency_dict
-
-    def get_package_assets(self):
-        dependency_dict = {}
-
-        # Get all assets in the selected mod path
-        assets = asset_registry.get_assets_by_path(
-            self.mod_path.rstrip("/"),
-            recursive=True,
-            include_only_on_disk_assets=False)
-        if not assets:
-            return {}
-
-        # Create scoped dialog in UE4 to let the user know we're doing stuff
-        with unreal.ScopedSlowTask(len(assets), "Retrieving asset dependencies ...") as task:
+                chunk = pending[:chunk_size]
+                removed.update(self.delete_assets(chunk))
+                pending = pending[chunk_size:]
+                self.save_removal_checkpoint(pending)
+                task.enter_progress_frame(len(chunk), "Removed {}/{} assets ...".format(len(removed), total))
+
+        elapsed = time.time() - start_time
+        failed = total - len(pending) - len(removed)
+        print("[*] Removed {} assets in {:.3f}s ({:.1f} assets/s){}".format(
+            len(removed), elapsed, len(removed) / elapsed if elapsed else 0,
+            ", {} failed".format(failed) if failed else ""))
+        return removed
+
+    def get_duplicate_keeper(self, packages):
+        """ Return the copy of a duplicated package which is referenced the most
+            (the one which needs the fewest references updated)
+        """
+        def get_referencer_count(package_name):
+            package_id = self.graph.get_id(package_name) if self.graph else None
+            return len(self.graph.referencers[package_id]) if package_id is not None else 0
+        return sorted(packages, key=lambda p: (-get_referencer_count(p), len(p), p))[0]
+
+    def find_duplicates(self):
+        """ Find the packages of our mod which were imported more than once
+            (see duplicate_finder.py), hashing their files in a pool of threads
+            return: obj List DuplicateGroup : Groups of duplicated package names (None if cancelled)
+        """
+        # (the number of packages to hash is only known once the files have been listed, so count in percent)
+        with unreal.ScopedSlowTask(100, "Finding duplicate assets ...") as task:
             task.make_dialog(True)
+            state = {"percent": 0}
 
-            # Iterate over assets, getting the dependencies of each
-            for asset in assets:
+            def on_progress(done, total):
+                percent = 100 * done // total
+                task.enter_progress_frame(percent - state["percent"], "Hashed {}/{} packages ...".format(done, total))
+                state["percent"] = percent
+                return task.should_cancel()
 
-                used, _ = self.get_list_dependencies(asset)
-                for k, v in used.items():
-                    for kk, vv in v.items():
-                        if not k in dependency_dict:
-                            dependency_dict[k] = {}
-                        if not kk in dependency_dict[k]:
-                            dependency_dict[k][kk] = 0
-                        dependency_dict[k][kk] += vv
+            groups = duplicate_finder.find_duplicates(self.get_content_dir(), use_threads=True, progress=on_progress)
+        if groups is None:
+            return None
 
-                # Allow users to cancel
+        self.duplicate_groups = list()
+        self.duplicate_keepers = dict()
+        self.duplicate_kinds = dict()
+        for group in groups:
+            packages = [self.mod_path + package for package in group.packages]
+            self.duplicate_groups.append(duplicate_finder.DuplicateGroup(group.kind, group.size, packages))
+            keeper = self.get_duplicate_keeper(packages)
+            for package in packages:
+                # (a package may be in an identical and a similar group -- the first, identical, one wins)
+                if package != keeper and package not in self.duplicate_keepers:
+                    self.duplicate_keepers[package] = keeper
+                    self.duplicate_kinds[package] = group.kind
+        return self.duplicate_groups
+
+    def get_duplicates(self):
+        """ Return the duplicated packages (not the copies we keep), grouped by their keeper """
+        return sorted(self.duplicate_keepers.keys(), key=lambda p: (self.duplicate_keepers[p], p))
+
+    def consolidate_duplicates(self, packages):
+        """ Point every reference to these duplicates at the copy we keep, which
+            deletes the duplicates (leaving redirectors to the copy behind)
+            # packages: obj List str : Duplicated package names
+            return: obj Set str : The packages we consolidated
+        """
+        by_keeper = dict()
+        for package in packages:
+            if package in self.duplicate_keepers:
+                by_keeper.setdefault(self.duplicate_keepers[package], list()).append(package)
+
+        consolidated = set()
+        start_time = time.time()
+        with unreal.ScopedSlowTask(len(by_keeper), "Consolidating duplicate assets ...") as task:
+            task.make_dialog(True)
+            for keeper, duplicates in sorted(by_keeper.items()):
                 if task.should_cancel():
+                    print("[!] Cancelled consolidating duplicates")
                     break
+                task.enter_progress_frame(1, keeper)
+                keeper_asset = unreal.load_asset(keeper)
+                duplicate_assets = [unreal.load_asset(duplicate) for duplicate in duplicates]
+                if not keeper_asset or not all(duplicate_assets):
+                    print("[!] Couldn't load {} or its duplicates, skipping them".format(keeper))
+                    continue
+                if asset_lib.consolidate_assets(keeper_asset, duplicate_assets):
+                    consolidated.update(duplicates)
+                    for duplicate in duplicates:
+                        del self.duplicate_keepers[duplicate]
+                        del self.duplicate_kinds[duplicate]
+                else:
+                    print("[!] Couldn't consolidate {} onto {}".format(", ".join(duplicates), keeper))
+        print("[*] Consolidated {} duplicates in {:.3f}s".format(len(consolidated), time.time() - start_time))
+        return consolidated
+
+    def clear_dependency_cache(self):
+        """ Forget the dependencies we've asked the asset registry for (this scan).
+            Dependencies in the cache file are kept, as long as their package files don't change
+        """
+        # Package name -> tuple of its (non-excluded) dependency package names
+        self.direct_dependencies = dict()
+        # Package name -> tuple of all its dependency package names,
+        # and the EDGE_* type of each of them
+        self.raw_dependencies = dict()
+        self.dependency_types = dict()
+        # Package name -> [size, mtime] of its file on disk
+        self.package_stamps = dict()
+        self.registry_calls = 0
+        self.registry_calls_saved = 0
+        self.dependency_cache_hits = 0
+        self.path_rules.reset_prune_counts()
+
+    def get_dependency_cache_path(self):
+        """ Saved/AssetCleaner/<mod name>.json """
+        return os.path.join(unreal.Paths.project_saved_dir(), "AssetCleaner",
+                            "{}.json".format(self.mod_path.strip("/")))
+
+    def load_dependency_cache(self):
+        """ Load the dependencies (and file stamps) of our mod's packages from the last run """
+        self.persistent_dependencies = dict()
+        self.persistent_dependencies_changed = False
+        cache_path = self.get_dependency_cache_path()
+        if not os.path.isfile(cache_path):
+            return
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+            if cache.get("version") != DEPENDENCY_CACHE_VERSION:
+                return
+            for package_name, (stamp, dependencies, dependency_types) in cache["packages"].items():
+                self.persistent_dependencies[str(package_name)] = (
+                    stamp, tuple(str(d) for d in dependencies), tuple(dependency_types))
+            print("[*] Loaded cached dependencies of {} packages from {}".format(
+                len(self.persistent_dependencies), cache_path))
+        except Exception:
+            print("[!] Ignoring broken dependency cache: {}".format(cache_path))
+            print(traceback.format_exc())
+            self.persistent_dependencies = dict()
+
+    def save_dependency_cache(self, mod_packages=None):
+        """ Save the dependencies of every package with a file on disk, dropping
+            packages which are no longer in our mod (when we know which are)
+        """
+        if self.persistent_dependencies is None:
+            return
+        if not self.persistent_dependencies_changed and mod_packages is None:
+            return
+        if mod_packages is not None:
+            mod_packages = set(mod_packages)
+            mod_path = self.mod_path.lower()
+            for package_name in list(self.persistent_dependencies.keys()):
+                if package_name.lower().startswith(mod_path) and package_name not in mod_packages:
+                    del self.persistent_dependencies[package_name]
+                    self.persistent_dependencies_changed = True
+        if not self.persistent_dependencies_changed:
+            return
 
-                # Progress our task progress by 1
-                task.enter_progress_frame(1, asset.get_full_name())
+        cache_path = self.get_dependency_cache_path()
+        cache_dir = os.path.dirname(cache_path)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Write to a temporary file first so we never leave a half-written cache behind
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": DEPENDENCY_CACHE_VERSION,
+                "packages": dict((k, [v[0], list(v[1]), list(v[2])]) for k, v in self.persistent_dependencies.items())
+            }, f)
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
+        os.rename(temp_path, cache_path)
+        self.persistent_dependencies_changed = False
+        print("[*] Saved dependencies of {} packages to {}".format(len(self.persistent_dependencies), cache_path))
+
+    def get_content_dir(self, mod_name=None):
+        """ Return the Content folder of a mod (default: ours) """
+        mod_name = mod_name if mod_name else self.mod_path.strip("/")
+        return os.path.join(unreal.SystemLibrary.get_project_directory(), "Mods", mod_name, "Content")
+
+    def get_package_filename(self, package_name):
+        """ Return the .uasset or .umap file of a mod package, or None if it isn't on disk """
+        mod_name, _, package_path = package_name.strip("/").partition("/")
+        if not package_path:
+            return None
+        package_file = os.path.join(self.get_content_dir(mod_name), *package_path.split("/"))
+        for extension in (".uasset", ".umap"):
+            if os.path.isfile(package_file + extension):
+                return package_file + extension
+        return None
+
+    def get_package_stamp(self, package_name):
+        """ Return [size, mtime] of a package's file, or None if it isn't on disk """
+        if package_name not in self.package_stamps:
+            package_file = self.get_package_filename(package_name)
+            if package_file:
+                file_stat = os.stat(package_file)
+                self.package_stamps[package_name] = [file_stat.st_size, int(file_stat.st_mtime)]
+            else:
+                self.package_stamps[package_name] = None
+        return self.package_stamps[package_name]
+
+    def get_package_size(self, package_name):
+        """ Return the size (in bytes) of a package's files, or 0 if it isn't on disk """
+        if package_name in self.package_sizes:
+            return self.package_sizes[package_name]
+        stamp = self.get_package_stamp(package_name)
+        return stamp[0] if stamp else 0
+
+    def update_package_sizes(self):
+        """ Find the size of every package in our mod (scanning its Content folder in parallel),
+            then how much removing each unused package would free
+        """
+        sizes = get_package_sizes(self.get_content_dir())
+        self.package_sizes = dict((self.mod_path + package, size) for package, size in sizes.items())
+        self.update_reclaimable_sizes()
 
-        self.dependencies = dependency_dict
+    def forget_packages(self, packages):
+        """ These packages were deleted: stop listing them (and what they take on disk) """
+        if not packages:
+            return
+        self.used -= packages
+        self.unused -= packages
+        for package_name in packages:
+            self.package_sizes.pop(package_name, None)
+        # Deleted duplicates, and duplicates of deleted copies, can't be consolidated anymore
+        for duplicate, keeper in list(self.duplicate_keepers.items()):
+            if duplicate in packages or keeper in packages:
+                del self.duplicate_keepers[duplicate]
+                del self.duplicate_kinds[duplicate]
+        if self.graph:
+            self.update_reclaimable_sizes()
+
+    def update_reclaimable_sizes(self):
+        """ Bytes freed by removing each unused package: its own files, and those of the
+            unused packages only it references (directly or not), which would be left unreferenced
+        """
+        start_time = time.time()
+        graph = self.graph
+        unused_ids = set(graph.get_id(p) for p in self.unused if p in graph)
+        exclusive_sizes = graph.get_exclusive_sizes(
+            unused_ids, dict((package_id, self.get_package_size(graph.names[package_id])) for package_id in unused_ids))
+        self.reclaimable_sizes = dict((graph.names[package_id], size) for package_id, size in exclusive_sizes.items())
+        print("[*] {} used ({}), {} unused ({}) -- found what removing each unused asset frees in {:.3f}s".format(
+            len(self.used), format_size(sum(self.get_package_size(p) for p in self.used)),
+            len(self.unused), format_size(sum(self.get_package_size(p) for p in self.unused)),
+            time.time() - start_time))
+
+    def get_raw_dependencies(self, package_name):
+        """ Return every package name this package depends on (and record the EDGE_* type of each,
+            see get_edge_types), from the cache file if the package's file hasn't changed since,
+            otherwise from the asset registry
+        """
+        if package_name in self.raw_dependencies:
+            return self.raw_dependencies[package_name]
+        if self.persistent_dependencies is None:
+            self.load_dependency_cache()
+
+        stamp = self.get_package_stamp(package_name)
+        cached = self.persistent_dependencies.get(package_name)
+        if stamp is not None and cached and cached[0] == stamp:
+            self.dependency_cache_hits += 1
+            dependencies, dependency_types = cached[1], cached[2]
+        else:
+            self.registry_calls += 1
+            option = unreal.AssetRegistryDependencyOptions()
+            dependencies = tuple(string(d) for d in asset_registry.get_dependencies(package_name, option) or [])
+            dependency_types = self.get_registry_edge_types(package_name, dependencies)
+            if stamp is not None:
+                self.persistent_dependencies[package_name] = (stamp, dependencies, dependency_types)
+                self.persistent_dependencies_changed = True
+
+        self.raw_dependencies[package_name] = dependencies
+        self.dependency_types[package_name] = dependency_types
+        return dependencies
+
+    def get_registry_edge_types(self, package_name, dependencies):
+        """ Return the EDGE_* type of each of a package's dependencies,
+            asking the asset registry for its hard and soft references separately
+        """
+        if not dependencies:
+            return tuple()
+        hard_option = unreal.AssetRegistryDependencyOptions(
+            include_soft_package_references=False, include_hard_package_references=True,
+            include_searchable_names=False, include_soft_management_references=False,
+            include_hard_management_references=False)
+        soft_option = unreal.AssetRegistryDependencyOptions(
+            include_soft_package_references=True, include_hard_package_references=False,
+            include_searchable_names=False, include_soft_management_references=False,
+            include_hard_management_references=False)
+        hard = set(string(d) for d in asset_registry.get_dependencies(package_name, hard_option) or [])
+        soft = set(string(d) for d in asset_registry.get_dependencies(package_name, soft_option) or [])
+        return tuple(EDGE_HARD if d in hard else EDGE_SOFT if d in soft else EDGE_MANAGEMENT for d in dependencies)
+
+    def is_excluded(self, package_path):
+        """ Return True if this package path is excluded (and not specifically included) """
+        if not self.skip_exclusions:
+            return False
+        return self.path_rules.is_excluded(package_path)
+
+    def get_direct_dependencies(self, package_name):
+        """ Return the (non-excluded) package names this package depends on.
+            Each package is only looked up in the asset registry once per scan
+            (and not at all if it hasn't changed since it was saved to the cache file)
+        """
+        if package_name in self.direct_dependencies:
+            self.registry_calls_saved += 1
+            return self.direct_dependencies[package_name]
 
-        # Return a dictionary of dependency:usages
-        return dependency_dict
+        direct_dependencies = list()
+        for dependency_path in self.get_raw_dependencies(package_name):
+            # Skip any excluded package paths
+            if not self.is_excluded(dependency_path):
+                direct_dependencies.append(dependency_path)
 
-    def get_package_references(self, package_path):
-        dependency_dict = {}
-        assets = asset_registry.get_assets_by_path(
-            package_path,
-            recursive=True,
-            include_only_on_disk_assets=False)
-        print("[*] Total assets to check: {}".format(len(assets)))
-        for asset_data in assets:
-            used_assets, unused_assets = self.get_list_dependencies(asset_data)
-            for k, v in used_assets.items():
-                for kk, vv in v.items():
-                    #if not self.mod_path.lower() in kk.lower():
-                    #    continue
-                    if not k in dependency_dict:
-                        dependency_dict[k] = {}
-                    if not kk in dependency_dict[k]:
-                        dependency_dict[k][kk] = 0
-                    dependency_dict[k][kk] += vv
-        return dependency_dict, unused_assets
-
-    def get_unused_assets(self, package_path):
-        assets = asset_registry.get_assets_by_path(
-            package_path,
-            recursive=True,
-            include_only_on_disk_assets=False)
-        print("[*] Total assets to check: {}".format(len(assets)))
-        unused_assets = set()
-        for asset_data in assets:
-            _, unused = self.get_list_dependencies(asset_data)
-            unused_assets.update(unused)
-        return unused_assets
+        self.direct_dependencies[package_name] = tuple(direct_dependencies)
+        return self.direct_dependencies[package_name]
 
     def get_mod_paths(self):
         project_root_dir = unreal.SystemLibrary.get_project_directory()
@@ -334,27 +779,6 @@ class CustomToplevel(Toplevel):
         Toplevel.destroy(self)
 
 
-class ScrollableFrame(Frame):
-    def __init__(self, parent, *args, **kwargs):
-        Frame.__init__(self, parent, *args, **kwargs)
-        canvas = Canvas(self)
-        scrollbar = Scrollbar(self, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = Frame(canvas)
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-        Label(self.scrollable_frame, text=" "*500).pack(expand=False, fill="x")
-        self.scrollable_frame.pack(expand=True, fill="both")
-        self.pack(expand=True, fill="both")
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.pack(side=LEFT, fill="both", expand=True)
-        scrollbar.pack(side=RIGHT, fill="y")
-
-
 class FancyTextbox(Text):
 
     def __init__(self, parent, app, *args, **kwargs):
@@ -381,30 +805,339 @@ class FancyTextbox(Text):
         self.selection_set(0, END)
 
 
-class DependencyList(Label):
-
-    def __init__(self, parent, app, referencers, *args, **kwargs):
-        Label.__init__(self, parent, *args, **kwargs)
-        self.app = app
-        self.listbox = Listbox(parent, selectmode="extended")
-        if "font" not in kwargs:
-            self.listbox.config(font=self.app.main_font)
-        def on_right_click(event):
-            self.listbox.selection_clear(0, END)
-        self.listbox.bind("<Button-3><ButtonRelease-3>", on_right_click)
-        # self.listbox.bind("<<ListboxSelect>>", )
-        self.add_referencers(referencers)
+class VirtualListbox(Frame):
+    """ Listbox which only inserts the rows that are visible into Tk, so it
+        can list hundreds of thousands of items without freezing the editor.
+        Items and selection are kept in Python; scrolling re-renders the visible rows.
+    """
 
-    def add_referencers(self, referencers):
-        # Add referencers
-        for asset_path, times_referencd in referencers.items():
-            self.listbox.insert(END, asset_path)
+    def __init__(self, parent, font=None, *args, **kwargs):
+        Frame.__init__(self, parent, *args, **kwargs)
+        self.items = list()
+        # Indices (into items) of selected items
+        self.selected = set()
+        self.anchor = 0
+        # Index of the item keyboard navigation moves from
+        self.active = 0
+        # Called (without arguments) whenever the selection changes
+        self.on_select = None
+        # Index of the first visible item, and how many rows fit
+        self.top = 0
+        self.rows = 1
+
+        self.scrollbar = Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.listbox = Listbox(self, selectmode="extended", exportselection=0, activestyle="none")
+        if font:
+            self.listbox.config(font=font)
+        self.listbox.pack(side=LEFT, expand=True, fill="both")
+        self.line_height = tkFont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        # We handle selection ourselves, as the listbox only knows the visible rows
+        self.listbox.bind("<Configure>", self.on_configure)
+        self.listbox.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.listbox.bind("<Button-1>", self.on_click)
+        self.listbox.bind("<Shift-Button-1>", self.on_shift_click)
+        self.listbox.bind("<Control-Button-1>", self.on_control_click)
+        self.listbox.bind("<B1-Motion>", lambda event: "break")
+        self.listbox.bind("<Prior>", lambda event: self.yview("scroll", -1, "pages"))
+        self.listbox.bind("<Next>", lambda event: self.yview("scroll", 1, "pages"))
+
+        # Same for the keyboard: the Listbox class bindings would only
+        # change the visible rows' selection, not self.selected
+        self.listbox.bind("<Up>", lambda event: self.on_key_move(-1))
+        self.listbox.bind("<Down>", lambda event: self.on_key_move(1))
+        self.listbox.bind("<Shift-Up>", lambda event: self.on_key_move(-1, extend=True))
+        self.listbox.bind("<Shift-Down>", lambda event: self.on_key_move(1, extend=True))
+        self.listbox.bind("<Control-Home>", lambda event: self.on_key_move(-len(self.items)))
+        self.listbox.bind("<Control-End>", lambda event: self.on_key_move(len(self.items)))
+        self.listbox.bind("<Shift-Control-Home>", lambda event: self.on_key_move(-len(self.items), extend=True))
+        self.listbox.bind("<Shift-Control-End>", lambda event: self.on_key_move(len(self.items), extend=True))
+        for sequence in ("<space>", "<Select>"):
+            self.listbox.bind(sequence, lambda event: self.on_key_move(0))
+        for sequence in ("<Shift-space>", "<Shift-Select>", "<Control-Shift-space>", "<Shift-Control-Select>"):
+            self.listbox.bind(sequence, lambda event: self.on_key_move(0, extend=True))
+        for sequence in ("<Control-space>", "<Control-Select>"):
+            self.listbox.bind(sequence, lambda event: self.on_key_toggle())
+        self.listbox.bind("<Control-slash>", lambda event: self.select_all() or "break")
+        self.listbox.bind("<Control-backslash>", lambda event: self.select_none() or "break")
+
+    def set_items(self, items):
+        """ Replace all items (and clear the selection) """
+        self.items = items
+        self.selected = set()
+        self.anchor = 0
+        self.active = 0
+        self.top = 0
+        self.render()
+
+    def get_items(self):
+        return self.items
 
     def get_selected(self):
-        return [self.listbox.get(i) for i in self.listbox.curselection()]
+        return [self.items[i] for i in sorted(self.selected)]
+
+    def size(self):
+        return len(self.items)
 
     def select_all(self):
-        self.listbox.select_set(0, END)
+        self.selected = set(range(len(self.items)))
+        self.render()
+        self.selection_changed()
+
+    def select_none(self):
+        self.selected = set()
+        self.render()
+        self.selection_changed()
+
+    def selection_changed(self):
+        if self.on_select:
+            self.on_select()
+
+    def remove_selected(self):
+        """ Remove the selected items from the list (not from the project!) """
+        self.items = [item for index, item in enumerate(self.items) if index not in self.selected]
+        self.selected = set()
+        self.active = self.anchor = min(self.active, max(0, len(self.items) - 1))
+        self.render()
+
+    def render(self):
+        """ Insert only the visible rows into the listbox """
+        self.top = max(0, min(self.top, len(self.items) - self.rows))
+        visible = self.items[self.top:self.top + self.rows]
+        self.listbox.delete(0, END)
+        if visible:
+            self.listbox.insert(END, *visible)
+        for row in range(len(visible)):
+            if self.top + row in self.selected:
+                self.listbox.selection_set(row)
+        if self.items:
+            self.scrollbar.set(float(self.top) / len(self.items),
+                               float(self.top + len(visible)) / len(self.items))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        """ Scrollbar command: ("moveto", fraction) or ("scroll", count, "units"/"pages") """
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.items))
+        elif args[0] == "scroll":
+            self.top += int(args[1]) * (self.rows if args[2] == "pages" else 1)
+        self.render()
+        return "break"
+
+    def on_configure(self, event):
+        rows = max(1, event.height // self.line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def on_mouse_wheel(self, event):
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+        return "break"
+
+    def get_index(self, event):
+        index = self.top + self.listbox.nearest(event.y)
+        return index if index < len(self.items) else None
+
+    def on_click(self, event):
+        index = self.get_index(event)
+        self.selected = set([index]) if index is not None else set()
+        self.active = self.anchor = index if index is not None else 0
+        self.listbox.focus_set()
+        self.render()
+        self.selection_changed()
+        return "break"
+
+    def on_shift_click(self, event):
+        index = self.get_index(event)
+        if index is not None:
+            self.selected = set(range(min(self.anchor, index), max(self.anchor, index) + 1))
+            self.active = index
+            self.render()
+            self.selection_changed()
+        return "break"
+
+    def on_control_click(self, event):
+        index = self.get_index(event)
+        if index is not None:
+            self.selected.symmetric_difference_update([index])
+            self.active = self.anchor = index
+            self.render()
+            self.selection_changed()
+        return "break"
+
+    def see(self, index):
+        """ Scroll so the item at this index is visible """
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+
+    def on_key_move(self, delta, extend=False):
+        """ Move the active item, then select it (or extend the selection from the anchor to it) """
+        if self.items:
+            self.active = max(0, min(len(self.items) - 1, self.active + delta))
+            if extend:
+                self.selected = set(range(min(self.anchor, self.active), max(self.anchor, self.active) + 1))
+            else:
+                self.selected = set([self.active])
+                self.anchor = self.active
+            self.see(self.active)
+            self.render()
+            self.selection_changed()
+        return "break"
+
+    def on_key_toggle(self):
+        if self.items:
+            self.selected.symmetric_difference_update([self.active])
+            self.anchor = self.active
+            self.render()
+            self.selection_changed()
+        return "break"
+
+
+class DependencyBrowser(CustomToplevel):
+    """ Tree of the mod's packages and what they depend on (or what references them).
+        Children are only added to the tree when their parent is expanded, a page at a time.
+    """
+
+    def __init__(self, parent, app, *args, **kwargs):
+        CustomToplevel.__init__(self, parent, app.root, *args, **kwargs)
+        self.app = app
+        self.assets = app.assets
+        self.graph = app.assets.graph
+        self.title("Dependencies")
+        self.geometry("640x640")
+
+        # Tree item -> package ID, and "... more" items -> (parent item, package IDs, offset)
+        self.item_packages = dict()
+        self.more_items = dict()
+        self.root_ids = [self.graph.get_id(p) for p in self.graph.names if self.assets.is_root_package(p)]
+
+        # Show what packages depend on, or what references them
+        self.direction = StringVar()
+        self.direction.set("dependencies")
+        options = Frame(self)
+        Radiobutton(options, text="Dependencies", variable=self.direction, value="dependencies",
+                    command=self.reload).pack(side=LEFT)
+        Radiobutton(options, text="Referencers", variable=self.direction, value="referencers",
+                    command=self.reload).pack(side=LEFT)
+        options.pack(expand=False, fill="x")
+
+        frame = Frame(self)
+        scrollbar = Scrollbar(frame)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        self.tree = ttk.Treeview(frame, columns=("used", "dependencies", "referencers"), yscrollcommand=scrollbar.set)
+        self.tree.heading("#0", text="Package")
+        self.tree.heading("used", text="Used")
+        self.tree.heading("dependencies", text="Dependencies")
+        self.tree.heading("referencers", text="Referencers")
+        self.tree.column("#0", width=400)
+        for column in ("used", "dependencies", "referencers"):
+            self.tree.column(column, width=70, stretch=False, anchor="e")
+        self.tree.pack(expand=True, fill="both")
+        scrollbar.config(command=self.tree.yview)
+        frame.pack(expand=True, fill="both")
+
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        self.tree.bind("<Double-Button-1>", self.on_double_click)
+
+        buttons = Frame(self)
+        for text, command in (("Why Is This Used?", self.show_why_used), ("Open Selected", self.open_selected)):
+            btn = Button(buttons, text=text, command=command)
+            btn.config(font=app.main_font)
+            btn.pack(side=LEFT, expand=True, fill="x")
+        buttons.pack(expand=False, fill="x")
+
+        self.reload()
+        self.focus_set()
+
+    def get_children(self, package_id):
+        if self.direction.get() == "dependencies":
+            return self.graph.dependencies[package_id]
+        return self.graph.referencers[package_id]
+
+    def reload(self):
+        """ Show (the first page of) every package in our mod """
+        self.tree.delete(*self.tree.get_children())
+        self.item_packages = dict()
+        self.more_items = dict()
+        mod_ids = [self.graph.get_id(p) for p in sorted(self.assets.used | self.assets.unused)]
+        self.add_page("", mod_ids, 0)
+
+    def add_package(self, parent, package_id, index=END):
+        """ Add a package to the tree, with a placeholder child if it can be expanded """
+        name = self.graph.names[package_id]
+        used = "yes" if name in self.assets.used else "no" if name in self.assets.unused else ""
+        item = self.tree.insert(parent, index, text=name, values=(
+            used, len(self.graph.dependencies[package_id]), len(self.graph.referencers[package_id])))
+        self.item_packages[item] = package_id
+        if self.get_children(package_id):
+            self.tree.insert(item, END, text="...")
+        return item
+
+    def add_page(self, parent, package_ids, offset):
+        """ Add up to DEPENDENCY_PAGE_SIZE packages, and a "... more" item if there are more left """
+        end = offset + DEPENDENCY_PAGE_SIZE
+        for package_id in package_ids[offset:end]:
+            self.add_package(parent, package_id)
+        if end < len(package_ids):
+            more_item = self.tree.insert(parent, END, text="... {} more (double click)".format(len(package_ids) - end))
+            self.more_items[more_item] = (parent, package_ids, end)
+
+    def on_open(self, event):
+        item = self.tree.focus()
+        package_id = self.item_packages.get(item)
+        children = self.tree.get_children(item)
+        # Replace the placeholder with the first page of children
+        if package_id is not None and len(children) == 1 and children[0] not in self.item_packages:
+            self.tree.delete(children[0])
+            children = sorted(self.get_children(package_id), key=lambda i: self.graph.names[i])
+            self.add_page(item, children, 0)
+
+    def on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if item in self.more_items:
+            parent, package_ids, offset = self.more_items.pop(item)
+            self.tree.delete(item)
+            self.add_page(parent, package_ids, offset)
+            return "break"
+
+    def get_selected_packages(self):
+        return [self.graph.names[self.item_packages[i]] for i in self.tree.selection() if i in self.item_packages]
+
+    def show_why_used(self):
+        """ Add the shortest chain of references from a map/scenario to the selected package """
+        selected = [self.item_packages[i] for i in self.tree.selection() if i in self.item_packages]
+        if not selected:
+            messagebox.showinfo(self.app.title, "Please select a package first ...")
+            return
+        path = self.graph.get_shortest_path(self.root_ids, selected[0])
+        if not path:
+            messagebox.showinfo(self.app.title, "Nothing (no map or scenario) uses {}".format(
+                self.graph.names[selected[0]]))
+            return
+
+        # Add the chain at the top of the tree, one level per reference
+        parent = ""
+        item = None
+        for depth, package_id in enumerate(path):
+            item = self.tree.insert(parent, 0 if not depth else END, text=self.graph.names[package_id],
+                                    values=("yes", len(self.graph.dependencies[package_id]),
+                                            len(self.graph.referencers[package_id])), open=True)
+            self.item_packages[item] = package_id
+            parent = item
+        self.tree.selection_set(item)
+        self.tree.see(item)
+
+    def open_selected(self):
+        selected_assets = self.get_selected_packages()
+        if len(selected_assets) > 0:
+            assets = [unreal.load_asset(selected_asset) for selected_asset in selected_assets]
+            editor_subsystem.open_editor_for_assets([asset for asset in assets if asset])
+        else:
+            messagebox.showinfo("ERROR", "Please select an asset to continue ...")
 
 
 class App:
@@ -416,8 +1149,9 @@ class App:
 
         # Create root window
         self.title = "AssetCleaner"
-        self.root = Tk()
-        self.root.title(self.title)
+        # (a window of the Tk host shared by our editor tools, which ticks us every frame)
+        self.host = tk_host.get_host()
+        self.root = self.host.add_window(self.title, on_tick=self.tick, on_close=self.on_close)
         self.root.geometry("800x800")
         self.main_font = ("Helvatical bold", 8)
 
@@ -430,79 +1164,217 @@ class App:
         self.btn.config(font=self.main_font)
         self.btn.pack(expand=False, fill="x")
 
-        # Setup tick to handle Unreal ticks to update the UI
-        self.tick_handle = None
-        self.tick_time = 0
-        self.tick_handle = unreal.register_slate_post_tick_callback(self.tick)
+        self.setup_status_bar()
 
-        # Ensure we tell Unreal know we're exiting and want to
-        # unregister from the Slate tick function
-        atexit.register(self.unregister_tick)
+        # Dependency scan advanced every editor frame (see find_assets)
+        self.scan = None
+        self.scan_progress = (0, 0)
+        self.scan_refresh_time = 0
+        self.on_scan_finished = None
 
-    def tick(self, delta_seconds):
-        self.tick_time += delta_seconds
-        if not self.running:
-            unreal.unregister_slate_post_tick_callback(self.tick_handle)
-            return
-        # Only tick ~60 FPS
-        if self.tick_time > 0.016:
-            try:
-                self.root.update_idletasks()
-                self.root.update()
-            except Exception:
-                unreal.unregister_slate_post_tick_callback(self.tick_handle)
-            self.tick_time = 0
-
-    # Tell the Unreal Editor we're no longer handling ticks
-    def unregister_tick():
-        self.running = False
-        # unreal.unregister_slate_post_tick_callback(self.tick_handle)
+    def tick(self, delta_seconds, budget_seconds):
+        # Scan a little every frame, so the editor stays responsive
+        if self.scan:
+            self.advance_scan(min(SCAN_BUDGET_SECONDS, budget_seconds))
+            return True
+        return False
 
     def run(self):
-        self.find_assets()
-        self.running = True
+        # We need to know which mod to look at before we can find its assets
         if not self.assets.mod_path:
             self.display_mod_path_selection()
+        else:
+            self.find_assets()
+
+    def close(self):
+        self.host.print_stats()
+        self.host.remove_window(self.root)
+
+    def on_close(self):
+        # Our window's gone, just stop scanning
+        if self.scan:
+            self.scan.close()
+            self.scan = None
 
     def on_filter_text_changed(self, string_var):
-        if not "last_show_command" in dir(self):
-            self.last_show_command = self.show_unused
-        self.last_show_command(string_var)
+        # Wait for the user to stop typing before we filter
+        if self.filter_job:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(FILTER_DEBOUNCE_MS, self.apply_filter)
 
     def show_dependencies(self):
-        if not self.assets.dependencies or refresh:
-            self.assets.dependencies = self.assets.get_package_assets()
-        self.display_dependencies_box()
-
-    def show_used(self, asset_filter=None):
-        self.show_assets(self.assets.used, asset_filter)
-        self.last_show_command = self.show_used
-
-    def show_unused(self, asset_filter=None):
-        self.show_assets(self.assets.unused, asset_filter)
-        self.last_show_command = self.show_unused
-
-    def show_all(self, asset_filter=None):
-        self.show_assets(self.assets.used.union(self.assets.unused), asset_filter)
-        self.last_show_command = self.show_all
-
-    def show_assets(self, asset_types, asset_filter=None):
-        self.asset_list.delete(0, END)
-        if asset_filter:
-            asset_filter = asset_filter.get()
-        for asset in asset_types:
-            if asset_filter:
-                if asset_filter in asset:
-                    self.asset_list.insert(END, asset)
+        if self.scan:
+            messagebox.showinfo(self.title, "Please wait for the dependency scan to finish ...")
+        elif not self.assets.graph:
+            self.find_assets(on_finished=self.show_dependencies)
+        else:
+            DependencyBrowser(self.root, self)
+
+    def export_asset_graph(self):
+        if self.scan:
+            messagebox.showinfo(self.title, "Please wait for the dependency scan to finish ...")
+        elif not self.assets.graph:
+            self.find_assets(on_finished=self.export_asset_graph)
+        else:
+            path = self.assets.export_asset_graph()
+            if path:
+                self.status.set("Exported the dependency graph to {}".format(path))
+
+    def find_duplicates(self):
+        if self.scan:
+            messagebox.showinfo(self.title, "Please wait for the dependency scan to finish ...")
+            return
+        # We keep the most referenced copy of each duplicate, so we need the graph first
+        if not self.assets.graph:
+            self.find_assets(on_finished=self.find_duplicates)
+            return
+        groups = self.assets.find_duplicates()
+        if groups is None:
+            return
+        self.invalidate_views()
+        self.show_view("duplicates")
+        self.status.set("{} duplicates in {} groups (each listed duplicate is consolidated onto its most "
+                        "referenced copy -- select one to see which)".format(len(self.assets.duplicate_keepers), len(groups)))
+
+    def on_asset_selected(self):
+        """ In the duplicates view, show what the selected duplicates are consolidated onto """
+        if self.current_view != "duplicates":
+            return
+        duplicates = [p for p in self.asset_list.get_selected() if p in self.assets.duplicate_keepers]
+        if len(duplicates) == 1:
+            duplicate = duplicates[0]
+            self.status.set("{} ({}) is consolidated onto {}".format(
+                duplicate, self.assets.duplicate_kinds[duplicate], self.assets.duplicate_keepers[duplicate]))
+        elif duplicates:
+            similar = [p for p in duplicates if self.assets.duplicate_kinds[p] == duplicate_finder.SIMILAR]
+            self.status.set("{} duplicates selected, consolidated onto {} copies ({} only similar, not identical)".format(
+                len(duplicates), len(set(self.assets.duplicate_keepers[p] for p in duplicates)), len(similar)))
+
+    def consolidate_selected(self):
+        duplicates = [p for p in self.asset_list.get_selected() if p in self.assets.duplicate_keepers]
+        if not duplicates:
+            messagebox.showinfo(self.title, "Please select duplicates (Actions > Find Duplicates) to continue ...")
+            return
+        # Similar duplicates only share (about) their size and payload tail, so have them confirmed first
+        similar = [p for p in duplicates if self.assets.duplicate_kinds[p] == duplicate_finder.SIMILAR]
+        if similar:
+            listed = ["{} -> {}".format(p, self.assets.duplicate_keepers[p]) for p in similar[:10]]
+            if len(similar) > len(listed):
+                listed.append("... and {} more".format(len(similar) - len(listed)))
+            if not messagebox.askyesno(self.title, "{} of the selected duplicates are only similar, not identical, "
+                                       "to the copy they'd be consolidated onto:\n\n{}\n\nConsolidate them anyway?".format(
+                                           len(similar), "\n".join(listed))):
+                return
+        consolidated = self.assets.consolidate_duplicates(duplicates)
+        # Consolidating deleted them
+        self.assets.forget_packages(consolidated)
+        self.invalidate_views()
+        self.apply_filter()
+
+    def show_used(self):
+        self.show_view("used")
+
+    def show_unused(self):
+        self.show_view("unused")
+
+    def show_all(self):
+        self.show_view("all")
+
+    def show_view(self, view):
+        self.current_view = view
+        self.apply_filter()
+
+    def get_view(self, view):
+        """ Return the (sorted) asset paths of a view, only building each view once """
+        if view not in self.views:
+            if view == "used":
+                assets = self.assets.used
+            elif view == "unused":
+                assets = self.assets.unused
+            elif view == "duplicates":
+                # (grouped by the copy they duplicate, rather than sorted)
+                self.views[view] = self.assets.get_duplicates()
+                return self.views[view]
             else:
-                self.asset_list.insert(END, asset)
+                assets = self.assets.used.union(self.assets.unused)
+            self.views[view] = sorted(assets)
+        return self.views[view]
+
+    def invalidate_views(self):
+        """ Our assets changed: rebuild views, the search index (and filter from scratch) """
+        self.views = dict()
+        self.filtered_text = None
+        self.package_sizes = None
+        self.search_index = TrigramIndex(self.get_view("all"))
+
+    def get_package_sizes(self):
+        if self.package_sizes is None:
+            self.package_sizes = dict((p, self.assets.get_package_size(p)) for p in self.get_view("all"))
+        return self.package_sizes
+
+    def show_totals(self, items):
+        """ Show how much the listed assets take on disk """
+        sizes = self.get_package_sizes()
+        self.status.set("{} assets listed ({}) -- {} unused assets take {}".format(
+            len(items), format_size(sum(sizes.get(p, 0) for p in items)),
+            len(self.assets.unused), format_size(sum(sizes.get(p, 0) for p in self.assets.unused))))
+
+    def apply_filter(self):
+        """ List the assets of the current view matching the filter text """
+        self.filter_job = None
+        text = self.filter_text.get()
+        rank = self.rank.get()
+
+        # If the filter text was only extended, every match is
+        # among the last matches -- no need to look at the whole view.
+        # (not so with globs: "[ab]" contains "b", yet also matches paths with only an "a")
+        if self.filtered_text is not None and self.filtered_view == (self.current_view, rank) \
+                and self.filtered_text in text and not is_glob(self.filtered_text) and not is_glob(text):
+            candidates = self.filtered_items
+        elif self.current_view == "all":
+            candidates = None
+        else:
+            candidates = self.get_view(self.current_view)
+        if rank == "size":
+            search_rank, sizes = "size", self.get_package_sizes()
+        elif rank == "reclaimable":
+            # Ranked by what removing each asset frees (used assets free nothing)
+            search_rank, sizes = "size", self.assets.reclaimable_sizes
+        elif self.current_view == "duplicates":
+            # Keep duplicates grouped by the copy they're consolidated onto
+            search_rank, sizes = (rank if rank != "path" else "candidates"), None
+        else:
+            search_rank, sizes = rank if rank != "path" else None, None
+        items = self.search_index.search(text, candidates=candidates, rank=search_rank, sizes=sizes)
+
+        self.filtered_view = (self.current_view, rank)
+        self.filtered_text = text
+        self.filtered_items = items
+        self.asset_list.set_items(items)
+        self.show_totals(items)
 
     def setup_filter(self):
+        self.current_view = "unused"
+        self.filter_job = None
+        self.rank = StringVar()
+        self.rank.set("path")
+        self.invalidate_views()
         self.filter_text = StringVar()
         self.filter_text.trace("w", lambda name, index, mode, sv=self.filter_text: self.on_filter_text_changed(sv))
         self.filter = Entry(self.root, textvariable=self.filter_text, exportselection=0)
         self.filter.pack(expand=False, fill="x")
 
+    def setup_status_bar(self):
+        status_bar = Frame(self.root)
+        self.status = StringVar()
+        Label(status_bar, textvariable=self.status, anchor="w", font=self.main_font).pack(
+            side=LEFT, expand=True, fill="x")
+        self.cancel_btn = Button(status_bar, text="Cancel Scan", command=self.cancel_scan, state=DISABLED)
+        self.cancel_btn.config(font=self.main_font)
+        self.cancel_btn.pack(side=RIGHT)
+        status_bar.pack(expand=False, fill="x")
+        self.root.bind("<Escape>", lambda event: self.cancel_scan())
+
     def setup_menu(self):
 
         menubar = Menu(self.root)
@@ -511,23 +1383,35 @@ class App:
         actions.add_command(label="Show Only Used", command=self.show_used)
         actions.add_command(label="Show Only Unused", command=self.show_unused)
         actions.add_command(label="Show Dependencies", command=self.show_dependencies)
+        actions.add_command(label="Export Dependency Graph", command=self.export_asset_graph)
+        actions.add_separator()
+        actions.add_command(label="Find Duplicates", command=self.find_duplicates)
+        actions.add_command(label="Consolidate Selected Duplicates", command=self.consolidate_selected)
         actions.add_command(label="Remove Selected", command=self.remove_selected)
         actions.add_command(label="Remove All Listed", command=self.remove_listed)
         actions.add_separator()
-        actions.add_command(label="Exit", command=self.root.quit)
+        actions.add_command(label="Exit", command=self.close)
         menubar.add_cascade(label="Actions", menu=actions)
 
         edit_menu = Menu(menubar, tearoff=0)
         edit_menu.add_command(label="Undo", accelerator="Ctrl+Z")
         edit_menu.add_separator()
-        edit_menu.add_command(label="Cut", command=lambda: self.asset_list.event_generate("<<Cut>>"), accelerator="Ctrl+X")
-        edit_menu.add_command(label="Copy", command=lambda: self.asset_list.event_generate("<<Copy>>"), accelerator="Ctrl+C")
-        edit_menu.add_command(label="Paste", command=lambda: self.asset_list.event_generate("<<Paste>>"), accelerator="Ctrl+V")
+        edit_menu.add_command(label="Cut", command=lambda: self.asset_list.listbox.event_generate("<<Cut>>"), accelerator="Ctrl+X")
+        edit_menu.add_command(label="Copy", command=lambda: self.asset_list.listbox.event_generate("<<Copy>>"), accelerator="Ctrl+C")
+        edit_menu.add_command(label="Paste", command=lambda: self.asset_list.listbox.event_generate("<<Paste>>"), accelerator="Ctrl+V")
         edit_menu.add_separator()
-        edit_menu.add_command(label="Select All", command=lambda: self.asset_list.event_generate("<Control-a>"), accelerator="Ctrl+A")
-        edit_menu.add_command(label="Select None", command=lambda: self.asset_list.event_generate("<Control-d>"), accelerator="Ctrl+D")
+        edit_menu.add_command(label="Select All", command=lambda: self.asset_list.listbox.event_generate("<Control-a>"), accelerator="Ctrl+A")
+        edit_menu.add_command(label="Select None", command=lambda: self.asset_list.listbox.event_generate("<Control-d>"), accelerator="Ctrl+D")
         menubar.add_cascade(label="Edit", menu=edit_menu)
 
+        sort_menu = Menu(menubar, tearoff=0)
+        sort_menu.add_radiobutton(label="Path", variable=self.rank, value="path", command=self.apply_filter)
+        sort_menu.add_radiobutton(label="Depth", variable=self.rank, value="depth", command=self.apply_filter)
+        sort_menu.add_radiobutton(label="Size", variable=self.rank, value="size", command=self.apply_filter)
+        sort_menu.add_radiobutton(label="Reclaimable Size", variable=self.rank, value="reclaimable",
+                                  command=self.apply_filter)
+        menubar.add_cascade(label="Sort By", menu=sort_menu)
+
         help = Menu(menubar, tearoff=0)
         def show_about_box():
             messagebox.showinfo(self.title, "Some message here ...")
@@ -539,75 +1423,126 @@ class App:
         self.root.config(menu=menubar)
 
     def setup_asset_list(self):
-        self.scrollbar = Scrollbar(self.root)
-        self.scrollbar.pack(side=RIGHT, fill=Y)
-
-        # Add text area
-        """
-        self.text = Text(self.root, height=8)
-        self.text.config(font=self.main_font)
-        self.text.pack(expand=True, fill="both")
-        """
         def on_right_click(event):
-            self.asset_list.selection_clear(0, END)
-            #self.asset_list.selection_set(self.asset_list.nearest(event.y))
-            #self.asset_list.activate(self.asset_list.nearest(event.y))
+            self.asset_list.select_none()
         def on_copy(event):
             self.root.clipboard_clear()
-            for index in self.asset_list.curselection():
-                self.root.clipboard_append(self.asset_list.get(index) + "\n")
+            for asset in self.asset_list.get_selected():
+                self.root.clipboard_append(asset + "\n")
         def on_cut(event):
             on_copy(event)
-            for index in self.asset_list.curselection()[::-1]:
-                self.asset_list.delete(index)
+            self.asset_list.remove_selected()
         def on_select_all(event):
             # Select start to end
-            self.asset_list.select_set(0, END)
+            self.asset_list.select_all()
         def on_select_none(event):
-            self.asset_list.selection_clear(0, END)
-
-        self.asset_list = Listbox(self.root, yscrollcommand=self.scrollbar.set, selectmode="extended")
-        self.asset_list.config(font=self.main_font)
-        self.asset_list.bind("<Button-3><ButtonRelease-3>", on_right_click)
-        # self.asset_list.bind("<<ListboxSelect>>", )
-        self.asset_list.bind("<<Copy>>", on_copy)
-        self.asset_list.bind("<<Cut>>", on_cut)
-        self.asset_list.bind("<Control-a>", on_select_all)
-        self.asset_list.bind("<Control-d>", on_select_none)
+            self.asset_list.select_none()
+
+        # Only renders the rows we can see, no matter how many assets we list
+        self.asset_list = VirtualListbox(self.root, font=self.main_font)
+        self.asset_list.on_select = self.on_asset_selected
+        self.asset_list.listbox.bind("<Button-3><ButtonRelease-3>", on_right_click)
+        self.asset_list.listbox.bind("<<Copy>>", on_copy)
+        self.asset_list.listbox.bind("<<Cut>>", on_cut)
+        self.asset_list.listbox.bind("<Control-a>", on_select_all)
+        self.asset_list.listbox.bind("<Control-d>", on_select_none)
         self.asset_list.pack(expand=True, fill="both")
-        self.scrollbar.config(command=self.asset_list.yview)
-
-    def find_assets(self, asset_filter=None):
-        self.asset_list.delete(0, END)
-        _, unused_assets = self.assets.find_assets()
-        for asset in unused_assets:
-            if asset_filter:
-                if asset_filter in asset:
-                    self.asset_list.insert(END, asset)
+
+    def find_assets(self, on_finished=None):
+        """ Start scanning for unused assets, in the background (see advance_scan)
+            # on_finished: function : Called once the scan has finished (not if it's cancelled)
+        """
+        if self.scan:
+            return
+        self.asset_list.set_items(list())
+
+        # Offer to finish a removal that was interrupted last time
+        if self.assets.load_removal_checkpoint():
+            if messagebox.askyesno(self.title, "A previous asset removal was interrupted. Resume it now?"):
+                self.assets.remove()
             else:
-                self.asset_list.insert(END, asset)
+                self.assets.save_removal_checkpoint(None)
+
+        self.scan = self.assets.scan_assets()
+        self.scan_progress = (0, 0)
+        self.scan_refresh_time = time.time()
+        self.on_scan_finished = on_finished
+        self.cancel_btn.config(state=NORMAL)
+        self.status.set("Finding the assets of {} ...".format(self.assets.mod_path))
+
+    def advance_scan(self, budget_seconds=SCAN_BUDGET_SECONDS):
+        """ Scan packages until this frame's budget is spent, listing partial results now and then """
+        deadline = time.time() + budget_seconds
+        try:
+            while time.time() < deadline:
+                self.scan_progress = next(self.scan)
+        except StopIteration:
+            self.finish_scan()
+            return
+        except Exception:
+            print(traceback.format_exc())
+            self.cancel_scan()
+            return
 
-        # self.text.insert("1.0", "\n".join(list(unused_assets)))
-        # self.text["state"] = "disabled"
-        # dirr = fd.askdirectory(initialdir=downloads_dir)
+        if time.time() - self.scan_refresh_time > SCAN_REFRESH_SECONDS:
+            self.scan_refresh_time = time.time()
+            self.show_scan_progress()
+
+    def show_scan_progress(self):
+        scanned, total = self.scan_progress
+        used, unused = self.assets.get_scan_results()
+        self.status.set("Scanned {} of {} packages ({:.0%}): {} used, {} unused so far ...".format(
+            scanned, total, float(scanned) / total if total else 0, len(used), len(unused)))
+        # (Filtering is only applied once the scan has finished)
+        if self.current_view == "used":
+            self.asset_list.set_items(used)
+        elif self.current_view == "unused":
+            self.asset_list.set_items(unused)
+        else:
+            self.asset_list.set_items(self.assets.scan_packages[:scanned])
+
+    def finish_scan(self):
+        self.scan = None
+        self.cancel_btn.config(state=DISABLED)
+        # (listing them shows their totals)
+        self.invalidate_views()
+        self.show_unused()
+        on_finished = self.on_scan_finished
+        self.on_scan_finished = None
+        if on_finished:
+            on_finished()
+
+    def cancel_scan(self):
+        if not self.scan:
+            return
+        # Stops the scan right away (saving what it has looked up)
+        self.scan.close()
+        self.scan = None
+        self.on_scan_finished = None
+        self.cancel_btn.config(state=DISABLED)
+        self.asset_list.set_items(list())
+        scanned, total = self.scan_progress
+        self.status.set("Cancelled after scanning {} of {} packages".format(scanned, total))
+        print("[!] Cancelled searching for unused assets")
 
     def remove_listed(self):
         # Get all assets listed in the asset_list
-        listed_assets = set()
-        for index in range(0, self.asset_list.size()):
-            listed_assets.add(self.asset_list.get(index))
-        print(listed_assets)
-        self.assets.remove(listed_assets)
-        exit(0)
+        self.remove_assets(set(self.asset_list.get_items()))
 
     def remove_selected(self):
         # Get assets selected in the asset_list
-        selected_assets = set()
-        for index in self.asset_list.curselection():
-            selected_assets.add(self.asset_list.get(index))
-        print(selected_assets)
-        self.assets.remove(selected_assets)
-        exit(0)
+        self.remove_assets(set(self.asset_list.get_selected()))
+
+    def remove_assets(self, assets):
+        # What's unused isn't known until the scan has finished
+        if self.scan:
+            messagebox.showinfo(self.title, "Please wait for the dependency scan to finish ...")
+            return
+        # Remove the assets, then update what we list
+        removed = self.assets.remove(assets)
+        self.assets.forget_packages(removed)
+        self.invalidate_views()
+        self.apply_filter()
 
     def display_data_grid(self, data, title="Data", geometry="750x250"):
         popup_window = CustomToplevel(self.root, self.root)
@@ -660,121 +1595,6 @@ class App:
         self.root.focus_set()
         textbox.focus_set()
 
-    #Define a function to open the Popup Dialogue
-    def display_dependencies_box(self):
-        dependency_lists = list()
-        dependency_selection_window = CustomToplevel(self.root, self.root)
-        dependency_selection_window.geometry("420x640")
-        dependency_selection_window.resizable(height=True, width=None)
-
-        def on_select_all(event):
-            # Select start to end
-            for dl in dependency_lists:
-                dl.listbox.select_set(0, END)
-        def on_select_none(event):
-            for dl in dependency_lists:
-                dl.listbox.selection_clear(0, END)
-        dependency_selection_window.bind("<Control-a>", on_select_all)
-        dependency_selection_window.bind("<Control-d>", on_select_none)
-
-        frame = Frame(dependency_selection_window)
-        canvas = Canvas(frame)
-        scrollbar = Scrollbar(frame, orient="vertical", command=canvas.yview)
-        frame.scrollable_frame = Frame(canvas)
-        frame.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-
-        def on_open_selected_assets():
-            selected_assets = [a for dl in dependency_lists for a in dl.get_selected()]
-            if len(selected_assets) > 0:
-                assets = list()
-                for selected_asset in selected_assets:
-                    assets.append(unreal.load_asset(selected_asset))
-                editor_subsystem.open_editor_for_assets(assets)
-                self.dependency_selection_window.destroy()
-                self.dependency_selection_window.update()
-            else:
-                messagebox.showinfo("ERROR", "Please select a mod path to continue ...")
-
-        # Add mod paths to selection window
-        for dependency, referencers in self.assets.dependencies.items():
-            d = DependencyList(
-                frame.scrollable_frame, self, referencers, text=dependency,
-                wraplength=132, justify="left"
-            )
-            dependency_lists.append(d)
-            d.pack(expand=False, side="left", fill="x")
-            d.listbox.pack(expand=True, fill="x")
-
-        #frame.scrollable_frame.pack(expand=False, fill="x")
-        #frame.pack(expand=True, fill="both")
-
-        Label(frame.scrollable_frame, text=" "*132).pack(expand=True, fill="x")
-        frame.scrollable_frame.pack(expand=True, fill="both")
-        frame.pack(expand=True, fill="both")
-        canvas.create_window((0, 0), window=frame.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.pack(side=LEFT, fill="both", expand=True)
-        scrollbar.pack(side=RIGHT, fill="y")
-
-        # Add selection button
-        btn = Button(dependency_selection_window, text="Open Selected", command=on_open_selected_assets)
-        btn.config(font=self.main_font)
-        btn.pack(expand=False, fill="x")
-
-        #Create a Button Widget in the Toplevel Window
-        #button= Button(top, text="Ok", command=lambda:close_win(top))
-        #button.pack(pady=5, side= TOP)
-
-    def old_di(self):
-        dependency_selection_window = CustomToplevel(self.root, self.root)
-        dependency_selection_window.geometry("420x420")
-        frame = ScrollableFrame(dependency_selection_window)
-        """
-        for i in range(50):
-            l = Label(frame.scrollable_frame, text="Sample scrolling label")
-            l.pack(expand=True, fill="x")
-        """
-        # Pack the scrollable frame
-
-        dependency_lists = list()
-        def on_open_selected_assets():
-            selected_assets = [a for dl in dependency_lists for a in dl.get_selected()]
-            if len(selected_assets) > 0:
-                assets = list()
-                for selected_asset in selected_assets:
-                    assets.append(unreal.load_asset(selected_asset))
-                asset_tools.open_editor_for_assets(assets)
-                self.dependency_selection_window.destroy()
-                self.dependency_selection_window.update()
-            else:
-                messagebox.showinfo("ERROR", "Please select a mod path to continue ...")
-
-        # Add mod paths to selection window
-        for dependency, referencers in self.assets.dependencies.items():
-            dependency_lists.append(
-                DependencyList(
-                    frame.scrollable_frame, self, referencers, text=dependency,
-                    wraplength=132, justify="left"
-                ))
-
-        #frame.scrollable_frame.pack(expand=False, fill="x")
-        #frame.pack(expand=True, fill="both")
-
-        # Add selection button
-        btn = Button(dependency_selection_window, text="Open Selected", command=on_open_selected_assets)
-        btn.config(font=self.main_font)
-        btn.pack(expand=False, fill="x")
-
-        #Create a Button Widget in the Toplevel Window
-        #button= Button(top, text="Ok", command=lambda:close_win(top))
-        #button.pack(pady=5, side= TOP)
-
-
     #Define a function to open the Popup Dialogue
     def display_mod_path_selection(self):
 
@@ -788,6 +1608,7 @@ class App:
                 self.assets.set_mod_path(selected_mod_path)
                 self.mod_path_selection_window.destroy()
                 self.mod_path_selection_window.update()
+                self.find_assets()
                 # self.show_dependencies()
             else:
                 messagebox.showinfo("ERROR", "Please select a mod path to continue ...")
@@ -818,7 +1639,7 @@ def main():
     try:
         app.run()
     except Exception:
-        app.running = False
+        app.host.remove_window(app.root)
         print(traceback.format_exc())
 
 if __name__ == "__main__":
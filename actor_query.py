@@ -0,0 +1,251 @@
+# Unreal Python module
+# Select, hide, group or move actors matching a small query language.
+#
+# A query is a list of clauses, ALL of which an actor has to match. A clause
+# is "key:value", where the value may be a comma-separated list (ANY of
+# which has to match), and a leading "-" negates the clause:
+#
+#   class:StaticMeshActor         actors of this class (or a subclass)
+#   name:prop_*                   object name glob (case-insensitive)
+#   label:Wall*                   label (World Outliner name) glob (case-insensitive)
+#   mesh:prop_target_             static mesh name starts with this
+#   mat:tools                     a material name starts with this
+#   matcontains:_flesh_           a material name contains this
+#   tag:Destructible              actor has this tag
+#   level:Checkpoint_Sublevel     actor is in this (sub)level
+#   near:X,Y,Z,RADIUS             actor is within RADIUS of X, Y, Z
+#   * (or all)                    every actor
+#
+#   >>> import actor_query
+#   >>> actor_query.select("class:StaticMeshActor mesh:prop_ -mat:tools")
+#   >>> actor_query.hide("matcontains:_flesh_", group="Mannequins", folder="Mannequins")
+#
+# Queries compile into a list of tests, cheapest first, run in a single
+# pass over the level's actors. What we read from each actor (its mesh,
+# materials, ...) is only read once per query -- pass the same ActorSnapshot
+# to several queries to share those reads while the actors don't change:
+#
+#   >>> snapshot = actor_query.ActorSnapshot()
+#   >>> walls = actor_query.query("mesh:wall_", snapshot=snapshot)
+#   >>> trims = actor_query.query("mesh:wall_ mat:trim", snapshot=snapshot)
+import fnmatch
+import math
+import time
+
+import unreal
+
+# Test order: clauses which only need cheap bridge calls go first,
+# so expensive ones (components, materials) run on fewer actors
+CLAUSE_COSTS = {
+    "class": 0,
+    "name": 1,
+    "label": 1,
+    "tag": 2,
+    "level": 2,
+    "near": 2,
+    "mesh": 3,
+    "mat": 4,
+    "matcontains": 4,
+}
+
+
+class ActorRecord:
+    """ What we've read from an actor so far (each property is read at most once) """
+
+    def __init__(self, actor):
+        self.actor = actor
+        self.values = dict()
+
+    def get(self, key, read):
+        if key not in self.values:
+            self.values[key] = read(self.actor)
+        return self.values[key]
+
+    @property
+    def name(self):
+        return self.get("name", lambda actor: actor.get_name().lower())
+
+    @property
+    def label(self):
+        return self.get("label", lambda actor: actor.get_actor_label().lower())
+
+    @property
+    def tags(self):
+        return self.get("tags", lambda actor: set(str(tag) for tag in actor.tags))
+
+    @property
+    def level(self):
+        # Actor -> Level -> World (named after its (sub)level)
+        return self.get("level", lambda actor: actor.get_outer().get_outer().get_name().lower())
+
+    @property
+    def location(self):
+        return self.get("location", lambda actor: actor.get_actor_location())
+
+    @property
+    def static_mesh_component(self):
+        return self.get("static_mesh_component", lambda actor: actor.get_component_by_class(unreal.StaticMeshComponent)
+                        if isinstance(actor, unreal.StaticMeshActor) else None)
+
+    @property
+    def mesh_name(self):
+        def read(actor):
+            component = self.static_mesh_component
+            return component.static_mesh.get_name() if component and component.static_mesh else None
+        return self.get("mesh_name", read)
+
+    @property
+    def material_names(self):
+        def read(actor):
+            # (actors without a mesh show no materials)
+            if not self.mesh_name:
+                return list()
+            return [mat.get_name() for mat in self.static_mesh_component.get_materials() or [] if mat]
+        return self.get("material_names", read)
+
+
+class ActorSnapshot:
+    """ Records of the level's actors, which queries given this snapshot share """
+
+    def __init__(self):
+        # Actor -> ActorRecord
+        self.records = dict()
+
+    def get_records(self, actors=None):
+        """ Return the records of these actors (default: every actor in the level) """
+        actors = actors if actors is not None else unreal.EditorLevelLibrary.get_all_level_actors()
+        records = list()
+        for actor in actors:
+            record = self.records.get(actor)
+            if record is None:
+                record = self.records[actor] = ActorRecord(actor)
+            records.append(record)
+        return records
+
+    def refresh(self, actors=None):
+        """ Forget what we've read from these actors (default: all of them) """
+        if actors is None:
+            self.records.clear()
+        else:
+            for actor in actors:
+                self.records.pop(actor, None)
+
+
+def compile_clause(clause):
+    """ Return (cost, test(record) -> bool) for a "key:value" clause """
+    negate = clause.startswith("-")
+    key, _, value = clause.lstrip("-").partition(":")
+    key = key.lower()
+    if key not in CLAUSE_COSTS or not value:
+        raise ValueError("Unknown query clause: {} (see actor_query.py for the syntax)".format(clause))
+    values = [v for v in value.split(",") if v]
+
+    if key == "class":
+        classes = tuple(getattr(unreal, v) for v in values)
+        test = lambda record: isinstance(record.actor, classes)
+    elif key in ("name", "label"):
+        patterns = [v.lower() for v in values]
+        test = lambda record: any(fnmatch.fnmatchcase(getattr(record, key), p) for p in patterns)
+    elif key == "tag":
+        test = lambda record: any(v in record.tags for v in values)
+    elif key == "level":
+        levels = set(v.lower() for v in values)
+        test = lambda record: record.level in levels
+    elif key == "near":
+        if len(values) != 4:
+            raise ValueError("near: needs X,Y,Z,RADIUS, not {}".format(value))
+        x, y, z, radius = [float(v) for v in values]
+
+        def test(record):
+            location = record.location
+            return math.sqrt((location.x - x) ** 2 + (location.y - y) ** 2 + (location.z - z) ** 2) <= radius
+    elif key == "mesh":
+        prefixes = tuple(values)
+        test = lambda record: bool(record.mesh_name) and record.mesh_name.startswith(prefixes)
+    elif key == "mat":
+        prefixes = tuple(values)
+        test = lambda record: any(name.startswith(prefixes) for name in record.material_names)
+    else:
+        test = lambda record: any(v in name for name in record.material_names for v in values)
+
+    if negate:
+        return CLAUSE_COSTS[key], lambda record: not test(record)
+    return CLAUSE_COSTS[key], test
+
+
+def compile_query(expression):
+    """ Return the tests (cheapest first) of a query, or an empty list for "*"/"all" """
+    clauses = expression.split()
+    if not clauses or clauses == ["*"] or [c.lower() for c in clauses] == ["all"]:
+        return list()
+    compiled = [compile_clause(clause) for clause in clauses]
+    compiled.sort(key=lambda c: c[0])
+    return [test for cost, test in compiled]
+
+
+def query(expression, actors=None, snapshot=None):
+    """ Return the actors matching a query
+        # expression: str : Query (see the top of this module)
+        # actors: obj List unreal.Actor : Actors to look at. If None, will use every actor in the level
+        # snapshot: obj ActorSnapshot : Reuse what earlier queries read from the actors.
+        #                               If None, actors are read from scratch
+        return: obj List unreal.Actor
+    """
+    start_time = time.time()
+    tests = compile_query(expression)
+    records = (snapshot if snapshot is not None else ActorSnapshot()).get_records(actors)
+    matches = [record.actor for record in records if all(test(record) for test in tests)]
+    print("[*] {} of {} actors match \"{}\" ({:.3f}s)".format(len(matches), len(records), expression, time.time() - start_time))
+    return matches
+
+
+def select(expression, actors=None, snapshot=None):
+    """ Select the actors matching a query (replacing the selection) """
+    matches = query(expression, actors, snapshot)
+    unreal.EditorLevelLibrary.set_selected_level_actors(matches)
+    return matches
+
+
+def hide(expression, actors=None, group=None, folder=None, snapshot=None):
+    """ Hide the actors matching a query in-game (with Undo support), optionally
+        grouping them and/or moving them to a World Outliner folder
+    """
+    matches = query(expression, actors, snapshot)
+    with unreal.ScopedEditorTransaction("Hide Actors (in-game)"):
+        for actor in matches:
+            actor.set_actor_hidden_in_game(True)
+    if group:
+        group_actors(matches, group)
+    if folder:
+        move_actors_to_folder(matches, folder)
+    return matches
+
+
+def group_actors(actors, name):
+    with unreal.ScopedEditorTransaction("Group Actors"):
+        unreal.ActorGroupingUtils(name=name).group_actors(actors)
+
+
+def move_actors_to_folder(actors, folder_name):
+    with unreal.ScopedEditorTransaction("Move Actors to Folder"):
+        for actor in actors:
+            if not actor:
+                continue
+            try:
+                actor.set_folder_path(folder_name)
+            except Exception as ex:
+                print(ex)
+
+
+def group(expression, name, actors=None, snapshot=None):
+    """ Group the actors matching a query """
+    matches = query(expression, actors, snapshot)
+    group_actors(matches, name)
+    return matches
+
+
+def folder(expression, folder_name, actors=None, snapshot=None):
+    """ Move the actors matching a query to a World Outliner folder """
+    matches = query(expression, actors, snapshot)
+    move_actors_to_folder(matches, folder_name)
+    return matches
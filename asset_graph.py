@@ -0,0 +1,451 @@
+# Python module (no Unreal dependency)
+# Package dependency graph used by AssetCleaner to find unused assets.
+#
+# Package names are interned to integer IDs the first time we see them,
+# and edges are kept in per-node adjacency lists in both directions
+# (dependencies and referencers). Finding everything a set of roots
+# (maps, scenarios, ...) uses is then a single breadth-first search,
+# linear in the number of packages and edges.
+#
+# AssetGraph.write exports the graph to a compact binary file which
+# CompactAssetGraph reads back without Unreal (see asset_graph_cli.py):
+#
+#   header       magic, version, number of packages, edges and bytes of names
+#   names        package names (UTF-8), separated by newlines
+#   flags        1 byte per package (PACKAGE_* bits)
+#   dependencies CSR: offsets (packages + 1), target IDs and edge types (EDGE_*)
+#   referencers  CSR: offsets (packages + 1), source IDs and edge types (EDGE_*)
+#
+# All integers are little-endian.
+import array
+import struct
+import sys
+from collections import deque
+
+# Graph file header: magic, version, number of packages, edges and bytes of names
+GRAPH_FILE_MAGIC = b"DOIAGR01"
+GRAPH_FILE_VERSION = 1
+HEADER_FORMAT = "<8sIIII"
+
+# Package flags
+PACKAGE_MOD = 1
+PACKAGE_ROOT = 2
+PACKAGE_USED = 4
+
+# Edge types
+EDGE_HARD = 0
+EDGE_SOFT = 1
+EDGE_MANAGEMENT = 2
+EDGE_TYPE_NAMES = ("hard", "soft", "management")
+
+
+def write_array(f, typecode, values):
+    values = array.array(typecode, values)
+    # The file is always little-endian
+    if sys.byteorder != "little":
+        values.byteswap()
+    values.tofile(f)
+
+
+def read_array(f, typecode, count):
+    values = array.array(typecode)
+    if count:
+        values.fromfile(f, count)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def to_csr(adjacency, types):
+    """ Flatten adjacency lists (and their edge types) into (offsets, IDs, types) arrays """
+    offsets = array.array("I", [0])
+    ids = array.array("I")
+    flat_types = array.array("B")
+    for package_id, adjacent_ids in enumerate(adjacency):
+        ids.extend(adjacent_ids)
+        flat_types.extend(types[package_id])
+        offsets.append(len(ids))
+    return offsets, ids, flat_types
+
+
+class AssetGraph:
+
+    def __init__(self):
+        # Package name -> ID
+        self.ids = dict()
+        # ID -> package name
+        self.names = list()
+        # ID -> IDs of the packages it depends on / that reference it
+        self.dependencies = list()
+        self.referencers = list()
+        self.edge_count = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, package_name):
+        return package_name in self.ids
+
+    def add_package(self, package_name):
+        """ Return the ID of a package, adding it to the graph if it's new """
+        package_id = self.ids.get(package_name)
+        if package_id is None:
+            package_id = len(self.names)
+            self.ids[package_name] = package_id
+            self.names.append(package_name)
+            self.dependencies.append(list())
+            self.referencers.append(list())
+        return package_id
+
+    def add_dependencies(self, package_name, dependency_names):
+        """ Add edges from a package to every package it depends on (duplicates are skipped) """
+        package_id = self.add_package(package_name)
+        dependencies = self.dependencies[package_id]
+        known = set(dependencies)
+        for dependency_name in dependency_names:
+            dependency_id = self.add_package(dependency_name)
+            if dependency_id in known or dependency_id == package_id:
+                continue
+            known.add(dependency_id)
+            dependencies.append(dependency_id)
+            self.referencers[dependency_id].append(package_id)
+            self.edge_count += 1
+
+    def get_id(self, package_name):
+        return self.ids.get(package_name)
+
+    def get_reachable(self, root_ids):
+        """ Return a bytearray flagging (1) every package reachable from the roots """
+        reachable = bytearray(len(self.names))
+        queue = deque()
+        for root_id in root_ids:
+            if not reachable[root_id]:
+                reachable[root_id] = 1
+                queue.append(root_id)
+
+        dependencies = self.dependencies
+        while queue:
+            for dependency_id in dependencies[queue.popleft()]:
+                if not reachable[dependency_id]:
+                    reachable[dependency_id] = 1
+                    queue.append(dependency_id)
+        return reachable
+
+    def extend_reachable(self, reachable, package_ids):
+        """ Add these packages, and everything reachable from them, to a set of reachable IDs.
+            Lets a scan keep its reachable set up to date while the graph is still growing:
+            call it again for a reachable package whenever it gains dependencies
+        """
+        queue = deque(package_ids)
+        reachable.update(package_ids)
+        dependencies = self.dependencies
+        while queue:
+            for dependency_id in dependencies[queue.popleft()]:
+                if dependency_id not in reachable:
+                    reachable.add(dependency_id)
+                    queue.append(dependency_id)
+
+    def get_shortest_path(self, source_ids, target_id):
+        """ Return the shortest chain of IDs (following dependencies) from
+            any of the sources to the target, or None if it can't be reached
+        """
+        parents = dict()
+        queue = deque()
+        for source_id in source_ids:
+            if source_id not in parents:
+                parents[source_id] = None
+                queue.append(source_id)
+
+        while queue:
+            package_id = queue.popleft()
+            if package_id == target_id:
+                path = list()
+                while package_id is not None:
+                    path.append(package_id)
+                    package_id = parents[package_id]
+                return path[::-1]
+            for dependency_id in self.dependencies[package_id]:
+                if dependency_id not in parents:
+                    parents[dependency_id] = package_id
+                    queue.append(dependency_id)
+        return None
+
+    def get_exclusive_sizes(self, package_ids, sizes):
+        """ Return {ID: bytes freed by deleting that package} for a set of (unused) packages:
+            its own size, plus the size of everything which is only referenced through it.
+            That's the size of its subtree in the dominator tree of the packages (with every
+            package nothing else references as an entry), so cycles only it leads to are included
+            # package_ids: obj Set int : Packages to look at (edges to other packages are ignored)
+            # sizes: dict : ID -> size (bytes)
+        """
+        package_ids = set(package_ids)
+        root = -1
+
+        # Iterative depth-first search from a virtual root, linked to every package
+        # nothing references (then to one package of each cycle we still can't reach)
+        entries = [i for i in sorted(package_ids) if not any(r in package_ids for r in self.referencers[i])]
+        entry_set = set(entries)
+        order = dict()
+        postorder = list()
+        visited = set()
+
+        def visit(start_id):
+            visited.add(start_id)
+            stack = [(start_id, iter(self.dependencies[start_id]))]
+            while stack:
+                package_id, dependencies = stack[-1]
+                for dependency_id in dependencies:
+                    if dependency_id in package_ids and dependency_id not in visited:
+                        visited.add(dependency_id)
+                        stack.append((dependency_id, iter(self.dependencies[dependency_id])))
+                        break
+                else:
+                    stack.pop()
+                    order[package_id] = len(postorder)
+                    postorder.append(package_id)
+
+        for entry_id in entries:
+            if entry_id not in visited:
+                visit(entry_id)
+        for package_id in sorted(package_ids):
+            if package_id not in visited:
+                entry_set.add(package_id)
+                visit(package_id)
+        order[root] = len(postorder)
+
+        # Immediate dominators (Cooper, Harvey and Kennedy), in reverse postorder
+        idom = {root: root}
+
+        def intersect(a, b):
+            while a != b:
+                while order[a] < order[b]:
+                    a = idom[a]
+                while order[b] < order[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for package_id in reversed(postorder):
+                predecessors = [r for r in self.referencers[package_id] if r in package_ids and r in idom]
+                if package_id in entry_set:
+                    predecessors.append(root)
+                new_idom = predecessors[0]
+                for predecessor in predecessors[1:]:
+                    new_idom = intersect(predecessor, new_idom)
+                if idom.get(package_id) != new_idom:
+                    idom[package_id] = new_idom
+                    changed = True
+
+        # Postorder visits every package before whatever dominates it
+        exclusive_sizes = dict((package_id, sizes.get(package_id, 0)) for package_id in package_ids)
+        for package_id in postorder:
+            parent_id = idom[package_id]
+            if parent_id != root:
+                exclusive_sizes[parent_id] += exclusive_sizes[package_id]
+        return exclusive_sizes
+
+    def write(self, path, flags=None, edge_types=None):
+        """ Write the graph to a compact binary file (see the top of this module)
+            # flags: obj List int : PACKAGE_* bits of each package (default: none)
+            # edge_types: dict : Package ID -> EDGE_* type of each of its dependencies (default: EDGE_HARD)
+        """
+        edge_types = edge_types if edge_types else dict()
+        dependency_types = [edge_types.get(package_id) or [EDGE_HARD] * len(dependency_ids)
+                            for package_id, dependency_ids in enumerate(self.dependencies)]
+        # Referencers get the type of the edge they're the source of
+        # (one pass over every edge: referencer ID -> type, per package)
+        types_by_referencer = [dict() for _ in self.names]
+        for package_id, dependency_ids in enumerate(self.dependencies):
+            for dependency_id, edge_type in zip(dependency_ids, dependency_types[package_id]):
+                types_by_referencer[dependency_id].setdefault(package_id, edge_type)
+        referencer_types = [[types_by_referencer[package_id][referencer_id] for referencer_id in referencer_ids]
+                            for package_id, referencer_ids in enumerate(self.referencers)]
+
+        names = "\n".join(self.names).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, GRAPH_FILE_MAGIC, GRAPH_FILE_VERSION,
+                                len(self.names), self.edge_count, len(names)))
+            f.write(names)
+            write_array(f, "B", flags if flags is not None else bytearray(len(self.names)))
+            for csr in (to_csr(self.dependencies, dependency_types), to_csr(self.referencers, referencer_types)):
+                for typecode, values in zip(("I", "I", "B"), csr):
+                    write_array(f, typecode, values)
+
+    def mark_and_sweep(self, root_ids, candidate_ids=None):
+        """ Return (used, unused) package names among the candidates (default: every package) """
+        reachable = self.get_reachable(root_ids)
+        candidate_ids = candidate_ids if candidate_ids is not None else range(len(self.names))
+        used = set()
+        unused = set()
+        for package_id in candidate_ids:
+            if reachable[package_id]:
+                used.add(self.names[package_id])
+            else:
+                unused.add(self.names[package_id])
+        return used, unused
+
+
+class CompactAssetGraph:
+    """ Read-only graph loaded from a file written by AssetGraph.write """
+
+    def __init__(self, names, flags, dependencies, referencers):
+        """
+        # names: obj List str : Package names, by ID
+        # flags: obj array.array : PACKAGE_* bits, by ID
+        # dependencies: (offsets, IDs, types) : CSR arrays of every package's dependencies
+        # referencers: (offsets, IDs, types) : CSR arrays of every package's referencers
+        """
+        self.names = names
+        self.ids = dict((name, package_id) for package_id, name in enumerate(names))
+        self.flags = flags
+        self.dependency_offsets, self.dependency_ids, self.dependency_types = dependencies
+        self.referencer_offsets, self.referencer_ids, self.referencer_types = referencers
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.dependency_ids)
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "rb") as f:
+            magic, version, package_count, edge_count, names_size = struct.unpack(
+                HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+            if magic != GRAPH_FILE_MAGIC or version != GRAPH_FILE_VERSION:
+                raise ValueError("%s isn't a (version %d) asset graph file" % (path, GRAPH_FILE_VERSION))
+            names = f.read(names_size).decode("utf-8").split("\n") if package_count else list()
+            flags = read_array(f, "B", package_count)
+            csrs = list()
+            for _ in range(2):
+                csrs.append((read_array(f, "I", package_count + 1), read_array(f, "I", edge_count),
+                             read_array(f, "B", edge_count)))
+        return cls(names, flags, csrs[0], csrs[1])
+
+    def find(self, text):
+        """ Return the ID of a package, by its name, its asset name (IE: T_Rock_N) or a
+            (case-insensitive) part of its name that only one package has.
+            Raises KeyError if no (or more than one) package matches
+        """
+        if text in self.ids:
+            return self.ids[text]
+        lower_text = text.lower()
+        matches = [package_id for package_id, name in enumerate(self.names)
+                   if name.lower().rsplit("/", 1)[-1] == lower_text]
+        if not matches:
+            matches = [package_id for package_id, name in enumerate(self.names) if lower_text in name.lower()]
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise KeyError("No package matches {}".format(text))
+        raise KeyError("{} packages match {}: {}{}".format(
+            len(matches), text, ", ".join(self.names[i] for i in matches[:10]), ", ..." if len(matches) > 10 else ""))
+
+    def has_flag(self, package_id, flag):
+        return bool(self.flags[package_id] & flag)
+
+    def get_ids(self, flag):
+        return [package_id for package_id, flags in enumerate(self.flags) if flags & flag]
+
+    def get_dependencies(self, package_id):
+        """ Return [(dependency ID, EDGE_* type)] """
+        start, end = self.dependency_offsets[package_id], self.dependency_offsets[package_id + 1]
+        return list(zip(self.dependency_ids[start:end], self.dependency_types[start:end]))
+
+    def get_referencers(self, package_id):
+        """ Return [(referencer ID, EDGE_* type)] """
+        start, end = self.referencer_offsets[package_id], self.referencer_offsets[package_id + 1]
+        return list(zip(self.referencer_ids[start:end], self.referencer_types[start:end]))
+
+    def get_reachable(self, root_ids, removed_id=None):
+        """ Return a bytearray flagging (1) every package reachable from the roots
+            # removed_id: int : Act as if this package didn't exist
+        """
+        reachable = bytearray(len(self.names))
+        if removed_id is not None:
+            # (never reached, never expanded)
+            reachable[removed_id] = 1
+        queue = deque()
+        for root_id in root_ids:
+            if not reachable[root_id]:
+                reachable[root_id] = 1
+                queue.append(root_id)
+
+        offsets = self.dependency_offsets
+        dependency_ids = self.dependency_ids
+        while queue:
+            package_id = queue.popleft()
+            for dependency_id in dependency_ids[offsets[package_id]:offsets[package_id + 1]]:
+                if not reachable[dependency_id]:
+                    reachable[dependency_id] = 1
+                    queue.append(dependency_id)
+        if removed_id is not None:
+            reachable[removed_id] = 0
+        return reachable
+
+    def get_shortest_path(self, source_ids, target_id):
+        """ Return the shortest chain of IDs (following dependencies) from
+            any of the sources to the target, or None if it can't be reached
+        """
+        parents = dict()
+        queue = deque()
+        for source_id in source_ids:
+            if source_id not in parents:
+                parents[source_id] = None
+                queue.append(source_id)
+
+        offsets = self.dependency_offsets
+        dependency_ids = self.dependency_ids
+        while queue:
+            package_id = queue.popleft()
+            if package_id == target_id:
+                path = list()
+                while package_id is not None:
+                    path.append(package_id)
+                    package_id = parents[package_id]
+                return path[::-1]
+            for dependency_id in dependency_ids[offsets[package_id]:offsets[package_id + 1]]:
+                if dependency_id not in parents:
+                    parents[dependency_id] = package_id
+                    queue.append(dependency_id)
+        return None
+
+    def get_delete_impact(self, package_id):
+        """ Return the IDs of the mod packages which would become unused if this package was deleted """
+        root_ids = self.get_ids(PACKAGE_ROOT)
+        before = self.get_reachable(root_ids)
+        # (a deleted root is neither a root nor reachable anymore)
+        after = self.get_reachable(root_ids, removed_id=package_id)
+        # The deleted package itself isn't "left" unused
+        return [i for i in self.get_ids(PACKAGE_MOD)
+                if i != package_id and before[i] and not after[i]]
+
+    def get_unreachable_components(self):
+        """ Return the groups of unused mod packages which only reference (or are referenced by)
+            each other, as lists of IDs, largest first
+        """
+        reachable = self.get_reachable(self.get_ids(PACKAGE_ROOT))
+        unreachable = set(i for i in self.get_ids(PACKAGE_MOD) if not reachable[i])
+        components = list()
+        visited = set()
+        for start_id in sorted(unreachable):
+            if start_id in visited:
+                continue
+            visited.add(start_id)
+            component = [start_id]
+            queue = deque([start_id])
+            while queue:
+                package_id = queue.popleft()
+                for offsets, ids in ((self.dependency_offsets, self.dependency_ids),
+                                     (self.referencer_offsets, self.referencer_ids)):
+                    for other_id in ids[offsets[package_id]:offsets[package_id + 1]]:
+                        if other_id in unreachable and other_id not in visited:
+                            visited.add(other_id)
+                            component.append(other_id)
+                            queue.append(other_id)
+            components.append(component)
+        components.sort(key=lambda component: -len(component))
+        return components
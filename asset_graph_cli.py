@@ -0,0 +1,113 @@
+# Python script (no Unreal dependency)
+# Answer questions about a mod's assets from a graph exported by AssetCleaner
+# (Actions > Export Dependency Graph), without the editor.
+#
+# Usage:
+#   python asset_graph_cli.py <graph.bin> stats
+#   python asset_graph_cli.py <graph.bin> referencers <package>
+#   python asset_graph_cli.py <graph.bin> why <package> [--from <map>]
+#   python asset_graph_cli.py <graph.bin> delete-impact <package>
+#   python asset_graph_cli.py <graph.bin> unreachable [-n 10]
+#
+# Packages can be given by their full name or any (case-insensitive) part
+# of it that only one package has, IE: "T_Rock_01_N".
+import argparse
+import sys
+import time
+
+from asset_graph import (CompactAssetGraph, EDGE_TYPE_NAMES, PACKAGE_MOD, PACKAGE_ROOT, PACKAGE_USED)
+
+
+def describe(graph, package_id):
+    flags = [name for flag, name in ((PACKAGE_ROOT, "root"), (PACKAGE_USED, "used"), (PACKAGE_MOD, "mod"))
+             if graph.has_flag(package_id, flag)]
+    return "{} ({})".format(graph.names[package_id], ", ".join(flags) if flags else "external")
+
+
+def show_stats(graph, args):
+    print("[*] {} packages ({} in the mod, {} roots, {} used), {} dependencies".format(
+        len(graph), len(graph.get_ids(PACKAGE_MOD)), len(graph.get_ids(PACKAGE_ROOT)),
+        len(graph.get_ids(PACKAGE_USED)), graph.edge_count))
+
+
+def show_referencers(graph, args):
+    package_id = graph.find(args.package)
+    referencers = graph.get_referencers(package_id)
+    print("[*] {} is referenced by {} packages:".format(describe(graph, package_id), len(referencers)))
+    for referencer_id, edge_type in sorted(referencers, key=lambda r: graph.names[r[0]]):
+        print("    {} [{}]".format(describe(graph, referencer_id), EDGE_TYPE_NAMES[edge_type]))
+
+
+def show_why(graph, args):
+    package_id = graph.find(args.package)
+    source_ids = [graph.find(args.source)] if args.source else graph.get_ids(PACKAGE_ROOT)
+    path = graph.get_shortest_path(source_ids, package_id)
+    if not path:
+        print("[!] {} can't be reached from {}".format(
+            graph.names[package_id], graph.names[source_ids[0]] if args.source else "any map or scenario"))
+        return
+    print("[*] {} is used through {} references:".format(graph.names[package_id], len(path) - 1))
+    for depth, path_id in enumerate(path):
+        print("    {}{}".format("  " * depth, describe(graph, path_id)))
+
+
+def show_delete_impact(graph, args):
+    package_id = graph.find(args.package)
+    impact = graph.get_delete_impact(package_id)
+    print("[*] Deleting {} would leave {} more mod packages unused:".format(graph.names[package_id], len(impact)))
+    for impact_id in sorted(impact, key=lambda i: graph.names[i]):
+        print("    {}".format(graph.names[impact_id]))
+
+
+def show_unreachable(graph, args):
+    components = graph.get_unreachable_components()
+    print("[*] {} unused mod packages in {} groups, the largest {}:".format(
+        sum(len(component) for component in components), len(components), min(args.count, len(components))))
+    for component in components[:args.count]:
+        names = sorted(graph.names[i] for i in component)
+        print("    {} packages: {}{}".format(len(names), ", ".join(names[:5]), ", ..." if len(names) > 5 else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a mod's asset dependency graph outside of the editor")
+    parser.add_argument("graph_file", help="File written by AssetCleaner's Export Dependency Graph")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    command = commands.add_parser("stats", help="Count packages and dependencies")
+    command.set_defaults(function=show_stats)
+
+    command = commands.add_parser("referencers", help="Who references a package")
+    command.add_argument("package")
+    command.set_defaults(function=show_referencers)
+
+    command = commands.add_parser("why", help="Shortest chain of references from a map/scenario to a package")
+    command.add_argument("package")
+    command.add_argument("--from", dest="source", default=None, help="Start from this package (default: every root)")
+    command.set_defaults(function=show_why)
+
+    command = commands.add_parser("delete-impact", help="What becomes unused if a package is deleted")
+    command.add_argument("package")
+    command.set_defaults(function=show_delete_impact)
+
+    command = commands.add_parser("unreachable", help="Largest groups of unused packages")
+    command.add_argument("-n", "--count", type=int, default=10, help="How many groups to list")
+    command.set_defaults(function=show_unreachable)
+
+    args = parser.parse_args()
+
+    start_time = time.time()
+    graph = CompactAssetGraph.read(args.graph_file)
+    print("[*] Loaded {} in {:.1f}ms".format(args.graph_file, 1000 * (time.time() - start_time)))
+
+    start_time = time.time()
+    try:
+        args.function(graph, args)
+    except KeyError as e:
+        print("[!] {}".format(e.args[0]))
+        sys.exit(1)
+    print("[*] Answered in {:.1f}ms".format(1000 * (time.time() - start_time)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Unreal Python module
+# Export a level's collision for offline_raycast.py, and import the results back.
+#
+# export_collision writes the world-space triangles of every StaticMeshActor
+# (or just their bounding boxes), the materials of each actor and the
+# inputs of every AICoverActor to a compact binary file. After solving the
+# covers outside of the editor (python offline_raycast.py <file>),
+# import_cover_transforms applies the final location and stance of each
+# cover in a single transaction.
+import os
+import time
+
+import unreal
+
+from offline_raycast import CollisionActor, CollisionScene, CoverInput, read_cover_transforms
+
+
+def vector_to_tuple(v):
+    return (v.x, v.y, v.z)
+
+
+def get_default_collision_path(world=None):
+    """ Saved/Collision/<map name>.bin """
+    world = world if world else unreal.EditorLevelLibrary.get_editor_world()
+    return os.path.join(unreal.Paths.project_saved_dir(), "Collision", "%s.bin" % world.get_name())
+
+
+def get_box_triangles(origin, extent):
+    """ Return the 12 triangles (9 floats each, flattened) of an axis-aligned box """
+    corners = [(origin.x + sx * extent.x, origin.y + sy * extent.y, origin.z + sz * extent.z)
+               for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)]
+    # Two triangles per face, corner index == x * 4 + y * 2 + z (0: min, 1: max)
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    vertices = list()
+    for a, b, c, d in faces:
+        for i in (a, b, c, a, c, d):
+            vertices += corners[i]
+    return vertices
+
+
+def get_mesh_sections(static_mesh, lod_index=0):
+    """ Return [(local vertices as (X, Y, Z) tuples, triangle indices)] for each section of a static mesh """
+    sections = list()
+    for section_index in range(static_mesh.get_num_sections(lod_index)):
+        vertices, triangles, normals, uvs, tangents = \
+            unreal.KismetProceduralMeshLibrary.get_section_from_static_mesh(static_mesh, lod_index, section_index)
+        sections.append(([vector_to_tuple(v) for v in vertices], list(triangles)))
+    return sections
+
+
+def transform_vertices(matrix, vertices):
+    """ Transform local (X, Y, Z) tuples by a component's world matrix (row vectors, like UE4) """
+    x, y, z, w = matrix.x_plane, matrix.y_plane, matrix.z_plane, matrix.w_plane
+    return [(vx * x.x + vy * y.x + vz * z.x + w.x,
+             vx * x.y + vy * y.y + vz * z.y + w.y,
+             vx * x.z + vy * y.z + vz * z.z + w.z) for vx, vy, vz in vertices]
+
+
+def get_cover_inputs(cover_actors):
+    """ Return a CoverInput for each AICoverActor, read the same way place_nbot_covers reads them """
+    covers = list()
+    for actor in cover_actors:
+        covers.append(CoverInput(
+            actor.get_name(),
+            vector_to_tuple(actor.get_actor_location()),
+            vector_to_tuple(actor.get_actor_bounds(only_colliding_components=False)[1]),
+            vector_to_tuple(actor.get_actor_forward_vector()),
+            vector_to_tuple(actor.get_actor_right_vector()),
+            vector_to_tuple(actor.get_actor_up_vector())))
+    return covers
+
+
+def get_cover_actors(actors):
+    return [actor for actor in actors if actor.get_component_by_class(unreal.CoverComponent)]
+
+
+def export_collision(path=None, actors=None, use_bounds=False, lod_index=0):
+    """ Export the collision of a level's StaticMeshActors and its AICoverActors
+        # path: str : File to write. If None, will use Saved/Collision/<map name>.bin
+        # actors: obj List unreal.Actor : Actors to export. If None, will use every actor in the level
+        # use_bounds: bool : Export each actor's bounding box instead of its mesh triangles
+        return: str : The path we wrote to
+    """
+    path = path if path else get_default_collision_path()
+    actors = actors if actors else unreal.EditorLevelLibrary.get_all_level_actors()
+    start_time = time.time()
+
+    scene = CollisionScene(covers=get_cover_inputs(get_cover_actors(actors)))
+    mesh_actors = [actor for actor in actors if isinstance(actor, unreal.StaticMeshActor)]
+
+    # Many actors share a mesh -- only read each mesh's sections once
+    mesh_sections = dict()
+
+    with unreal.ScopedSlowTask(len(mesh_actors), "Exporting collision ...") as slow_task:
+        slow_task.make_dialog(True)
+        for actor in mesh_actors:
+            if slow_task.should_cancel():
+                print("[!] Cancelled collision export")
+                return None
+            slow_task.enter_progress_frame(1, "Exporting collision of %s" % actor.get_name())
+
+            static_mesh_component = actor.get_component_by_class(unreal.StaticMeshComponent)
+            if not static_mesh_component or not static_mesh_component.static_mesh:
+                continue
+
+            actor_id = len(scene.actors)
+            materials = [mat.get_name() for mat in static_mesh_component.get_materials() if mat]
+            scene.actors.append(CollisionActor(actor.get_name(), materials))
+
+            if use_bounds:
+                vertices = get_box_triangles(*actor.get_actor_bounds(only_colliding_components=True))
+            else:
+                static_mesh = static_mesh_component.static_mesh
+                mesh_path = static_mesh.get_path_name()
+                if mesh_path not in mesh_sections:
+                    mesh_sections[mesh_path] = get_mesh_sections(static_mesh, lod_index)
+
+                matrix = static_mesh_component.get_world_transform().to_matrix()
+                vertices = list()
+                for local_vertices, triangles in mesh_sections[mesh_path]:
+                    world_vertices = transform_vertices(matrix, local_vertices)
+                    for index in triangles:
+                        vertices += world_vertices[index]
+
+            scene.vertices.extend(vertices)
+            scene.triangle_actors.extend([actor_id] * (len(vertices) // 9))
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    scene.write(path)
+
+    print("[*] Exported %d actors (%d triangles) and %d covers to %s in %.3fs" % (
+        len(scene.actors), scene.triangle_count, len(scene.covers), path, time.time() - start_time))
+    return path
+
+
+def import_cover_transforms(path, actors=None):
+    """ Apply the cover transforms written by offline_raycast.py to their AICoverActors
+        # path: str : File written by offline_raycast.py
+        # actors: obj List unreal.Actor : Actors to look for covers in. If None, will use every actor in the level
+    """
+    transforms = read_cover_transforms(path)
+    actors = actors if actors else unreal.EditorLevelLibrary.get_all_level_actors()
+    start_time = time.time()
+
+    imported = 0
+    with unreal.ScopedEditorTransaction("Import Cover Transforms"):
+        for actor in get_cover_actors(actors):
+            transform = transforms.get(actor.get_name())
+            if not transform:
+                continue
+            actor.set_actor_location(unreal.Vector(*transform["location"]), sweep=False, teleport=True)
+            cover_component = actor.get_component_by_class(unreal.CoverComponent)
+            cover_component.set_editor_property("stance", getattr(unreal.SoldierStance, transform["stance"]))
+            imported += 1
+
+    if imported < len(transforms):
+        print("[!] Couldn't find %d of the covers in %s" % (len(transforms) - imported, path))
+    print("[*] Imported %d cover transforms in %.3fs" % (imported, time.time() - start_time))
@@ -0,0 +1,200 @@
+# Python module (no Unreal dependency)
+# Probe rays used to place AICoverActors converted from nbot_cover notes.
+#
+# This is the ray geometry raycast_reposition_on_hit (setup_sandstorm_map.py)
+# casts, built up front so the rays for *every* cover can be traced in
+# batches, and a solver which turns all of a cover's probe hits into one
+# final location and stance -- without moving the actor between probes.
+# Vectors are plain (X, Y, Z) tuples.
+from collections import namedtuple
+
+# Heights (0 == feet, 1 == head) we probe the sides of a cover at
+PROBE_HEIGHTS = [height / 10.0 for height in range(0, 10)]
+
+# Directions we probe at each height
+PROBE_DIRECTIONS = ("forward", "backwards", "right", "left", "diags")
+
+# Default ray length (relative to the actor's bounds) of side probes
+PROBE_WIDTH = 0.35
+
+# Ray length (relative to the actor's bounds) of the final forward/backwards probes
+WIDE_PROBE_WIDTH = 1.1
+
+# How far we push a cover away from whatever a probe hit in each direction
+FORWARD_PUSH = 40
+SIDE_PUSH = 20
+DIAGONAL_PUSH = 15
+
+# How far above the ground we place a cover after a "down" probe
+GROUND_OFFSET = 30
+
+# Stances (names of unreal.SoldierStance values), least to most restrictive
+STAND = "STAND"
+CROUCH = "CROUCH"
+PRONE = "PRONE"
+STANCES = (STAND, CROUCH, PRONE)
+
+# Distances from the probe origin to the ground / ceiling
+# below which a cover has to crouch or go prone
+GROUND_CROUCH_DISTANCE = 220
+GROUND_PRONE_DISTANCE = 160
+CEILING_CROUCH_DISTANCE = 270
+CEILING_PRONE_DISTANCE = 180
+
+# A ray cast to probe a cover's surroundings.
+# direction: str : forward, backwards, right, left, diags, down or up
+# start: (X, Y, Z) : Start of the ray
+# end: (X, Y, Z) : End of the ray
+# push: (X, Y, Z) : How far to move the cover when this probe hits something (None for down/up)
+CoverProbe = namedtuple("CoverProbe", ["direction", "start", "end", "push"])
+
+# A (filtered) hit of a probe ray
+# distance: float : Distance from the start of the ray to the hit
+# impact_point: (X, Y, Z) : Point where the ray hit the surface
+ProbeHit = namedtuple("ProbeHit", ["distance", "impact_point"])
+
+# Where a cover should end up, and how it should stand there
+CoverSolution = namedtuple("CoverSolution", ["location", "stance"])
+
+
+def vadd(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+
+def vsub(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+
+def vscale(a, scale):
+    return (a[0] * scale, a[1] * scale, a[2] * scale)
+
+
+def get_probe_origin(location, extent, height=0):
+    """ Position the raycast slightly above our actor's "feet" (height: 0 == feet, height: 1 == head) """
+    return (location[0], location[1], location[2] + extent[2] * (1.7 * 0.001 + height))
+
+
+def get_body_middle_z(location, extent):
+    """ Ground hits above this Z are really ceilings """
+    return location[2] + extent[2]
+
+
+def get_direction_probes(direction, location, extent, forward, right, up, height=0, width=PROBE_WIDTH):
+    """ Return the CoverProbes raycast_reposition_on_hit casts in this direction """
+    origin = get_probe_origin(location, extent, height)
+
+    if direction == "forward" or direction == "backwards":
+        # 1 == forward, -1 == back
+        sign = 1 if direction == "forward" else -1
+        # 1.2 added to increase this forward/backwards ray slightly
+        ray = vscale(forward, sign * extent[0] * width * 1.2)
+        return [CoverProbe(direction, origin, vadd(origin, ray), vscale(forward, -sign * FORWARD_PUSH))]
+
+    elif direction == "right" or direction == "left":
+        # 1 == left, -1 == right
+        sign = 1 if direction == "left" else -1
+        ray = vscale(right, sign * extent[1] * width)
+        return [CoverProbe(direction, origin, vadd(origin, ray), vscale(right, -sign * SIDE_PUSH))]
+
+    elif direction == "down" or direction == "up":
+        sign = 1 if direction == "up" else -1
+        ray = vscale(up, sign * extent[2] * 3)
+        return [CoverProbe(direction, origin, vadd(origin, ray), None)]
+
+    elif direction == "diags":
+        # Cast raycasts in all four relative diagonal directions of the actor
+        origin = (origin[0], origin[1], origin[2] - 50)
+        probes = list()
+        for diagdir in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
+            real_diag_dir = vadd(vscale(forward, diagdir[0]), vscale(right, diagdir[1]))
+            ray = vscale(real_diag_dir, extent[1] * width)
+            probes.append(CoverProbe(direction, origin, vadd(origin, ray),
+                                     vscale(real_diag_dir, -DIAGONAL_PUSH)))
+        return probes
+
+    raise ValueError("unknown probe direction: %s" % direction)
+
+
+def get_ground_probe(location, extent, up):
+    """ Return the CoverProbe used to find the ground below a cover """
+    return get_direction_probes("down", location, extent, None, None, up)[0]
+
+
+def get_cover_probes(location, extent, forward, right, up):
+    """ Return every CoverProbe cast (in order) once a cover has been placed on the ground:
+        each direction at each height, wide forward/backwards checks and a final "up" check
+    """
+    probes = list()
+    for height in PROBE_HEIGHTS:
+        for direction in PROBE_DIRECTIONS:
+            probes += get_direction_probes(direction, location, extent, forward, right, up, height=height)
+    for direction in ("forward", "backwards"):
+        probes += get_direction_probes(direction, location, extent, forward, right, up, width=WIDE_PROBE_WIDTH)
+    probes += get_direction_probes("up", location, extent, forward, right, up)
+    return probes
+
+
+def get_stance_for_distance(distance, crouch_distance, prone_distance):
+    if distance is None:
+        return STAND
+    if distance < prone_distance:
+        return PRONE
+    if distance < crouch_distance:
+        return CROUCH
+    return STAND
+
+
+def get_stance(ground_distance=None, ceiling_distance=None):
+    """ Return the most restrictive stance the ground and ceiling distances allow """
+    return max(get_stance_for_distance(ground_distance, GROUND_CROUCH_DISTANCE, GROUND_PRONE_DISTANCE),
+               get_stance_for_distance(ceiling_distance, CEILING_CROUCH_DISTANCE, CEILING_PRONE_DISTANCE),
+               key=STANCES.index)
+
+
+def solve_ground(location, extent, ground_hits):
+    """ Return (location placed just above the ground, distance to the ground) from the hits of
+        a cover's ground probe, or (location, None) if we didn't find any ground
+    """
+    middle_of_body_z = get_body_middle_z(location, extent)
+    for hit in sorted(ground_hits, key=lambda h: h.distance):
+
+        # We were trying to check for the ground, but
+        # it's *above* the middle of our body?
+        # Nahhh - this must be the ceiling.
+        if hit.impact_point[2] > middle_of_body_z:
+            continue
+
+        # Place slightly above the hit location
+        return (hit.impact_point[0], hit.impact_point[1], hit.impact_point[2] + GROUND_OFFSET), hit.distance
+    return location, None
+
+
+def solve_push_out(probes, probe_hits):
+    """ Return (combined push-out displacement, distance to the ceiling or None) from the hits
+        of every probe of a cover. Every direction we hit something in pushes the cover
+        away *once*, no matter how many heights hit it, so the result doesn't depend
+        on the order we look at the probes in.
+    """
+    pushes = dict()
+    ceiling_distance = None
+    for probe, hits in zip(probes, probe_hits):
+        if not hits:
+            continue
+        if probe.direction == "up":
+            distance = min(hit.distance for hit in hits)
+            ceiling_distance = distance if ceiling_distance is None else min(ceiling_distance, distance)
+        elif probe.push:
+            # Pushes in the same direction (at any height) only count once
+            pushes[tuple(round(v, 3) for v in probe.push)] = probe.push
+
+    displacement = (0.0, 0.0, 0.0)
+    for key in sorted(pushes):
+        displacement = vadd(displacement, pushes[key])
+    return displacement, ceiling_distance
+
+
+def solve_cover(grounded_location, ground_distance, probes, probe_hits):
+    """ Return the CoverSolution for a cover placed on the ground at grounded_location,
+        given the hits of every probe returned by get_cover_probes """
+    displacement, ceiling_distance = solve_push_out(probes, probe_hits)
+    return CoverSolution(vadd(grounded_location, displacement), get_stance(ground_distance, ceiling_distance))
@@ -0,0 +1,261 @@
+# Python module / script (no Unreal dependency)
+# Find duplicated assets (the same texture, mesh, sound, ... imported more
+# than once under different paths) in a mod's Content folder.
+#
+# A package's .uasset header holds its own names (and a GUID regenerated on
+# every save), so copies of the same asset never have identical files. We
+# hash their payload instead: everything after the .uasset's header (the
+# exports and their bulk data), plus any .uexp/.ubulk files of cooked
+# packages. Only packages whose payloads have the same size are hashed, in
+# a pool of workers reading memory-mapped files, so most of the folder is
+# never read at all.
+#
+# Copies which were saved differently (IE: a renamed material slot) have
+# slightly different exports, but their bulk data -- the pixels, vertices
+# or samples, stored at the end of the payload -- is the same. Packages of
+# about the same size with the same payload tail are grouped as "similar".
+#
+# Usage:
+#   python duplicate_finder.py <Mods/MyMod/Content> [-o duplicates.json] [-j processes]
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+# select.py (one of our editor scripts) sits next to this file and shadows the
+# standard library's select module, which multiprocessing needs -- import
+# the real one first
+if "select" not in sys.modules:
+    SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+    saved_sys_path = list(sys.path)
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != SCRIPT_DIRECTORY]
+    import select
+    sys.path[:] = saved_sys_path
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+# Header files, and the files holding the rest of a (cooked) package
+HEADER_EXTENSIONS = (".uasset",)
+PAYLOAD_EXTENSIONS = (".uexp", ".ubulk")
+
+# Tag at the start of every package file
+PACKAGE_FILE_TAG = 0x9E2A83C1
+
+# Bytes at the end of the payload compared to find similar packages,
+# how much smaller (as a fraction) a similar package's payload may be,
+# and the smallest payload worth looking at
+SIMILAR_TAIL_SIZE = 1024 * 1024
+SIMILAR_SIZE_TOLERANCE = 0.01
+MIN_PAYLOAD_SIZE = 1024
+
+# How much of a file we hash at a time
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Kinds of duplicate groups
+IDENTICAL = "identical"
+SIMILAR = "similar"
+
+# A group of duplicated packages
+# kind: str : IDENTICAL (same payload) or SIMILAR (same payload tail, about the same size)
+# size: int : Payload size of the largest package in the group (bytes)
+# packages: obj List str : Packages (Content relative paths without extensions, IE: "Textures/T_Rock_N")
+DuplicateGroup = namedtuple("DuplicateGroup", ["kind", "size", "packages"])
+
+
+def get_header_size(path):
+    """ Return the size of a .uasset's header (TotalHeaderSize of its package file summary),
+        or 0 if we can't read it (the whole file is then treated as payload)
+    """
+    with open(path, "rb") as f:
+        data = f.read(64)
+        if len(data) < 20:
+            return 0
+        tag, legacy_version = struct.unpack("<Ii", data[:8])
+        if tag != PACKAGE_FILE_TAG:
+            return 0
+        # LegacyUE3Version (unless -4), FileVersionUE4 and FileVersionLicenseeUE4
+        offset = 8 + (4 if legacy_version != -4 else 0) + 8
+        if legacy_version <= -6:
+            # Custom versions: (GUID, version)
+            custom_version_size = 20
+        elif legacy_version == -2:
+            # Custom versions: (key, version)
+            custom_version_size = 8
+        elif legacy_version < -2:
+            # Custom versions with friendly names -- too old to bother with
+            return 0
+        else:
+            custom_version_size = 0
+        f.seek(offset)
+        if custom_version_size:
+            custom_version_count = struct.unpack("<i", f.read(4))[0]
+            f.seek(offset + 4 + custom_version_count * custom_version_size)
+        total_header_size = f.read(4)
+        if len(total_header_size) < 4:
+            return 0
+        total_header_size = struct.unpack("<i", total_header_size)[0]
+        return total_header_size if 0 < total_header_size <= os.path.getsize(path) else 0
+
+
+def find_packages(content_dir):
+    """ Return {package: [(file path, payload start offset, payload size)]} of every asset
+        package in a Content folder (maps are left out)
+    """
+    packages = dict()
+    for directory, _, filenames in os.walk(content_dir):
+        for filename in filenames:
+            base_name, extension = os.path.splitext(filename)
+            extension = extension.lower()
+            if extension not in HEADER_EXTENSIONS and extension not in PAYLOAD_EXTENSIONS:
+                continue
+            path = os.path.join(directory, filename)
+            package = os.path.relpath(os.path.join(directory, base_name), content_dir).replace(os.sep, "/")
+            size = os.path.getsize(path)
+            start = get_header_size(path) if extension in HEADER_EXTENSIONS else 0
+            packages.setdefault(package, list()).append((path, start, size - start))
+    for package, files in list(packages.items()):
+        # Header first, then .uexp, then .ubulk
+        files.sort(key=lambda f: (os.path.splitext(f[0])[1].lower() not in HEADER_EXTENSIONS, f[0].lower()))
+        # (the .uexp/.ubulk of a map)
+        if os.path.splitext(files[0][0])[1].lower() not in HEADER_EXTENSIONS:
+            del packages[package]
+    return packages
+
+
+def get_payload_size(files):
+    return sum(size for path, start, size in files)
+
+
+def hash_payload(job):
+    """ Hash (SHA-1) the payload of a package, or only its last tail_size bytes
+        # job: (package, files, tail_size) : files as returned by find_packages, tail_size 0 for everything
+        return: (package, hex digest)
+    """
+    package, files, tail_size = job
+    digest = hashlib.sha1()
+    # Skip everything before the tail
+    skip = get_payload_size(files) - tail_size if tail_size else 0
+    for path, start, size in files:
+        if skip >= size:
+            skip -= size
+            continue
+        start += skip
+        size -= skip
+        skip = 0
+        if not size:
+            continue
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for offset in range(start, start + size, HASH_CHUNK_SIZE):
+                    digest.update(mapped[offset:min(offset + HASH_CHUNK_SIZE, start + size)])
+            finally:
+                mapped.close()
+    return package, digest.hexdigest()
+
+
+def get_similar_candidates(payload_sizes):
+    """ Return the packages with another package of about the same payload size """
+    ordered = sorted((size, package) for package, size in payload_sizes.items() if size >= MIN_PAYLOAD_SIZE)
+    candidates = set()
+    for i in range(1, len(ordered)):
+        size, package = ordered[i]
+        previous_size, previous_package = ordered[i - 1]
+        if size - previous_size <= size * SIMILAR_SIZE_TOLERANCE:
+            candidates.add(package)
+            candidates.add(previous_package)
+    return candidates
+
+
+def group_by(values):
+    """ {key: value} -> [keys sharing a value] (only groups of two or more) """
+    groups = dict()
+    for key, value in values.items():
+        groups.setdefault(value, list()).append(key)
+    return [sorted(keys) for keys in groups.values() if len(keys) > 1]
+
+
+def find_duplicates(content_dir, processes=None, use_threads=False, progress=None):
+    """ Return the groups of duplicated packages in a Content folder, largest payloads first
+        # processes: int : Number of workers hashing files (default: one per CPU)
+        # use_threads: bool : Hash in threads instead of processes, IE: inside the editor
+        # progress: function : Called with (packages hashed, packages to hash), return True to cancel
+        return: obj List DuplicateGroup : None if cancelled
+    """
+    start_time = time.time()
+    packages = find_packages(content_dir)
+    payload_sizes = dict((package, get_payload_size(files)) for package, files in packages.items())
+
+    # Identical payloads are the same size, similar ones about the same size
+    sizes = dict()
+    for package, size in payload_sizes.items():
+        if size >= MIN_PAYLOAD_SIZE:
+            sizes.setdefault(size, list()).append(package)
+    identical_candidates = [package for same_size in sizes.values() if len(same_size) > 1 for package in same_size]
+    similar_candidates = get_similar_candidates(payload_sizes)
+    jobs = [(package, packages[package], 0) for package in identical_candidates]
+    # (a smaller payload is its own tail, so it could only match identical
+    # copies, which are grouped above anyway)
+    jobs += [(package, packages[package], SIMILAR_TAIL_SIZE) for package in similar_candidates
+             if payload_sizes[package] > SIMILAR_TAIL_SIZE]
+
+    payload_hashes = dict()
+    tail_hashes = dict()
+    if jobs:
+        pool = (ThreadPool if use_threads else multiprocessing.Pool)(processes)
+        try:
+            # (biggest files first, so the workers finish together)
+            jobs.sort(key=lambda job: -(job[2] or payload_sizes[job[0]]))
+            for done, (job, result) in enumerate(zip(jobs, pool.imap(hash_payload, jobs))):
+                (tail_hashes if job[2] else payload_hashes)[result[0]] = result[1]
+                if progress and progress(done + 1, len(jobs)):
+                    pool.terminate()
+                    print("[!] Cancelled searching for duplicates")
+                    return None
+        finally:
+            pool.close()
+            pool.join()
+
+    groups = [DuplicateGroup(IDENTICAL, payload_sizes[same[0]], same) for same in group_by(payload_hashes)]
+    for similar in group_by(tail_hashes):
+        # Only report similar packages which aren't all identical anyway
+        if len(set(payload_hashes.get(package, package) for package in similar)) > 1:
+            groups.append(DuplicateGroup(SIMILAR, max(payload_sizes[p] for p in similar), similar))
+    groups.sort(key=lambda group: (-group.size * (len(group.packages) - 1), group.packages))
+
+    print("[*] Found {} groups of duplicates among {} packages ({} hashed) in {:.3f}s".format(
+        len(groups), len(packages), len(jobs), time.time() - start_time))
+    return groups
+
+
+def write_duplicates(path, groups):
+    with open(path, "w") as f:
+        json.dump({"groups": [group._asdict() for group in groups]}, f, indent=4)
+
+
+def read_duplicates(path):
+    with open(path, "r") as f:
+        return [DuplicateGroup(group["kind"], group["size"], group["packages"]) for group in json.load(f)["groups"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicated assets in a mod's Content folder")
+    parser.add_argument("content_dir", help="Content folder of the mod, IE: Mods/MyMod/Content")
+    parser.add_argument("-o", "--output", default="duplicates.json", help="Where to write the groups of duplicates")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    groups = find_duplicates(args.content_dir, args.processes)
+    for group in groups:
+        print("    {} ({} bytes): {}".format(group.kind, group.size, ", ".join(group.packages)))
+    write_duplicates(args.output, groups)
+    print("[*] Wrote {} groups of duplicates to {}".format(len(groups), args.output))
+
+
+if __name__ == "__main__":
+    main()
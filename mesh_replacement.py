@@ -0,0 +1,121 @@
+# Unreal Python module
+# Replace StaticMeshActors with Blueprint actors, driven by a table of rules.
+#
+# Each ReplacementRule maps a static mesh name prefix (IE: "prop_target_metal_")
+# to the Blueprint replacing actors showing such a mesh. The level's
+# StaticMeshActors are matched against every rule in a single pass, then
+# replacements are spawned in batches through SpawnService (which loads each
+# Blueprint class once) and the originals are destroyed batch by batch.
+import time
+from collections import namedtuple
+
+import unreal
+
+from spawn_service import SpawnService, SpawnSpec
+
+# How many actors we replace per editor transaction
+REPLACE_BATCH_SIZE = 500
+
+# A mesh -> Blueprint replacement
+# mesh_prefix: str : Replace StaticMeshActors whose static mesh name starts with this
+# blueprint: str : Blueprint asset path (or unreal.Class) to replace them with
+# properties: dict : Editor properties to set on the replacement. Values may be functions
+#                    taking the replaced actor, IE: {"health": lambda actor: 100}
+# copy_mesh: bool : Give the replacement's StaticMeshComponent the replaced actor's mesh (and materials)
+# label_suffix: str : Appended to the replaced actor's label to label the replacement
+ReplacementRule = namedtuple("ReplacementRule", ["mesh_prefix", "blueprint", "properties", "copy_mesh", "label_suffix"])
+ReplacementRule.__new__.__defaults__ = (None, True, "_REPLACEMENT")
+
+
+def get_replacements(rules, actors):
+    """ Return [(actor, rule)] of every StaticMeshActor matching a rule
+        (the longest matching mesh prefix wins)
+    """
+    rules = sorted(rules, key=lambda rule: -len(rule.mesh_prefix))
+    replacements = list()
+    for actor in actors:
+        if not isinstance(actor, unreal.StaticMeshActor):
+            continue
+        static_mesh_component = actor.get_component_by_class(unreal.StaticMeshComponent)
+        static_mesh = static_mesh_component.static_mesh if static_mesh_component else None
+        if not static_mesh:
+            continue
+        mesh_name = static_mesh.get_name()
+        for rule in rules:
+            if mesh_name.startswith(rule.mesh_prefix):
+                replacements.append((actor, rule))
+                break
+    return replacements
+
+
+def get_replacement_spec(actor, rule):
+    properties = dict()
+    for name, value in (rule.properties or dict()).items():
+        properties[name] = value(actor) if callable(value) else value
+    return SpawnSpec(rule.blueprint,
+                     location=actor.get_actor_location(),
+                     rotation=actor.get_actor_rotation(),
+                     scale=actor.get_actor_scale3d(),
+                     label=actor.get_actor_label() + rule.label_suffix,
+                     properties=properties)
+
+
+def copy_static_mesh(source_actor, target_actor):
+    """ Give the target's StaticMeshComponent the source's mesh and (override) materials """
+    source_component = source_actor.get_component_by_class(unreal.StaticMeshComponent)
+    target_component = target_actor.get_component_by_class(unreal.StaticMeshComponent)
+    if not target_component:
+        print("[!] %s has no StaticMeshComponent to copy %s's mesh to" % (
+            target_actor.get_actor_label(), source_actor.get_actor_label()))
+        return False
+    target_component.set_static_mesh(source_component.static_mesh)
+    for index, material in enumerate(source_component.get_materials()):
+        if material:
+            target_component.set_material(index, material)
+    return True
+
+
+def replace_meshes(rules, actors=None, batch_size=REPLACE_BATCH_SIZE, spawn_service=None):
+    """ Replace every StaticMeshActor matching a rule with its rule's Blueprint
+        # rules: obj List ReplacementRule
+        # actors: obj List unreal.Actor : Actors to look at. If None, will use every actor in the level
+        # spawn_service: obj SpawnService : Service to spawn with (IE: to share its class cache)
+        return: obj List unreal.Actor : The replacements we spawned
+    """
+    start_time = time.time()
+    actors = actors if actors is not None else unreal.EditorLevelLibrary.get_all_level_actors()
+    spawn_service = spawn_service if spawn_service else SpawnService()
+    replacements = get_replacements(rules, actors)
+    print("[*] Found %d actors to replace in %.3fs" % (len(replacements), time.time() - start_time))
+
+    spawned = list()
+    counts = dict((rule.mesh_prefix, 0) for rule in rules)
+    failed = 0
+    with unreal.ScopedSlowTask(len(replacements), "Replacing meshes ...") as slow_task:
+        slow_task.make_dialog(True)
+        for batch_start in range(0, len(replacements), batch_size):
+            if slow_task.should_cancel():
+                print("[!] Cancelled replacing meshes")
+                break
+            batch = replacements[batch_start:batch_start + batch_size]
+            new_actors, _ = spawn_service.spawn_batch(
+                [get_replacement_spec(actor, rule) for actor, rule in batch], "Replace Meshes")
+
+            # Only destroy the actors we replaced
+            with unreal.ScopedEditorTransaction("Replace Meshes"):
+                for (actor, rule), new_actor in zip(batch, new_actors):
+                    if not new_actor:
+                        failed += 1
+                        continue
+                    if rule.copy_mesh:
+                        copy_static_mesh(actor, new_actor)
+                    unreal.EditorLevelLibrary.destroy_actor(actor)
+                    spawned.append(new_actor)
+                    counts[rule.mesh_prefix] += 1
+            slow_task.enter_progress_frame(len(batch), "Replaced %d/%d actors ..." % (len(spawned), len(replacements)))
+
+    for rule in rules:
+        print("[*] %s* -> %s: %d actors" % (rule.mesh_prefix, rule.blueprint, counts[rule.mesh_prefix]))
+    print("[*] Replaced %d actors in %.3fs%s" % (
+        len(spawned), time.time() - start_time, " (%d failed to spawn)" % failed if failed else ""))
+    return spawned
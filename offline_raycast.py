@@ -0,0 +1,547 @@
+# Python module / script (no Unreal dependency, NumPy optional)
+# Offline raycasting over collision geometry exported by collision_export.py
+#
+# Loads the triangles (world space) of a level's StaticMeshActors, builds
+# a BVH over them and answers ray queries the way our editor traces do:
+# the distance to the hit, the impact point and the id of the actor we
+# hit, with tool brushes (materials starting with "tools") ignored.
+# This lets us solve cover placement for thousands of AICoverActors in
+# parallel worker processes outside of the editor, then import only the
+# final transforms back with collision_export.import_cover_transforms.
+#
+# Usage:
+#   python offline_raycast.py <collision.bin> [-o cover_transforms.json] [-j processes]
+import argparse
+import array
+import json
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+# select.py (one of our editor scripts) sits next to this file and shadows the
+# standard library's select module, which multiprocessing needs -- import
+# the real one first
+if "select" not in sys.modules:
+    SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+    saved_sys_path = list(sys.path)
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != SCRIPT_DIRECTORY]
+    import select
+    sys.path[:] = saved_sys_path
+import multiprocessing
+
+from cover_placement import ProbeHit, get_cover_probes, get_ground_probe, solve_cover, solve_ground
+
+# NumPy is optional: without it, triangles are tested one by one in Python
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Collision file header: magic, version, number of strings, actors, triangles and covers
+COLLISION_FILE_MAGIC = b"DOICOL01"
+COLLISION_FILE_VERSION = 1
+HEADER_FORMAT = "<8sIIIII"
+
+# Materials of actors our traces go straight through
+DEFAULT_IGNORE_PREFIXES = ("tools",)
+
+# Max triangles in a BVH leaf
+BVH_LEAF_SIZE = 8
+
+# Determinants smaller than this mean the ray is parallel to the triangle
+PARALLEL_EPSILON = 1e-9
+
+# Stand-in for 1 / 0 when a ray doesn't move along an axis
+INFINITY = 1e30
+
+# An actor we exported the collision of
+# name: str : Unique name of the actor in its level
+# materials: obj List str : Names of the actor's materials
+CollisionActor = namedtuple("CollisionActor", ["name", "materials"])
+
+# A cover to solve offline. Vectors are (X, Y, Z) tuples
+CoverInput = namedtuple("CoverInput", ["name", "location", "extent", "forward", "right", "up"])
+
+# A hit of an offline ray
+# distance: float : Distance from the start of the ray to the hit
+# impact_point: (X, Y, Z) : Point where the ray hit the triangle
+# actor_id: int : Index of the actor we hit in CollisionScene.actors
+RayHit = namedtuple("RayHit", ["distance", "impact_point", "actor_id"])
+
+
+def to_bytes(text):
+    return text.encode("utf-8") if not isinstance(text, bytes) else text
+
+
+def to_text(data):
+    return data.decode("utf-8")
+
+
+def write_array(f, typecode, values):
+    values = array.array(typecode, values)
+    # The file is always little-endian
+    if sys.byteorder != "little":
+        values.byteswap()
+    values.tofile(f)
+
+
+def read_array(f, typecode, count):
+    values = array.array(typecode)
+    if count:
+        values.fromfile(f, count)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class CollisionScene:
+    """ Triangles (with the actor each belongs to) and covers exported from a level """
+
+    def __init__(self, actors=None, vertices=None, triangle_actors=None, covers=None):
+        """
+        # actors: obj List CollisionActor
+        # vertices: obj List float : 9 floats (3 world-space corners) per triangle
+        # triangle_actors: obj List int : Index of the actor (in actors) of each triangle
+        # covers: obj List CoverInput
+        """
+        self.actors = actors if actors else list()
+        self.vertices = vertices if vertices is not None else array.array("f")
+        self.triangle_actors = triangle_actors if triangle_actors is not None else array.array("I")
+        self.covers = covers if covers else list()
+
+    @property
+    def triangle_count(self):
+        return len(self.triangle_actors)
+
+    def get_ignored_actor_ids(self, ignore_prefixes=DEFAULT_IGNORE_PREFIXES):
+        """ Return the ids of actors with a material starting with any of the prefixes """
+        ignored = set()
+        for actor_id, actor in enumerate(self.actors):
+            for material in actor.materials:
+                if material.startswith(tuple(ignore_prefixes)):
+                    ignored.add(actor_id)
+                    break
+        return ignored
+
+    def write(self, path):
+        """ Write this scene to a compact (little-endian) binary file """
+        strings = list()
+        string_ids = dict()
+
+        def get_string_id(text):
+            if text not in string_ids:
+                string_ids[text] = len(strings)
+                strings.append(text)
+            return string_ids[text]
+
+        actor_records = [(get_string_id(actor.name), [get_string_id(m) for m in actor.materials])
+                         for actor in self.actors]
+        cover_records = [(get_string_id(cover.name),
+                          tuple(cover.location) + tuple(cover.extent) + tuple(cover.forward)
+                          + tuple(cover.right) + tuple(cover.up))
+                         for cover in self.covers]
+
+        with open(path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, COLLISION_FILE_MAGIC, COLLISION_FILE_VERSION,
+                                len(strings), len(actor_records), self.triangle_count, len(cover_records)))
+            for text in strings:
+                data = to_bytes(text)
+                f.write(struct.pack("<H", len(data)))
+                f.write(data)
+            for name_id, material_ids in actor_records:
+                f.write(struct.pack("<II", name_id, len(material_ids)))
+                f.write(struct.pack("<%dI" % len(material_ids), *material_ids))
+            write_array(f, "f", self.vertices)
+            write_array(f, "I", self.triangle_actors)
+            for name_id, values in cover_records:
+                f.write(struct.pack("<I15f", name_id, *values))
+
+    @classmethod
+    def read(cls, path):
+        """ Read a scene written by CollisionScene.write """
+        with open(path, "rb") as f:
+            magic, version, string_count, actor_count, triangle_count, cover_count = struct.unpack(
+                HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+            if magic != COLLISION_FILE_MAGIC or version != COLLISION_FILE_VERSION:
+                raise ValueError("%s isn't a (version %d) collision file" % (path, COLLISION_FILE_VERSION))
+
+            strings = list()
+            for _ in range(string_count):
+                length = struct.unpack("<H", f.read(2))[0]
+                strings.append(to_text(f.read(length)))
+
+            actors = list()
+            for _ in range(actor_count):
+                name_id, material_count = struct.unpack("<II", f.read(8))
+                material_ids = struct.unpack("<%dI" % material_count, f.read(4 * material_count))
+                actors.append(CollisionActor(strings[name_id], [strings[i] for i in material_ids]))
+
+            vertices = read_array(f, "f", triangle_count * 9)
+            triangle_actors = read_array(f, "I", triangle_count)
+
+            covers = list()
+            cover_size = struct.calcsize("<I15f")
+            for _ in range(cover_count):
+                values = struct.unpack("<I15f", f.read(cover_size))
+                covers.append(CoverInput(strings[values[0]], values[1:4], values[4:7], values[7:10],
+                                         values[10:13], values[13:16]))
+
+        return cls(actors, vertices, triangle_actors, covers)
+
+
+class BVH:
+    """ Bounding volume hierarchy (median split along the longest axis) over a CollisionScene's triangles """
+
+    def __init__(self, scene, ignored_actor_ids=None, leaf_size=BVH_LEAF_SIZE):
+        """
+        # scene: obj CollisionScene : Scene to build the hierarchy over
+        # ignored_actor_ids: obj Set int : Actors whose triangles are left out (rays go through them)
+        # leaf_size: int : Max triangles per leaf
+        """
+        start_time = time.time()
+        ignored_actor_ids = ignored_actor_ids if ignored_actor_ids else set()
+        vertices = scene.vertices
+
+        # Precompute each triangle's first corner and edges (for Moller-Trumbore),
+        # bounds and centroid -- skipping triangles of ignored actors
+        triangles = list()
+        triangle_actors = list()
+        bounds = list()
+        centroids = list()
+        for index, actor_id in enumerate(scene.triangle_actors):
+            if actor_id in ignored_actor_ids:
+                continue
+            ax, ay, az, bx, by, bz, cx, cy, cz = vertices[index * 9:index * 9 + 9]
+            triangles.append((ax, ay, az, bx - ax, by - ay, bz - az, cx - ax, cy - ay, cz - az))
+            triangle_actors.append(actor_id)
+            bounds.append((min(ax, bx, cx), min(ay, by, cy), min(az, bz, cz),
+                           max(ax, bx, cx), max(ay, by, cy), max(az, bz, cz)))
+            centroids.append(((ax + bx + cx) / 3.0, (ay + by + cy) / 3.0, (az + bz + cz) / 3.0))
+
+        # Flattened nodes: bounds, index of the left child (the right child
+        # follows it, -1 for leaves), and the range of triangles of leaves
+        self.node_bounds = list()
+        self.node_left = list()
+        self.node_start = list()
+        self.node_count = list()
+
+        order = list(range(len(triangles)))
+        self._add_node()
+        stack = [(0, 0, len(order))]
+        while stack:
+            node, start, end = stack.pop()
+            items = order[start:end]
+            self.node_bounds[node] = (
+                min(bounds[i][0] for i in items) if items else 0.0,
+                min(bounds[i][1] for i in items) if items else 0.0,
+                min(bounds[i][2] for i in items) if items else 0.0,
+                max(bounds[i][3] for i in items) if items else 0.0,
+                max(bounds[i][4] for i in items) if items else 0.0,
+                max(bounds[i][5] for i in items) if items else 0.0)
+
+            if len(items) > leaf_size:
+                # Split at the median centroid along the longest axis of the centroids
+                spans = [max(centroids[i][axis] for i in items) - min(centroids[i][axis] for i in items)
+                         for axis in range(3)]
+                axis = spans.index(max(spans))
+                if spans[axis] > 0:
+                    items.sort(key=lambda i: centroids[i][axis])
+                    order[start:end] = items
+                    middle = (start + end) // 2
+                    left = self._add_node()
+                    self._add_node()
+                    self.node_left[node] = left
+                    stack.append((left, start, middle))
+                    stack.append((left + 1, middle, end))
+                    continue
+
+            # Leaf
+            self.node_start[node] = start
+            self.node_count[node] = end - start
+
+        # Store triangles in leaf order
+        self.triangles = [triangles[i] for i in order]
+        self.triangle_actors = [triangle_actors[i] for i in order]
+        if numpy is not None:
+            packed = numpy.array(self.triangles, dtype=numpy.float64).reshape(-1, 9)
+            self.np_v0 = packed[:, 0:3]
+            self.np_e1 = packed[:, 3:6]
+            self.np_e2 = packed[:, 6:9]
+            self.np_actors = numpy.array(self.triangle_actors, dtype=numpy.int64)
+
+        self.build_time = time.time() - start_time
+        print("[*] Built BVH over %d/%d triangles (%d nodes) in %.3fs%s" % (
+            len(self.triangles), scene.triangle_count, len(self.node_left), self.build_time,
+            "" if numpy is not None else " (NumPy not available, using pure Python)"))
+
+    def _add_node(self):
+        self.node_bounds.append(None)
+        self.node_left.append(-1)
+        self.node_start.append(0)
+        self.node_count.append(0)
+        return len(self.node_left) - 1
+
+    def _get_leaves(self, origin, inv_direction, max_t):
+        """ Yield (start, count, t_near) of leaves the segment origin -> origin + direction * max_t crosses """
+        ox, oy, oz = origin
+        ix, iy, iz = inv_direction
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            min_x, min_y, min_z, max_x, max_y, max_z = self.node_bounds[node]
+
+            # Slab test
+            t0 = (min_x - ox) * ix
+            t1 = (max_x - ox) * ix
+            t_near, t_far = (t0, t1) if t0 < t1 else (t1, t0)
+            t0 = (min_y - oy) * iy
+            t1 = (max_y - oy) * iy
+            if t0 > t1:
+                t0, t1 = t1, t0
+            t_near = max(t_near, t0)
+            t_far = min(t_far, t1)
+            t0 = (min_z - oz) * iz
+            t1 = (max_z - oz) * iz
+            if t0 > t1:
+                t0, t1 = t1, t0
+            t_near = max(t_near, t0, 0.0)
+            t_far = min(t_far, t1, max_t)
+            if t_near > t_far:
+                continue
+
+            left = self.node_left[node]
+            if left < 0:
+                if self.node_count[node]:
+                    yield self.node_start[node], self.node_count[node], t_near
+            else:
+                stack.append(left + 1)
+                stack.append(left)
+
+    def intersect(self, start, end, multi=False):
+        """ Return the hits of the segment start -> end, closest first.
+            Like a line trace against blocking geometry, only the closest hit is returned
+            unless multi is True -- then the closest hit of *each* actor is.
+            return: obj List (t (0..1 along the segment), triangle index)
+        """
+        direction = (end[0] - start[0], end[1] - start[1], end[2] - start[2])
+        inv_direction = tuple(1.0 / d if d else INFINITY for d in direction)
+
+        if numpy is not None:
+            return self._intersect_numpy(start, direction, inv_direction, multi)
+
+        ox, oy, oz = start
+        dx, dy, dz = direction
+        best_t = 1.0
+        hits = list()
+        for leaf_start, leaf_count, t_near in self._get_leaves(start, inv_direction, 1.0):
+            # Leaves are visited roughly front to back, skip those past our closest hit
+            if not multi and hits and t_near > best_t:
+                continue
+            for index in range(leaf_start, leaf_start + leaf_count):
+                ax, ay, az, e1x, e1y, e1z, e2x, e2y, e2z = self.triangles[index]
+
+                # Moller-Trumbore (two-sided)
+                px = dy * e2z - dz * e2y
+                py = dz * e2x - dx * e2z
+                pz = dx * e2y - dy * e2x
+                det = e1x * px + e1y * py + e1z * pz
+                if -PARALLEL_EPSILON < det < PARALLEL_EPSILON:
+                    continue
+                inv_det = 1.0 / det
+                tx = ox - ax
+                ty = oy - ay
+                tz = oz - az
+                u = (tx * px + ty * py + tz * pz) * inv_det
+                if u < 0.0 or u > 1.0:
+                    continue
+                qx = ty * e1z - tz * e1y
+                qy = tz * e1x - tx * e1z
+                qz = tx * e1y - ty * e1x
+                v = (dx * qx + dy * qy + dz * qz) * inv_det
+                if v < 0.0 or u + v > 1.0:
+                    continue
+                t = (e2x * qx + e2y * qy + e2z * qz) * inv_det
+                if t < 0.0 or t > 1.0:
+                    continue
+
+                if multi:
+                    hits.append((t, index))
+                elif not hits or t < best_t:
+                    best_t = t
+                    hits = [(t, index)]
+
+        return self._closest_per_actor(hits) if multi else hits
+
+    def _intersect_numpy(self, start, direction, inv_direction, multi):
+        """ Gather the triangles of every leaf the segment crosses, then test them all at once """
+        indices = list()
+        for leaf_start, leaf_count, t_near in self._get_leaves(start, inv_direction, 1.0):
+            indices.extend(range(leaf_start, leaf_start + leaf_count))
+        if not indices:
+            return []
+
+        indices = numpy.array(indices, dtype=numpy.int64)
+        origin = numpy.array(start, dtype=numpy.float64)
+        direction = numpy.array(direction, dtype=numpy.float64)
+        v0 = self.np_v0[indices]
+        e1 = self.np_e1[indices]
+        e2 = self.np_e2[indices]
+
+        # Moller-Trumbore (two-sided), for every candidate triangle
+        pvec = numpy.cross(direction, e2)
+        det = numpy.einsum("ij,ij->i", e1, pvec)
+        valid = numpy.abs(det) > PARALLEL_EPSILON
+        inv_det = 1.0 / numpy.where(valid, det, 1.0)
+        tvec = origin - v0
+        u = numpy.einsum("ij,ij->i", tvec, pvec) * inv_det
+        qvec = numpy.cross(tvec, e1)
+        v = qvec.dot(direction) * inv_det
+        t = numpy.einsum("ij,ij->i", e2, qvec) * inv_det
+        hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0) & (t <= 1.0)
+        if not hit.any():
+            return []
+
+        hit_t = t[hit]
+        hit_indices = indices[hit]
+        if not multi:
+            closest = int(numpy.argmin(hit_t))
+            return [(float(hit_t[closest]), int(hit_indices[closest]))]
+        return self._closest_per_actor(zip(hit_t.tolist(), hit_indices.tolist()))
+
+    def _closest_per_actor(self, hits):
+        closest = dict()
+        for t, index in hits:
+            actor_id = self.triangle_actors[index]
+            if actor_id not in closest or t < closest[actor_id][0]:
+                closest[actor_id] = (t, index)
+        return sorted(closest.values())
+
+
+class RayCaster:
+    """ Line traces against a CollisionScene, ignoring actors by material prefix """
+
+    def __init__(self, scene, ignore_prefixes=DEFAULT_IGNORE_PREFIXES):
+        self.scene = scene
+        self.ignored_actor_ids = scene.get_ignored_actor_ids(ignore_prefixes) if ignore_prefixes else set()
+        self.bvh = BVH(scene, self.ignored_actor_ids)
+        self.total_traces = 0
+
+    def trace(self, start, end, multi=False):
+        """ Trace the segment start -> end ((X, Y, Z) tuples) and return its RayHits, closest first """
+        self.total_traces += 1
+        length = ((end[0] - start[0]) ** 2 + (end[1] - start[1]) ** 2 + (end[2] - start[2]) ** 2) ** 0.5
+        hits = list()
+        for t, index in self.bvh.intersect(start, end, multi):
+            impact_point = (start[0] + (end[0] - start[0]) * t,
+                            start[1] + (end[1] - start[1]) * t,
+                            start[2] + (end[2] - start[2]) * t)
+            hits.append(RayHit(t * length, impact_point, self.bvh.triangle_actors[index]))
+        return hits
+
+    def trace_batch(self, rays, multi=False):
+        """ Trace a list of (start, end) segments
+            return: obj List (obj List RayHit) : The hits of each ray, in order
+        """
+        return [self.trace(start, end, multi) for start, end in rays]
+
+    def to_probe_hits(self, hits):
+        return [ProbeHit(hit.distance, hit.impact_point) for hit in hits]
+
+    def solve_cover(self, cover):
+        """ Return the CoverSolution for a CoverInput, tracing the same
+            probes place_nbot_covers (setup_sandstorm_map.py) traces in the editor """
+        ground_probe = get_ground_probe(cover.location, cover.extent, cover.up)
+        location, ground_distance = solve_ground(
+            cover.location, cover.extent, self.to_probe_hits(self.trace(ground_probe.start, ground_probe.end)))
+
+        probes = get_cover_probes(location, cover.extent, cover.forward, cover.right, cover.up)
+        probe_hits = [self.to_probe_hits(hits) for hits in self.trace_batch([(p.start, p.end) for p in probes])]
+        return solve_cover(location, ground_distance, probes, probe_hits)
+
+
+# Ray caster of a worker process -- inherited from the parent when
+# processes are forked, otherwise loaded by init_worker
+WORKER_RAY_CASTER = None
+
+
+def init_worker(path, ignore_prefixes):
+    global WORKER_RAY_CASTER
+    if WORKER_RAY_CASTER is None:
+        WORKER_RAY_CASTER = RayCaster(CollisionScene.read(path), ignore_prefixes)
+
+
+def solve_cover_worker(cover):
+    return WORKER_RAY_CASTER.solve_cover(cover)
+
+
+def solve_covers(path, processes=None, ignore_prefixes=DEFAULT_IGNORE_PREFIXES, chunk_size=16):
+    """ Solve every cover in a collision file
+        # path: str : Collision file written by collision_export.export_collision
+        # processes: int : Worker processes to use (None: one per CPU, 1: solve in this process)
+        return: (obj List CoverInput, obj List CoverSolution)
+    """
+    global WORKER_RAY_CASTER
+    start_time = time.time()
+    scene = CollisionScene.read(path)
+    print("[*] Loaded %d actors, %d triangles and %d covers from %s" % (
+        len(scene.actors), scene.triangle_count, len(scene.covers), path))
+
+    # Build the BVH once -- forked workers share it with us
+    WORKER_RAY_CASTER = RayCaster(scene, ignore_prefixes)
+    processes = processes if processes else multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(scene.covers)))
+
+    solutions = list()
+    if processes == 1:
+        for cover in scene.covers:
+            solutions.append(WORKER_RAY_CASTER.solve_cover(cover))
+    else:
+        pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(path, ignore_prefixes))
+        try:
+            for solution in pool.imap(solve_cover_worker, scene.covers, chunk_size):
+                solutions.append(solution)
+                if len(solutions) % 1000 == 0:
+                    print("[*] Solved %d/%d covers ..." % (len(solutions), len(scene.covers)))
+        finally:
+            pool.close()
+            pool.join()
+
+    elapsed = time.time() - start_time
+    print("[*] Solved %d covers with %d processes in %.3fs (%.1f covers/s)" % (
+        len(solutions), processes, elapsed, len(solutions) / elapsed if elapsed else 0))
+    return scene.covers, solutions
+
+
+def write_cover_transforms(path, covers, solutions):
+    """ Write the solved location and stance of each cover, to be imported back into the editor """
+    data = [{"name": cover.name, "location": list(solution.location), "stance": solution.stance}
+            for cover, solution in zip(covers, solutions)]
+    with open(path, "w") as f:
+        json.dump({"covers": data}, f, indent=4)
+
+
+def read_cover_transforms(path):
+    """ Return {cover name: {"location": [X, Y, Z], "stance": str}} from write_cover_transforms' file """
+    with open(path, "r") as f:
+        return dict((cover["name"], cover) for cover in json.load(f)["covers"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve AICoverActor placement outside of the editor")
+    parser.add_argument("collision_file", help="File written by collision_export.export_collision")
+    parser.add_argument("-o", "--output", default="cover_transforms.json",
+                        help="Cover transforms to import with collision_export.import_cover_transforms")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--ignore", nargs="*", default=list(DEFAULT_IGNORE_PREFIXES),
+                        help="Ignore actors with materials starting with these prefixes")
+    args = parser.parse_args()
+
+    covers, solutions = solve_covers(args.collision_file, args.processes, tuple(args.ignore))
+    write_cover_transforms(args.output, covers, solutions)
+    print("[*] Wrote %d cover transforms to %s" % (len(solutions), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Python module (no Unreal dependency)
+# Sizes on disk of every package in a Content folder, summed over all the
+# files making up a package (.uasset/.umap, and .uexp/.ubulk/.uptnl once cooked).
+#
+# Folders are listed and their files stat'ed by a few threads at once:
+# most of the time goes to waiting on the file system, which doesn't hold
+# the GIL, so a large mod is scanned several times faster than by os.walk.
+import os
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+PACKAGE_EXTENSIONS = (".uasset", ".umap", ".uexp", ".ubulk", ".uptnl")
+
+# Threads listing folders
+DEFAULT_THREADS = 8
+
+
+def get_package_sizes(content_dir, threads=DEFAULT_THREADS):
+    """ Return {package: size in bytes} of every package in a Content folder
+        # threads: int : Number of threads listing folders
+        return: dict : Packages are Content relative paths without extensions, IE: "Textures/T_Rock_N"
+    """
+    start_time = time.time()
+    directories = queue.Queue()
+    directories.put("")
+    # One dict per thread, merged at the end
+    results = [dict() for _ in range(threads)]
+
+    def work(sizes):
+        while True:
+            relative_dir = directories.get()
+            if relative_dir is None:
+                directories.task_done()
+                return
+            try:
+                directory = os.path.join(content_dir, relative_dir)
+                for filename in os.listdir(directory):
+                    path = os.path.join(directory, filename)
+                    base_name, extension = os.path.splitext(filename)
+                    if extension.lower() in PACKAGE_EXTENSIONS:
+                        package = relative_dir + base_name
+                        sizes[package] = sizes.get(package, 0) + os.path.getsize(path)
+                    elif os.path.isdir(path):
+                        directories.put(relative_dir + filename + "/")
+            except OSError as e:
+                print("[!] Couldn't list {}: {}".format(relative_dir, e))
+            finally:
+                directories.task_done()
+
+    workers = [threading.Thread(target=work, args=(sizes,)) for sizes in results]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    # Wait for every folder to be listed, then stop the workers
+    directories.join()
+    for _ in workers:
+        directories.put(None)
+    for worker in workers:
+        worker.join()
+
+    package_sizes = dict()
+    for sizes in results:
+        for package, size in sizes.items():
+            package_sizes[package] = package_sizes.get(package, 0) + size
+    print("[*] Found the sizes of {} packages ({} bytes) in {:.3f}s".format(
+        len(package_sizes), sum(package_sizes.values()), time.time() - start_time))
+    return package_sizes
+
+
+def format_size(size):
+    """ IE: 1536 -> "1.5 KB" """
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return "{:.1f} {}".format(size, unit) if unit != "bytes" else "{} bytes".format(size)
+        size /= 1024.0
@@ -0,0 +1,159 @@
+# Python module (no Unreal dependency)
+# Compiled package path rules (exclusions, inclusions, internal paths).
+#
+# Rules are compiled once into a trie over interned, lowercase path
+# segments, so classifying a package path is a single walk down the trie
+# (and a dict lookup for paths we've seen before) instead of lowercasing
+# and prefix-checking it against every rule.
+#
+# Rule syntax (case-insensitive):
+#   "/engine/"           everything in the /Engine/ folder
+#   "/content/brushify"  no trailing slash: the last segment is a prefix,
+#                        IE: /Content/Brushify/... and /Content/BrushifyRocks/...
+#   "/*/developers/"     globs (*, ?, [...]) match within a single segment
+import fnmatch
+import re
+from collections import namedtuple
+
+try:
+    intern
+except NameError:
+    from sys import intern
+
+# Kinds of rules
+EXCLUDE = "exclude"
+INCLUDE = "include"
+INTERNAL = "internal"
+
+# How a package path is classified
+# excluded_by: str : Pattern of the exclusion rule that matched (None if not excluded, or included)
+# included_by: str : Pattern of the inclusion rule that matched (overturns exclusions)
+# internal: bool : Is the path internal to our mod/project
+PathMatch = namedtuple("PathMatch", ["excluded_by", "included_by", "internal"])
+
+
+def split_path(path):
+    """ Return the interned, lowercase segments of a package path """
+    # (Python 2 can only intern byte strings)
+    return [intern(segment) if isinstance(segment, str) else segment
+            for segment in path.lower().strip("/").split("/") if segment]
+
+
+def is_glob(segment):
+    return any(c in segment for c in "*?[")
+
+
+class PathRuleNode:
+
+    def __init__(self):
+        # Segment -> PathRuleNode
+        self.children = dict()
+        # (compiled glob, PathRuleNode)
+        self.glob_children = list()
+        # (kind, pattern) of rules matching everything under this node
+        self.rules = list()
+        # (segment prefix, compiled glob or None, kind, pattern) matching the *next* segment
+        self.prefix_rules = list()
+
+
+class PathRules:
+    """ Immutable set of compiled path rules """
+
+    def __init__(self, exclusions=(), inclusions=(), internal=()):
+        """
+        # exclusions: obj List str : Skip packages in these paths
+        # inclusions: obj List str : Don't skip packages in these paths (overturns exclusions)
+        # internal: obj List str : Paths internal to our mod/project, IE: "/MyMod/"
+        """
+        self.root = PathRuleNode()
+        self.patterns = list()
+        for kind, patterns in ((EXCLUDE, exclusions), (INCLUDE, inclusions), (INTERNAL, internal)):
+            for pattern in patterns:
+                self.add_rule(kind, pattern)
+
+        # Package path -> PathMatch
+        self.matches = dict()
+        # Pattern -> number of paths (edges) this rule pruned
+        self.prune_counts = dict((pattern, 0) for kind, pattern in self.patterns if kind == EXCLUDE)
+
+    def add_rule(self, kind, pattern):
+        """ Compile a rule into the trie (only called while constructing) """
+        pattern = pattern.lower()
+        self.patterns.append((kind, pattern))
+        segments = split_path(pattern)
+        # No trailing slash: the last segment only has to be a prefix
+        prefix = None if pattern.endswith("/") or not segments else segments.pop()
+
+        node = self.root
+        for segment in segments:
+            if is_glob(segment):
+                compiled = re.compile(fnmatch.translate(segment))
+                for glob, child in node.glob_children:
+                    if glob.pattern == compiled.pattern:
+                        node = child
+                        break
+                else:
+                    child = PathRuleNode()
+                    node.glob_children.append((compiled, child))
+                    node = child
+            else:
+                node = node.children.setdefault(segment, PathRuleNode())
+
+        if prefix is None:
+            node.rules.append((kind, pattern))
+        elif is_glob(prefix):
+            node.prefix_rules.append((prefix, re.compile(fnmatch.translate(prefix + "*")), kind, pattern))
+        else:
+            node.prefix_rules.append((prefix, None, kind, pattern))
+
+    def match(self, path):
+        """ Return the PathMatch of a package path """
+        result = self.matches.get(path)
+        if result is not None:
+            return result
+
+        matched = {EXCLUDE: None, INCLUDE: None, INTERNAL: None}
+        nodes = [self.root]
+        for segment in split_path(path):
+            next_nodes = list()
+            for node in nodes:
+                for kind, pattern in node.rules:
+                    matched[kind] = matched[kind] or pattern
+                for prefix, glob, kind, pattern in node.prefix_rules:
+                    if glob.match(segment) if glob else segment.startswith(prefix):
+                        matched[kind] = matched[kind] or pattern
+                child = node.children.get(segment)
+                if child:
+                    next_nodes.append(child)
+                for glob, child in node.glob_children:
+                    if glob.match(segment):
+                        next_nodes.append(child)
+            nodes = next_nodes
+            if not nodes:
+                break
+        for node in nodes:
+            for kind, pattern in node.rules:
+                matched[kind] = matched[kind] or pattern
+
+        result = PathMatch(None if matched[INCLUDE] else matched[EXCLUDE], matched[INCLUDE], bool(matched[INTERNAL]))
+        self.matches[path] = result
+        return result
+
+    def is_excluded(self, path):
+        """ Return True (and count it against the rule) if this path is excluded """
+        excluded_by = self.match(path).excluded_by
+        if excluded_by:
+            self.prune_counts[excluded_by] += 1
+            return True
+        return False
+
+    def is_internal(self, path):
+        return self.match(path).internal
+
+    def reset_prune_counts(self):
+        for pattern in self.prune_counts:
+            self.prune_counts[pattern] = 0
+
+    def print_prune_counts(self):
+        for pattern, count in sorted(self.prune_counts.items(), key=lambda item: -item[1]):
+            print("[*] Exclusion rule {} pruned {} dependencies".format(pattern, count))
@@ -1,6 +1,7 @@
 # Replace words in assets
 import unreal
 import sys
+import time
 
 HELP_TEXT = '''
 
@@ -11,6 +12,8 @@ Example Usage:
 
     "C:/Modding/Unreal Scripts/replace-words-in-assets.py" /Frontier1944/FactionsREDONE/PlayerClasses/Axis Insurgent Axis
 
+    "C:/Modding/Unreal Scripts/replace-words-in-assets.py" --dry-run /Frontier1944/FactionsREDONE/PlayerClasses/Axis Insurgent Axis
+
 Explaination:
 
     "C:/Modding/Unreal Scripts/replace-words-in-assets.py": path to the script, surrounded with quotes ("") because it contains a space
@@ -21,18 +24,71 @@ Explaination:
 
     Axis:                                                   word to use for the replacement
 
+    --dry-run:                                              only list the renames, don't rename anything
+
+All assets are renamed in a single batch, then the redirectors left
+behind are fixed up (and removed) in a single pass.
+
 '''
 
+asset_registry = unreal.AssetRegistryHelpers.get_asset_registry()
+asset_tools = unreal.AssetToolsHelpers.get_asset_tools()
+
+
+def get_renames(directory_path, word_to_replace, replacement_word):
+    """ Return [(AssetData, new package path, new asset name)] of every asset in
+        the directory (and lower) with the word in its name, from one asset registry query
+    """
+    renames = list()
+    new_paths = set()
+    for asset_data in asset_registry.get_assets_by_path(directory_path.rstrip("/"), recursive=True) or []:
+
+        # Skip this asset if our word is not in it's name
+        asset_name = str(asset_data.get_editor_property("asset_name"))
+        if word_to_replace not in asset_name:
+            continue
+
+        # Get the asset's name with our replacement word
+        package_path = str(asset_data.get_editor_property("package_path"))
+        replacement_asset_name = asset_name.replace(word_to_replace, replacement_word)
+        new_path = "{}/{}".format(package_path, replacement_asset_name)
+
+        # Don't rename over an existing asset (or another asset we're renaming)
+        if not replacement_asset_name or new_path in new_paths or unreal.EditorAssetLibrary.does_asset_exist(new_path):
+            print("[!] Skipping {}: {} already exists".format(asset_name, new_path))
+            continue
+        new_paths.add(new_path)
+        renames.append((asset_data, package_path, replacement_asset_name))
+    return renames
+
+
+def fixup_redirectors(package_names):
+    """ Point everything referencing the redirectors left in these packages
+        at the renamed assets, and remove the redirectors (in one pass)
+    """
+    ar_filter = unreal.ARFilter(package_names=list(package_names), class_names=["ObjectRedirector"])
+    redirector_data = asset_registry.get_assets(ar_filter) or []
+    redirectors = [asset_data.get_asset() for asset_data in redirector_data]
+    redirectors = [redirector for redirector in redirectors if redirector]
+    if redirectors:
+        asset_tools.fixup_referencers(redirectors)
+    return len(redirectors)
+
 def main():
 
     # Get script title (pull from our arguments list: sys.argv)
     script_title = sys.argv.pop(0)
 
+    # Only list what we'd rename?
+    dry_run = "--dry-run" in sys.argv
+    if dry_run:
+        sys.argv.remove("--dry-run")
+
     # If no arguments were provided, exit
     if len(sys.argv) < 2:
         print("-------------------------------")
         print("[!] Missing arguments!")
-        print("Usage: {} <path/to/directory/to/search> <word_to_replace> [replacement_word".format(script_title))
+        print("Usage: {} [--dry-run] <path/to/directory/to/search> <word_to_replace> [replacement_word]".format(script_title))
         print(HELP_TEXT)
         print("-------------------------------")
         return
@@ -50,31 +106,50 @@ def main():
     else:
         replacement_word = ""
 
+    start_time = time.time()
+    renames = get_renames(directory_path, word_to_replace, replacement_word)
+    print("[*] Found {} assets to rename in {:.3f}s".format(len(renames), time.time() - start_time))
+
+    # Preview the renames
+    for asset_data, package_path, replacement_asset_name in renames:
+        print("    {} -> {}/{}".format(asset_data.get_editor_property("package_name"), package_path, replacement_asset_name))
+    if dry_run or not renames:
+        return
+
+    # Load the assets we're renaming
+    start_time = time.time()
+    rename_data = list()
+    with unreal.ScopedSlowTask(len(renames), "Loading assets to rename ...") as slow_task:
+        slow_task.make_dialog(True)
+        for asset_data, package_path, replacement_asset_name in renames:
+            if slow_task.should_cancel():
+                print("[!] Cancelled renaming assets -- nothing was renamed")
+                return
+            slow_task.enter_progress_frame(1, str(asset_data.get_editor_property("asset_name")))
+            asset = asset_data.get_asset()
+            if not asset:
+                print("[!] Couldn't load {}, skipping it".format(asset_data.get_editor_property("object_path")))
+                continue
+            rename_data.append(unreal.AssetRenameData(asset, package_path, replacement_asset_name))
+    print("[*] Loaded {} assets in {:.3f}s".format(len(rename_data), time.time() - start_time))
+
     # Perform the below operations in a ScopedTransaction, which
     # allows us to undo changes afterwards
     with unreal.ScopedEditorTransaction("Rename Assets") as trans:
 
-        # Find all assets in the target directory (and lower; recursive)
-        # and replace the specified word with our specific replacement word
-        for asset_path in unreal.EditorAssetLibrary.list_assets(directory_path):
-
-            # Get asset data
-            asset_data = unreal.EditorAssetLibrary.find_asset_data(asset_path)
-
-            # Skip this asset if our word is not in it's name
-            asset_name = str(asset_data.get_editor_property("asset_name"))
-            if word_to_replace not in asset_name:
-                continue
-            
-            # Get the asset's name with our replacement word
-            replacement_asset_name = asset_name.replace(word_to_replace, replacement_word)
-            asset_path_with_replacement_word = asset_path.replace(asset_name, replacement_asset_name)
+        # Rename every asset at once, so references are only updated once
+        start_time = time.time()
+        if not asset_tools.rename_assets(rename_data):
+            print("[!] Some assets couldn't be renamed -- see the Output Log")
+        print("[*] Renamed {} assets in {:.3f}s".format(len(rename_data), time.time() - start_time))
 
-            # Add this asset to our list of assets to rename
-            unreal.EditorAssetLibrary.rename_asset(asset_path, asset_path_with_replacement_word)
+        # Then get rid of the redirectors the renames left behind
+        start_time = time.time()
+        redirector_count = fixup_redirectors(str(asset_data.get_editor_property("package_name")) for asset_data, _, _ in renames)
+        print("[*] Fixed up {} redirectors in {:.3f}s".format(redirector_count, time.time() - start_time))
 
-            # Automatically save the renamed asset
-            # unreal.EditorAssetLibrary.save_asset(asset_path)
+        # Automatically save the renamed assets
+        # unreal.EditorAssetLibrary.save_directory(directory_path)
 
 
 # Start the main function!
@@ -5,6 +5,7 @@ from collections import Counter, defaultdict, OrderedDict
 
 import unreal
 import re
+import sys
 import traceback
 import os
 import json
@@ -13,6 +14,16 @@ import posixpath
 import math
 from glob import glob
 
+# Make the helper modules next to this script importable
+# when it's run from the editor's Python console
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from spawn_layout import SpawnLayoutGenerator
+from spawn_service import SpawnService, SpawnSpec
+from world_snapshot import WorldSnapshot
+from trace_scheduler import TraceScheduler
+from cover_placement import ProbeHit, get_cover_probes, get_ground_probe, get_stance, solve_cover, solve_ground
+
 # This is the SCALE / 100 which we set in HammUEr when importing models.
 # Source maps are bigger than Sandstorm for whatever reason --
 # so we've had to scale things down a bit.
@@ -42,6 +53,10 @@ THREE_NUM_STR_RE = re.compile(r'^[-0-9.]+ [-0-9.]+ [-0-9.]+$')
 # don't place the same actor multiple times
 PLACED_ACTORS = set()
 
+# Tool brush (tools*, including nodraw/skybox/clips) and skybox actors
+# every trace we cast should ignore. Computed once per run -- see get_trace_ignore_actors
+TRACE_IGNORE_ACTORS = None
+
 # Shortcuts for creating material node connections
 CREATE_EXPRESSION = unreal.MaterialEditingLibrary.create_material_expression
 CREATE_CONNECTION = unreal.MaterialEditingLibrary.connect_material_expressions
@@ -51,6 +66,18 @@ CONNECT_EXPRESSIONS = unreal.MaterialEditingLibrary.connect_material_expressions
 # Use to create material node connections
 CHILD_OBJECT_REGEX = re.compile(r".*_\d{3}$")
 
+# Blueprints we spawn (potentially thousands of times)
+AI_COVER_ACTOR_BLUEPRINT = "/Game/Game/AI/Actors/AICoverActor"
+SUPPLY_CRATE_BLUEPRINT = "/Game/Game/Actors/World/BP_SupplyCrate_Base"
+
+# The open world's actors, listed once per run and shared by every stage
+# (kept up to date with what we spawn, destroy and move to sublevels)
+WORLD_SNAPSHOT = WorldSnapshot()
+
+# Spawns actors in batches and makes sure we only
+# load each Blueprint class once per run
+SPAWN_SERVICE = SpawnService(on_spawned=WORLD_SNAPSHOT.add)
+
 
 def isnumeric(value):
     try:
@@ -250,8 +277,14 @@ def get_all_actors(use_selection=False, actor_class=None, actor_tag=None, world=
     # actor_class: class unreal.Actor : The class used to filter the actors. Can be None if you do not want to use this filter
     # actor_tag: str : The tag used to filter the actors. Can be None if you do not want to use this filter
     # world: obj unreal.World : The world you want to get the actors from. If None, will get the actors from the currently open world.
-    # return: obj List unreal.Actor : The actors
+    # return: obj List unreal.Actor : The actors (don't modify this list -- it may be WORLD_SNAPSHOT's)
     """
+    if not use_selection and world is None:
+        # The open world's actors come from this run's snapshot
+        actors = WORLD_SNAPSHOT.get_actors(actor_class)
+        if actor_tag:
+            return [x for x in actors if x.actor_has_tag(actor_tag)]
+        return actors
     world = world if world is not None else unreal.EditorLevelLibrary.get_editor_world() # Make sure to have a valid world
     if use_selection:
         selected_actors = get_selected_actors()
@@ -284,7 +317,7 @@ def hide_all_actors_with_material_name(material_name):
         
         # Find all actors with the specified material and add them
         # to the "matching_actors" list.
-        for actor in get_all_actors(actor_class=unreal.StaticMeshActor):
+        for actor in WORLD_SNAPSHOT.get_actors(unreal.StaticMeshActor):
 
             if actor_contains_material(actor, material_name):
                 print(" - hiding actor: %s" % actor.get_name())
@@ -322,37 +355,11 @@ def spawn_blueprint_actor(asset_path='', label=None, actor_location=None, actor_
     # properties: dict : The properties you want to set before the actor is spawned. These properties will be taken into account in the Construction Script
     # return: obj unreal.Actor : The spawned actor
     """
-    if actor_location:
-        actor_location = actor_location if isinstance(actor_location, unreal.Vector) else unreal.Vector(*actor_location)
-    if actor_rotation:
-        actor_rotation = actor_rotation if isinstance(actor_rotation, unreal.Rotator) else unreal.Rotator(*actor_rotation)
-
-    # Attempt to find the specified Blueprint class
-    actor_class = unreal.EditorAssetLibrary.load_blueprint_class(asset_path)
-
-    # Spawn the blueprint class!
-    actor = unreal.EditorLevelLibrary.spawn_actor_from_class(
-        actor_class, location=actor_location, rotation=actor_rotation)
-    if not actor:
-        print("[!] Failed to spawn actor: %s" % label)
-        return None
-
-    # If "actor_rotation" is actuall a Vector and not a Rotator,
-    # we'll assume the caller wanted to add local rotation
-    if local_rotation:
-        actor.add_actor_local_rotation(local_rotation, sweep=False, teleport=True)
-    if actor_scale:
-        actor.set_actor_scale3d(actor_scale)
-    if label:
-        actor.set_actor_label(label)
-    if hidden:
-        actor.set_actor_hidden_in_game(hidden)
-
-    # Edit Properties
-    for x in properties:
-        actor.set_editor_property(x, properties[x])
-
-    return actor
+    # The Blueprint class is loaded (once) through SPAWN_SERVICE's class cache.
+    # Use SPAWN_SERVICE.spawn_batch when spawning more than a handful of actors!
+    return SPAWN_SERVICE.spawn(SpawnSpec(
+        asset_path, location=actor_location, rotation=actor_rotation, scale=actor_scale, label=label,
+        properties=properties, local_rotation=local_rotation, hidden=hidden))
 
 
 def select_actors(actors_to_select=[]):
@@ -405,7 +412,7 @@ def generate_entity_spreadsheets(open_directory=False):
 
 def get_sky_camera(actors_to_search=None):
     # Find the sky_camera actor
-    actors_to_search = actors_to_search if actors_to_search else get_all_actors(actor_class=unreal.Note)
+    actors_to_search = actors_to_search if actors_to_search else WORLD_SNAPSHOT.get_actors(unreal.Note)
     for actor in actors_to_search:
         # Skip null ObjectInstance actors
         # (which trigger: Exception: WorldSettings: Internal Error - ObjectInstance is null!)
@@ -423,7 +430,8 @@ def get_skybox_actors(sky_camera_actor=None, max_distance_to_skybox=6000,
     skybox_actors = dict()
 
     # Find the sky_camera actor
-    actors_to_search = actors_to_search if actors_to_search else get_all_actors()
+    persistent_level_name = WORLD_SNAPSHOT.get_persistent_level_name()
+    actors_to_search = actors_to_search if actors_to_search else WORLD_SNAPSHOT.get_actors(level_name=persistent_level_name)
     if not sky_camera_actor:
         sky_camera_actor = get_sky_camera(actors_to_search)
     sky_camera_location = sky_camera_actor.get_actor_location()
@@ -440,14 +448,9 @@ def get_skybox_actors(sky_camera_actor=None, max_distance_to_skybox=6000,
         # If this actor isn't in PersistentLevel, skip it
         # as it's already in a sublevel (and normally wouldn't be
         # unless we put it there on purpose)
-        try:
-            actor_level = actor.get_outer()
-        except:
-            # We couldn't get this actor's "outer" -- skip it!
-            continue
-
-        actor_level_name = actor_level.get_name()
-        if actor_level_name != "PersistentLevel":
+        # (WORLD_SNAPSHOT caches each actor's level -- None if we couldn't get its "outer")
+        actor_level_name = WORLD_SNAPSHOT.get_level_name(actor)
+        if actor_level_name != persistent_level_name:
             continue
 
         actor_distance_to_sky_camera = actor.get_actor_bounds(False)[0].distance(sky_camera_location)
@@ -620,6 +623,20 @@ def actor_contains_material_starting_with(actor, material_name):
     return False
 
 
+def get_trace_ignore_actors(actors=None):
+    """ Return the actors all of our traces should ignore (tool brushes, nodraw, skybox, ...).
+        fix_everything sets these from its actor classification; otherwise we
+        find them once by checking the materials of every StaticMeshActor.
+    """
+    global TRACE_IGNORE_ACTORS
+    if TRACE_IGNORE_ACTORS is None:
+        actors = actors if actors else get_all_actors(actor_class=unreal.StaticMeshActor)
+        TRACE_IGNORE_ACTORS = [actor for actor in actors
+                               if actor and actor_contains_material_starting_with(actor, "tools")]
+        print("[*] Traces will ignore %d tool actors" % len(TRACE_IGNORE_ACTORS))
+    return TRACE_IGNORE_ACTORS
+
+
 def actor_contains_material(actor, material_name, containing=True):
     """ If this actor is StaticMeshActor and contains a material with
         a name beginning with any of the words in the provided words_tuple,
@@ -716,14 +733,16 @@ def actor_contains_material_containing(actor, material_name, all_mats_must_match
     return False
 
 
-def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], ignore_with_mats=None, height=0, width=0.35):
+def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], actors_to_ignore=None, height=0, width=0.35,
+                              draw_debug_type=unreal.DrawDebugTrace.NONE):
     """ Ensure our actor isn't overlapping with anything in the specified direction
         and reposition it if it is. height: 0 == feet, height: 1 == head
+        Tool brushes are ignored by the traces themselves (see get_trace_ignore_actors)
     """
     if not direction:
         return False, 0
-    if not ignore_with_mats:
-        ignore_with_mats = ("tools")
+    if actors_to_ignore is None:
+        actors_to_ignore = get_trace_ignore_actors()
 
     actor_bounds = actor.get_actor_bounds(only_colliding_components=False)
     actor_location = actor.get_actor_location()
@@ -744,20 +763,17 @@ def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], i
             world,
             start=raycast_location, end=position_slightly_in_front_of_actor,
             trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
-            trace_complex=True, actors_to_ignore=[], draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION,
+            trace_complex=True, actors_to_ignore=actors_to_ignore, draw_debug_type=draw_debug_type,
             ignore_self=True)
         if hit_results:
             for hit_result in hit_results:
                 hit_result_info = hit_result.to_tuple()
 
                 # Skip doing anything if this actor is a type we should ignore
-                if hit_result_info[9].get_class() in ignore_classes:
+                if ignore_classes and hit_result_info[9].get_class() in ignore_classes:
                     print("%s == %s" % (hit_result_info[9].get_name(), hit_result_info[9].get_class()))
                     continue
 
-                if actor_contains_material_starting_with(hit_result_info[9], ignore_with_mats):
-                    continue
-
                 # We hit something we're not ignoring! Position us out of it's bounds
                 actor.set_actor_location(actor_location - (
                         (actor.get_actor_forward_vector() * direction) * 40),
@@ -780,17 +796,14 @@ def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], i
             world,
             start=raycast_location, end=position_slightly_to_the_right_of_actor,
             trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
-            trace_complex=True, actors_to_ignore=[], draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION,
+            trace_complex=True, actors_to_ignore=actors_to_ignore, draw_debug_type=draw_debug_type,
             ignore_self=True)
         if hit_results:
             for hit_result in hit_results:
                 hit_result_info = hit_result.to_tuple()
 
                 # Skip doing anything if this actor is a type we should ignore
-                if hit_result_info[9].get_class() in ignore_classes:
-                    continue
-
-                if actor_contains_material_starting_with(hit_result_info[9], ignore_with_mats):
+                if ignore_classes and hit_result_info[9].get_class() in ignore_classes:
                     continue
 
                 # We hit something we're not ignoring! Position us out of it's bounds
@@ -823,7 +836,7 @@ def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], i
             world,
             start=raycast_location, end=position_slightly_below_actor,
             trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
-            trace_complex=True, actors_to_ignore=[], draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION,
+            trace_complex=True, actors_to_ignore=actors_to_ignore, draw_debug_type=draw_debug_type,
             ignore_self=True)
         if hit_results:
             for hit_result in hit_results:
@@ -845,9 +858,6 @@ def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], i
                 # 15. trace_end=[0.0, 0.0, 0.0]
                 # VIEW INFO: print(hit_result.to_tuple())
                 hit_result_info = hit_result.to_tuple()
-                if actor_contains_material_starting_with(hit_result_info[9], ignore_with_mats):
-                    continue
-
                 if direction == 1:
 
                     # We hit something above us!
@@ -893,18 +903,14 @@ def raycast_reposition_on_hit(actor, world, direction=None, ignore_classes=[], i
                 world,
                 start=raycast_location_copy, end=diag_position,
                 trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
-                trace_complex=True, actors_to_ignore=[], draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION,
+                trace_complex=True, actors_to_ignore=actors_to_ignore, draw_debug_type=draw_debug_type,
                 ignore_self=True)
             if hit_results:
                 for hit_result in hit_results:
                     hit_result_info = hit_result.to_tuple()
 
                     # Skip doing anything if this actor is a type we should ignore
-                    if hit_result_info[9].get_class() in ignore_classes:
-                        continue
-
-                    if actor_contains_material_starting_with(hit_result_info[9], ignore_with_mats):
-                        print("HIT DIAG BUT IGNORED MAT")
+                    if ignore_classes and hit_result_info[9].get_class() in ignore_classes:
                         continue
 
                     # We hit something we're not ignoring! Position us out of it's bounds
@@ -1071,8 +1077,9 @@ def convert_txt_format_to_json(mapfile_contents):
     return json_data
 
 
-def convert_note_to_nbot_cover(item, sublevels=None, fire_from_feet=True):
-    """ Spawn a CoverActor where this note resides.
+def get_nbot_cover_spawn_spec(item):
+    """ Return the SpawnSpec for the AICoverActor replacing this nbot_cover note
+        (or None if it was already placed).
     Example Note Details:
     Deployable = 0
     ProtectionAngle = 135
@@ -1090,7 +1097,7 @@ def convert_note_to_nbot_cover(item, sublevels=None, fire_from_feet=True):
     # This AICoverActor was already placed during a previous
     # execution of this script! Skip it
     if new_actor_label in PLACED_ACTORS:
-        return
+        return None
 
     # NOTE: Origin is (Y, X, Z)
     # NOTE: angles is (Y, Z, X) -- Yes, it's weird. Thanks, Source.
@@ -1102,48 +1109,106 @@ def convert_note_to_nbot_cover(item, sublevels=None, fire_from_feet=True):
     cover_actor_location.z -= 80
     cover_actor_rotation = unreal.Rotator(*get_source_engine_world_rotation(note["angles"]))
 
-    # Spawn the new actor
-    new_actor = spawn_blueprint_actor("/Game/Game/AI/Actors/AICoverActor",
-                          label=new_actor_label,
-                          actor_location=cover_actor_location,
-                          actor_rotation=cover_actor_rotation,
-                          actor_scale=note_actor.get_actor_scale3d(),
-                          properties=dict())
+    return SpawnSpec(AI_COVER_ACTOR_BLUEPRINT,
+                     label=new_actor_label,
+                     location=cover_actor_location,
+                     rotation=cover_actor_rotation,
+                     scale=note_actor.get_actor_scale3d())
+
+
+def convert_notes_to_nbot_covers(items, sublevels=None, draw_debug_type=unreal.DrawDebugTrace.NONE):
+    """ Spawn a CoverActor where each of these notes reside (in one batch),
+        then move each one out of the geometry it overlaps with """
+    spec_items = list()
+    specs = list()
+    for item in items:
+        spec = get_nbot_cover_spawn_spec(item)
+        if spec:
+            spec_items.append(item)
+            specs.append(spec)
+
+    # Spawn every AICoverActor at once
+    new_actors, _ = SPAWN_SERVICE.spawn_batch(specs, "Spawn AICoverActors")
 
     # Get the current world
     world_context_object = unreal.EditorLevelLibrary.get_editor_world()
 
-    # Reposition to the ground, changing our stance if the ground
-    # is *very* close to the position we were spawned in
-    stance = unreal.SoldierStance.STAND
-    hit_something_below, distance = raycast_reposition_on_hit(new_actor, world_context_object, "down")
-    if hit_something_below:
-        if distance < 220:
-            stance = unreal.SoldierStance.CROUCH
-        elif distance < 160:
-            stance = unreal.SoldierStance.PRONE
-
-    # Make sure our new AICoverActor isn't overlapping with any objects
-    # by moving it out of the way of objects it overlaps with!
-    for height in range(0, 10):
-        height /= 10.0
-        for dir in ["forward", "backwards", "right", "left", "diags"]:
-            hit_something, distance = raycast_reposition_on_hit(new_actor, world_context_object, direction=dir, height=height)
-            # if hit_something:
-            #    print("hit!")
-
-    raycast_reposition_on_hit(new_actor, world_context_object, direction="forward", width=1.1)
-    raycast_reposition_on_hit(new_actor, world_context_object, direction="backwards", width=1.1)
-
-    # If our AICoverActor is overlapping with something above it, make it crouch!
-    hit_something_above, distance = raycast_reposition_on_hit(new_actor, world_context_object, "up")
-    if hit_something_above:
-        print("dist to hit above: %d" % distance)
-        if distance < 270:
-            stance = unreal.SoldierStance.CROUCH
-        elif distance < 180:
-            stance = unreal.SoldierStance.PRONE
+    covers = [(item, new_actor) for item, new_actor in zip(spec_items, new_actors) if new_actor]
+    place_nbot_covers(covers, world_context_object, sublevels, draw_debug_type=draw_debug_type)
+
+
+def convert_note_to_nbot_cover(item, sublevels=None, fire_from_feet=True, draw_debug_type=unreal.DrawDebugTrace.NONE):
+    """ Spawn a CoverActor where this note resides. """
+    convert_notes_to_nbot_covers([item], sublevels, draw_debug_type=draw_debug_type)
+
 
+def vector_to_tuple(vector):
+    return (vector.x, vector.y, vector.z)
+
+
+def place_nbot_covers(covers, world_context_object, sublevels=None, draw_debug_type=unreal.DrawDebugTrace.NONE):
+    """ Reposition freshly spawned AICoverActors and set up their CoverComponents.
+        covers: list of (item, new_actor) tuples. The probe rays of *all* covers are
+        built up front and traced in batches by a TraceScheduler, then each cover's
+        final location and stance are solved in Python and applied once.
+    """
+    trace_scheduler = TraceScheduler(
+        world_context_object, draw_debug_type=draw_debug_type, actors_to_ignore=get_trace_ignore_actors())
+
+    def to_probe_hits(hits):
+        return [ProbeHit(hit.distance, vector_to_tuple(hit.impact_point)) for hit in hits]
+
+    # Read each cover's transform and bounds once
+    placements = list()
+    for item, new_actor in covers:
+        placements.append({
+            "item": item,
+            "actor": new_actor,
+            "location": vector_to_tuple(new_actor.get_actor_location()),
+            "extent": vector_to_tuple(new_actor.get_actor_bounds(only_colliding_components=False)[1]),
+            "forward": vector_to_tuple(new_actor.get_actor_forward_vector()),
+            "right": vector_to_tuple(new_actor.get_actor_right_vector()),
+            "up": vector_to_tuple(new_actor.get_actor_up_vector()),
+        })
+
+    # Find the ground below every cover
+    for placement in placements:
+        probe = get_ground_probe(placement["location"], placement["extent"], placement["up"])
+        trace_scheduler.add(probe.start, probe.end)
+    ground_hits = trace_scheduler.run("Finding the ground below AICoverActors ...")
+    for placement, hits in zip(placements, ground_hits):
+        placement["location"], placement["ground_distance"] = solve_ground(
+            placement["location"], placement["extent"], to_probe_hits(hits))
+
+    # Probe around every (grounded) cover for geometry it overlaps with
+    for placement in placements:
+        placement["probes"] = get_cover_probes(placement["location"], placement["extent"],
+                                               placement["forward"], placement["right"], placement["up"])
+        for probe in placement["probes"]:
+            trace_scheduler.add(probe.start, probe.end)
+    probe_hits = trace_scheduler.run("Probing around AICoverActors ...")
+
+    # Solve and apply a single transform (and CoverComponent update) per cover
+    probe_index = 0
+    for placement in placements:
+        probes = placement["probes"]
+        solution = solve_cover(placement["location"], placement["ground_distance"], probes,
+                               [to_probe_hits(hits) for hits in probe_hits[probe_index:probe_index + len(probes)]])
+        probe_index += len(probes)
+
+        new_actor = placement["actor"]
+        new_actor.set_actor_location(unreal.Vector(*solution.location), sweep=False, teleport=True)
+        set_nbot_cover_properties(new_actor, placement["item"]["note"], getattr(unreal.SoldierStance, solution.stance))
+
+        # Add this new AICoverActor to our "actors" list,
+        # to be sent to the "AI" sublevel
+        if sublevels:
+            sublevels["AI"]["actors"].append(new_actor)
+
+    print("[*] Placed %d AICoverActors using %d traces" % (len(placements), trace_scheduler.total_traces))
+
+
+def set_nbot_cover_properties(new_actor, note, stance):
     # new_actor is an AICoverActor, which has
     # a "Cover" component. The "Cover" component
     # can define the stance, protection angle, launcher priority (good rocket launcher position?),
@@ -1157,11 +1222,6 @@ def convert_note_to_nbot_cover(item, sublevels=None, fire_from_feet=True):
         "rank": note["Ranking"] if "Ranking" in note else 200  # Save 300 for high-priority locations
     })
 
-    # Add this new AICoverActor to our "actors" list,
-    # to be sent to the "AI" sublevel
-    if sublevels:
-        sublevels["AI"]["actors"].append(new_actor)
-
 
 def parse_note_actors(note_actors, sublevels):
 
@@ -1187,8 +1247,7 @@ def parse_note_actors(note_actors, sublevels):
 
     # Place all nbot_covers
     if "nbot_cover" in sublevels["Notes"]:
-        for item in sublevels["Notes"]["nbot_cover"].values():
-            convert_note_to_nbot_cover(item, sublevels)
+        convert_notes_to_nbot_covers(sublevels["Notes"]["nbot_cover"].values(), sublevels)
 
     # HammUEr is trash for importing notes ... :(
     # We'll need to use our map_info and map_data to figure
@@ -1202,7 +1261,7 @@ def create_capture_zone(label, location):
         print("[!] Already placed ObjectiveCapturable: %s" % label)
         return None
     location = location if isinstance(location, unreal.Vector) else unreal.Vector(*location)
-    cza = unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.CaptureZone, location, unreal.Rotator(0, 0, 0))
+    cza = SPAWN_SERVICE.spawn(SpawnSpec(unreal.CaptureZone, location, unreal.Rotator(0, 0, 0)))
     cza.set_actor_label(label)
     cza.set_actor_scale3d(unreal.Vector(8, 8, 6))  # TODO: Find a way to set the actual scale of DoI capture zones ...
     cza.set_editor_property("spawn_collision_handling_method", unreal.SpawnActorCollisionHandlingMethod.ALWAYS_SPAWN)
@@ -1218,7 +1277,7 @@ def create_objective_capturable(label, location, rotation, capture_zones=None, c
         cls = unreal.ObjectiveCapturable
     location = location if isinstance(location, unreal.Vector) else unreal.Vector(*location)
     rotation = rotation if isinstance(rotation, unreal.Rotator) else unreal.Rotator(*rotation)
-    oca = unreal.EditorLevelLibrary.spawn_actor_from_class(cls, location, rotation)
+    oca = SPAWN_SERVICE.spawn(SpawnSpec(cls, location, rotation))
     oca.set_actor_label(label)
     if capture_zones:
         oca.set_editor_property("capture_zones", capture_zones)
@@ -1246,9 +1305,7 @@ def create_spawnzone(label, location, team_id):
     location = location if isinstance(location, unreal.Vector) else unreal.Vector(*location)
 
     # Create the INSSpawnZone actor for this spawn using the spawn's locaiton
-    sza = unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.SpawnZone,
-                                                           location=location,
-                                                           rotation=unreal.Rotator(0, 0, 0))
+    sza = SPAWN_SERVICE.spawn(SpawnSpec(unreal.SpawnZone, location=location, rotation=unreal.Rotator(0, 0, 0)))
     sza.set_actor_label(label)
     sza.set_editor_property("team_id", team_id)
     sza.set_actor_enable_collision(False)
@@ -1264,9 +1321,8 @@ def create_spawnzone_counterattack(label, location, team_id):
     location = location if isinstance(location, unreal.Vector) else unreal.Vector(*location)
 
     # Create the INSSpawnZone actor for this spawn using the spawn's locaiton
-    sza = unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.SpawnZoneCounterAttack,
-                                                           location=location,
-                                                           rotation=unreal.Rotator(0, 0, 0))
+    sza = SPAWN_SERVICE.spawn(SpawnSpec(unreal.SpawnZoneCounterAttack, location=location,
+                                        rotation=unreal.Rotator(0, 0, 0)))
     sza.set_actor_label(label)
     sza.set_editor_property("team_id", team_id)
     sza.set_actor_enable_collision(False)
@@ -1274,52 +1330,68 @@ def create_spawnzone_counterattack(label, location, team_id):
     return sza
 
 
-def create_spawns_in_spawnzone(spawn_zone, rows=4, cols=4):
-    """ Attempt to create evenly-spaced INSPlayerStart spawns in the specified SpawnZone """
+def get_spawnzone_spawn_specs(spawn_zone, locations):
+    """ Return SpawnSpecs for INSPlayerStart spawns at these locations in the specified SpawnZone """
+    team_id = spawn_zone.get_editor_property("team_id")
+    return [SpawnSpec(unreal.INSPlayerStart, location=location, rotation=unreal.Rotator(0, 0, 0),
+                      properties={
+                          "enabled": False,
+                          "team_specific": True,
+                          "team_id": team_id,
+                          "associated_spawn_zone": spawn_zone,
+                          "spawn_collision_handling_method": unreal.SpawnActorCollisionHandlingMethod.ALWAYS_SPAWN
+                      })
+            for location in locations]
 
-    print("[*] Creating %d * %d (%d) spawns in spawn zone: %s" % (rows, cols, rows*cols, spawn_zone.get_name()))
 
-    # Cast a ray from the top of the Spawnzone to the bottom and ... ?
-    szl = spawn_zone.get_actor_location()
-    team_id = spawn_zone.get_editor_property("team_id")
-    padding = 150
-    height_offset = 200
-
-    spawns = list()
-    for row in reversed(range(0, rows)):
-        for col in reversed(range(0, cols)):
-            
-            # Attempt to set location in a grid-like, padded pattern
-            location = unreal.Vector(szl.x - (row * padding / 2), szl.y - (col * padding / 2), szl.z + height_offset)
-            sp = unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.INSPlayerStart,
-                                                                  location=location,
-                                                                  rotation=unreal.Rotator(0, 0, 0))
-            # TODO: Reposition spawn correctly using raycasts ... ?
-            sp.set_editor_properties({
-                "enabled": False,
-                "team_specific": True,
-                "team_id": team_id,
-                "associated_spawn_zone": spawn_zone,
-                "spawn_collision_handling_method": unreal.SpawnActorCollisionHandlingMethod.ALWAYS_SPAWN
-            })
-
-            # Add this spawn
-            spawns.append(sp)
-
-    print("[*] SPAWNED %d SPAWNS FOR SPAWN_ZONE: %s" % (len(spawns), spawn_zone.get_name()))
+def get_spawn_layout_generator(world=None):
+    """ Return a SpawnLayoutGenerator which traces through tool brushes """
+    return SpawnLayoutGenerator(world, actors_to_ignore=get_trace_ignore_actors())
+
+
+def create_spawns_in_spawnzones(spawn_zones, rows=4, cols=4):
+    """ Create ground-snapped INSPlayerStart spawns in all of the specified SpawnZones
+        return: obj List unreal.INSPlayerStart : all spawns created
+    """
+    if not spawn_zones:
+        return []
+
+    print("[*] Creating up to %d * %d (%d) spawns in %d spawn zones" % (rows, cols, rows*cols, len(spawn_zones)))
+
+    # Propose, trace and snap spawn points for every spawn zone in a single pass
+    layouts = get_spawn_layout_generator().generate([(sz, rows * cols) for sz in spawn_zones])
+
+    specs = list()
+    for spawn_zone, locations in zip(spawn_zones, layouts):
+        specs += get_spawnzone_spawn_specs(spawn_zone, locations)
+
+    spawns, _ = SPAWN_SERVICE.spawn_batch(specs, "Spawn INSPlayerStarts")
+    spawns = [sp for sp in spawns if sp]
+
+    print("[*] SPAWNED %d SPAWNS FOR %d SPAWN_ZONES" % (len(spawns), len(spawn_zones)))
 
     # TODO: Maybe automate this portion? Not sure where to find the correct rotations ...
     print("[!] MAKE SURE TO MANUALLY ROTATE SPAWN POINTS!!!!")
     return spawns
 
 
-def create_supply_crate(label, location, rotation):
+def create_spawns_in_spawnzone(spawn_zone, rows=4, cols=4):
+    """ Attempt to create evenly-spaced, ground-snapped INSPlayerStart spawns in the specified SpawnZone """
+    return create_spawns_in_spawnzones([spawn_zone], rows=rows, cols=cols)
+
+
+def get_supply_crate_spawn_spec(label, location, rotation):
     if label in PLACED_ACTORS:
         print("[!] Already placed BP_SupplyCrate_Base: %s" % label)
         return None
-    scba = spawn_blueprint_actor("/Game/Game/Actors/World/BP_SupplyCrate_Base", label, location, rotation)
-    scba.set_actor_label(label)
-    return scba
+    return SpawnSpec(SUPPLY_CRATE_BLUEPRINT, location=location, rotation=rotation, label=label)
+
+
+def create_supply_crate(label, location, rotation):
+    spec = get_supply_crate_spawn_spec(label, location, rotation)
+    if not spec:
+        return None
+    return SPAWN_SERVICE.spawn(spec)
 
 
 def create_gamemode_actors(gamemode, map_info, map_data, sublevels):
@@ -1419,6 +1491,7 @@ def create_gamemode_actors(gamemode, map_info, map_data, sublevels):
     sublevels[gamemode]["objective_based_spawns"] = list()
     attacking_team = 0 if "Security" in gamemode else 1
     spawns_that_exist = dict()
+    player_start_spawnzones = list()
 
     # COOP gamemodes have navspawns (all?)
     if "navspawns" in gamemode_info:
@@ -1463,14 +1536,13 @@ def create_gamemode_actors(gamemode, map_info, map_data, sublevels):
                         sza = create_spawnzone(spawn_name, sz[spawn_label], team_id)
                         if sza:
 
-                            # Attempt to create INSPlayerStarts (16) for this INSSpawnZone
-                            spawns = create_spawns_in_spawnzone(sza, rows=4, cols=4)
+                            # Queue up INSPlayerStarts (16) for this INSSpawnZone;
+                            # we'll lay out and spawn them for all spawnzones at once below
+                            player_start_spawnzones.append(sza)
 
                             # Add this INSSpawnZone to our list of spawnzones
                             objective_spawnzones.append(sza)
                             sublevels[gamemode]["actors"].append(sza)
-                            for spawn in spawns:
-                                sublevels[gamemode]["actors"].append(spawn)
 
                             # Ensure no dupes
                             spawns_that_exist[spawn_name] = True
@@ -1509,6 +1581,10 @@ def create_gamemode_actors(gamemode, map_info, map_data, sublevels):
                 if objective_spawnzones:
                     sublevels[gamemode]["objective_based_spawns"].append(objective_spawnzones)
 
+        # Create ground-snapped INSPlayerStarts for every spawnzone in one pass
+        for spawn in create_spawns_in_spawnzones(player_start_spawnzones, rows=4, cols=4):
+            sublevels[gamemode]["actors"].append(spawn)
+
     # PVP Gamemode
     else:
 
@@ -1672,9 +1748,15 @@ def create_gamemode_actors(gamemode, map_info, map_data, sublevels):
 
     # ------------------------------------ 2. Create misc entities! (like SupplyCrates)
     if "entities" in gamemode_info:
+        supply_crate_specs = list()
         for entity_key, entity in gamemode_info["entities"].items():
             if entity_key.startswith("obj_ammo_crate"):
-                sc = create_supply_crate(entity["targetname"], entity["origin"], entity["angles"])
+                spec = get_supply_crate_spawn_spec(entity["targetname"], entity["origin"], entity["angles"])
+                if spec:
+                    supply_crate_specs.append(spec)
+        supply_crates, _ = SPAWN_SERVICE.spawn_batch(supply_crate_specs, "Spawn Supply Crates")
+        for sc in supply_crates:
+            if sc:
                 sublevels[gamemode]["actors"].append(sc)
 
 
@@ -1938,33 +2020,32 @@ def debug_selected_cover_actor():
     if isinstance(cover_actor, unreal.Note):
 
         convert_note_to_nbot_cover({"actor": cover_actor, "note": get_note_actor_details(cover_actor)},
-                                   fire_from_feet=False)
+                                   fire_from_feet=False, draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION)
 
     else:
 
         # Make sure our new AICoverActor isn't overlapping with any objects
         # by moving it out of the way of objects it overlaps with!
         for dir in ["forward", "right", "left", "diags"]:
-            raycast_reposition_on_hit(cover_actor, world_context_object, direction=dir)
+            raycast_reposition_on_hit(cover_actor, world_context_object, direction=dir,
+                                      draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION)
 
         # Reposition to the ground, changing our stance if the ground
         # is *very* close to the position we were spawned in
-        stance = unreal.SoldierStance.STAND
-        hit_something_below, distance = raycast_reposition_on_hit(cover_actor, world_context_object, "down")
-        if hit_something_below:
-            if distance < 220:
-                stance = unreal.SoldierStance.CROUCH
-            elif distance < 160:
-                stance = unreal.SoldierStance.PRONE
+        hit_something_below, distance = raycast_reposition_on_hit(
+            cover_actor, world_context_object, "down", draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION)
+        ground_distance = distance if hit_something_below else None
 
         # If our AICoverActor is overlapping with something above it, make it crouch!
-        hit_something_above, distance = raycast_reposition_on_hit(cover_actor, world_context_object, "up")
+        hit_something_above, distance = raycast_reposition_on_hit(
+            cover_actor, world_context_object, "up", draw_debug_type=unreal.DrawDebugTrace.FOR_DURATION)
+        ceiling_distance = distance if hit_something_above else None
         if hit_something_above:
             print("dist to hit above: %d" % distance)
-            if distance < 270:
-                stance = unreal.SoldierStance.CROUCH
-            elif distance < 180:
-                stance = unreal.SoldierStance.PRONE
+
+        # Same stance the cover solver picks (see cover_placement.get_stance)
+        stance = getattr(unreal.SoldierStance, get_stance(ground_distance, ceiling_distance))
+        print("[*] Stance: %s (ground: %s, ceiling: %s)" % (stance, ground_distance, ceiling_distance))
 
         # new_actor is an AICoverActor, which has
         # a "Cover" component. The "Cover" component
@@ -1995,7 +2076,7 @@ def delete_all_with_selected_mesh():
                 mesh = smc.static_mesh
                 if mesh in meshes_of_actors_to_remove:
                     actor.modify()
-                    unreal.EditorLevelLibrary.destroy_actor(actor)
+                    WORLD_SNAPSHOT.destroy_actor(actor)
 
 
 def remove_collision_from_all_with_mesh_prefix(mesh_name_prefix):
@@ -2321,7 +2402,7 @@ def fix_all_lighting():
     if not unreal.EditorLevelLibrary.get_actor_reference("PersistentLevel._lights_set_"):
 
         # Fix lights! They should all be multiplied by 10 once
-        for light_actor in get_all_actors(actor_class=unreal.Light):
+        for light_actor in WORLD_SNAPSHOT.get_actors(unreal.Light):
             for light_class in [unreal.PointLightComponent, unreal.SpotLightComponent]:
                 try:
                     light_component = light_actor.get_component_by_class(light_class)
@@ -2337,7 +2418,7 @@ def fix_all_lighting():
                     pass
         # Create the actor that will notify us *not* to run this if
         # we run this script again.
-        note = unreal.EditorLevelLibrary.spawn_actor_from_class(unreal.Note, unreal.Vector(0, 0, 0))
+        note = SPAWN_SERVICE.spawn(SpawnSpec(unreal.Note, unreal.Vector(0, 0, 0)))
         note.set_editor_property("text", "all point and spot lights set to their value * %d" % light_multiplier)
         note.set_actor_label("_lights_set_")
 
@@ -2346,6 +2427,7 @@ def fix_all_lighting():
 
 def fix_everything(world, map_info, map_data, skybox_bounds=6000):
     """ Create a separate sublevels for notes, tools, etc... """
+    global TRACE_IGNORE_ACTORS
 
     # Get the name of the current level's root name, which
     # should be the name of the mod (DOISourceMapPack)
@@ -2356,13 +2438,14 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
     fix_materials(content_root)
 
     # Find and store all actor references in memory ...
-    actors = get_all_actors()
+    # (every stage below reads from this run's WORLD_SNAPSHOT)
+    actors = WORLD_SNAPSHOT.get_actors()
 
     # Delete all useless skybox actors
     for actor in actors:
         if actor_contains_material_starting_with(actor, "toolsskybox"):
             print("[!] DELETE SKYBOX BOX: %s" % actor.get_name())
-            unreal.EditorLevelLibrary.destroy_actor(actor)
+            WORLD_SNAPSHOT.destroy_actor(actor)
 
     # Get valid gamemodes to create sublevels and scenarios for
     # TODO: Parse gamemodes from translated keys in map_json
@@ -2398,18 +2481,29 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
         False)
 
     # Find, reposition, and rescale our 3D skybox
-    skybox_actors = fix_skybox(actors, skybox_bounds=skybox_bounds)
+    persistent_level_name = WORLD_SNAPSHOT.get_persistent_level_name()
+    skybox_actors = fix_skybox(WORLD_SNAPSHOT.get_actors(level_name=persistent_level_name), skybox_bounds=skybox_bounds)
     if skybox_actors:
         unreal.EditorLevelUtils.move_actors_to_level(
             skybox_actors.values(), sublevels["Skybox"]["level"],
             warn_about_references=False,
             warn_about_renaming=False)
+        # (moving actors to another level replaces them with copies)
+        WORLD_SNAPSHOT.invalidate()
+
+    # Collect every actor our traces (spawn layouts, cover placement) should
+    # ignore while we classify actors below, so we never check materials per hit.
+    # The skybox actors are the copies in the Skybox sublevel now (including
+    # any we moved there on a previous run)
+    trace_ignore_actors = list(WORLD_SNAPSHOT.get_actors(level_name=sublevels["Skybox"]["name"]))
 
     # Remove this sublevel as we've already moved its actors
     sublevels.pop("Skybox")
 
     # Parse all found actors and throw them in their proper sublevels
     # -- also parse and replace actors with their Sandstorm equivalents
+    # (the skybox actors are in their sublevel now, and the toolsskybox boxes are gone)
+    actors = WORLD_SNAPSHOT.get_actors()
     total_frames = len(actors)
     text_label = "Adding actors to their proper sublevels..."
     with unreal.ScopedSlowTask(total_frames, text_label) as slow_task:
@@ -2444,11 +2538,10 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
             # If this actor isn't in PersistentLevel, skip it
             # as it's already in a sublevel (and normally wouldn't be
             # unless we put it there on purpose)
-            actor_level = actor.get_outer()
-            actor_level_name = actor_level.get_name()
-            if actor_level_name != "PersistentLevel":
+            actor_level_name = WORLD_SNAPSHOT.get_level_name(actor)
+            if actor_level_name != persistent_level_name:
                 print("[!] Actor '%s' in '%s' -- not PersistentLevel -- skipping..." %
-                      actor.get_actor_label(), actor_level_name)
+                      (actor_label, actor_level_name))
                 continue
 
             # Check if this actor is an "unknown" entity
@@ -2470,6 +2563,9 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
             elif (actor_contains_material_starting_with(actor, "tools")
                 or actor_contains_material_starting_with(actor, "fogvolume")):
 
+                # Traces should go straight through tool brushes
+                trace_ignore_actors.append(actor)
+
                 if actor_contains_material_starting_with(actor, "toolsblack"):
                     continue
 
@@ -2505,7 +2601,7 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
 
                 # Delete this actor! wall_trim_b is a disgustingly broken
                 # model after importing with HammUEr :(
-                unreal.EditorLevelLibrary.destroy_actor(actor)
+                WORLD_SNAPSHOT.destroy_actor(actor)
 
             elif actor_label.startswith("entity_light") \
                 or isinstance(actor, unreal.DirectionalLight) \
@@ -2521,6 +2617,10 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
                 # Move light to GlobalDay sublevel
                 sublevels["GlobalDay"]["actors"].append(actor)
 
+        # Use the tool actors we classified above as our trace ignore-set
+        TRACE_IGNORE_ACTORS = trace_ignore_actors
+        print("[*] Traces will ignore %d tool and skybox actors" % len(TRACE_IGNORE_ACTORS))
+
         # Parse all notes and create their UE4/Sandstorm equivalents
         parse_note_actors(sublevels["Notes"]["actors"], sublevels)
 
@@ -2578,9 +2678,8 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
             if label in PLACED_ACTORS:
                 print("[*] The volume '%s' already exists; skipping creation ..." % label)
                 continue
-            vol = unreal.EditorLevelLibrary.spawn_actor_from_class(vol_class,
-                                                                location=unreal.Vector(0, 0, 0),
-                                                                rotation=unreal.Rotator(0, 0, 0))
+            vol = SPAWN_SERVICE.spawn(SpawnSpec(vol_class, location=unreal.Vector(0, 0, 0),
+                                                rotation=unreal.Rotator(0, 0, 0)))
             vol.set_actor_scale3d(unreal.Vector(300, 300, 20))
             vol.set_actor_label(label)
             if vol_class == unreal.LightmassImportanceVolume:
@@ -2605,6 +2704,9 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
             except Exception:
                 traceback.print_exc()
 
+        # (moving actors to another level replaces them with copies)
+        WORLD_SNAPSHOT.invalidate()
+
     # Save all levels we modified!
     # unreal.EditorLevelLibrary.save_all_dirty_levels()
 
@@ -2631,7 +2733,6 @@ def fix_everything(world, map_info, map_data, skybox_bounds=6000):
     print("[!] SET DEFAULT LIGHTING AND SCENARIOS IN WORLD SETTINGS")
     print("[!] SET PROPER NAVMESH AND LIGHTMASSIMPORTANCE VOLUME SCALE/POSITION")
     print("[!] RESIZE SPAWNZONE TRIGGERS")
-    print("[!] REPOSITION SPAWNPOINTS")
     for i in range(0, 4):
         print("|")
 
@@ -0,0 +1,165 @@
+# Unreal Python module
+# Ground-snapped spawn point layouts for SpawnZones.
+#
+# Proposes a grid of candidate points inside each SpawnZone, then
+# validates *all* candidates (for every zone) in one pass of downward
+# line traces followed by one pass of capsule-clearance checks.
+# Candidates that don't hit walkable ground or don't have room for a
+# player capsule are thrown away -- the rest are snapped to the ground.
+import math
+import time
+
+import unreal
+
+# Size of the capsule an INSPlayerStart spawns a player with
+PLAYER_CAPSULE_RADIUS = 42.0
+PLAYER_CAPSULE_HALF_HEIGHT = 96.0
+
+# How high above the ground we place the capsule's bottom
+GROUND_CLEARANCE = 5.0
+
+# Anything steeper than this (impact normal Z) isn't ground we can stand on
+MIN_GROUND_NORMAL_Z = 0.7
+
+
+class SpawnLayoutGenerator:
+
+    def __init__(self, world=None, spacing=100.0, candidates_per_spawn=4,
+                 trace_height=200.0, trace_depth=1000.0, actors_to_ignore=None,
+                 is_ignored_hit=None, draw_debug_type=unreal.DrawDebugTrace.NONE):
+        """
+        # world: obj unreal.World : The world to trace in. If None, will use the currently open world.
+        # spacing: float : Distance between candidate points
+        # candidates_per_spawn: int : How many candidates we propose (and trace) for every spawn we need
+        # trace_height: float : How far above the top of the zone we start tracing down
+        # trace_depth: float : How far below the bottom of the zone we stop tracing down
+        # actors_to_ignore: obj List unreal.Actor : Actors all traces should ignore
+        # is_ignored_hit: func(unreal.Actor) -> bool : Return True for hit actors we should trace through
+        """
+        self.world = world if world else unreal.EditorLevelLibrary.get_editor_world()
+        self.spacing = spacing
+        self.candidates_per_spawn = candidates_per_spawn
+        self.trace_height = trace_height
+        self.trace_depth = trace_depth
+        self.actors_to_ignore = list(actors_to_ignore) if actors_to_ignore else []
+        self.is_ignored_hit = is_ignored_hit
+        self.draw_debug_type = draw_debug_type
+        self.total_traces = 0
+
+    def propose(self, spawn_zone, count):
+        """ Return candidate [X, Y] points inside the spawn zone,
+            closest to the zone's center first """
+        origin, extent = spawn_zone.get_actor_bounds(False)
+
+        # Keep the capsules inside the zone
+        half_x = max(extent.x - PLAYER_CAPSULE_RADIUS, 0)
+        half_y = max(extent.y - PLAYER_CAPSULE_RADIUS, 0)
+        steps_x = int(half_x // self.spacing)
+        steps_y = int(half_y // self.spacing)
+
+        candidates = list()
+        for ix in range(-steps_x, steps_x + 1):
+            for iy in range(-steps_y, steps_y + 1):
+                candidates.append((origin.x + ix * self.spacing, origin.y + iy * self.spacing))
+        candidates.sort(key=lambda c: (c[0] - origin.x) ** 2 + (c[1] - origin.y) ** 2)
+        return candidates[:max(count * self.candidates_per_spawn, count)]
+
+    def find_ground(self, x, y, top_z, bottom_z):
+        """ Trace straight down and return (impact point, impact normal) of the first
+            ground we hit, or None """
+        self.total_traces += 1
+        hit_results = unreal.SystemLibrary.line_trace_multi(
+            self.world,
+            start=unreal.Vector(x, y, top_z), end=unreal.Vector(x, y, bottom_z),
+            trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
+            trace_complex=True, actors_to_ignore=self.actors_to_ignore,
+            draw_debug_type=self.draw_debug_type, ignore_self=True)
+        if not hit_results:
+            return None
+        for hit_result in hit_results:
+            hit_result_info = hit_result.to_tuple()
+            if self.is_ignored_hit and self.is_ignored_hit(hit_result_info[9]):
+                continue
+            # 5. impact_point, 7. impact_normal
+            return hit_result_info[5], hit_result_info[7]
+        return None
+
+    def has_clearance(self, capsule_center):
+        """ Return True if a player capsule at this location doesn't overlap anything """
+        self.total_traces += 1
+        capsule_end = capsule_center.copy()
+        capsule_end.z += 1
+        hit_results = unreal.SystemLibrary.capsule_trace_multi(
+            self.world,
+            start=capsule_center, end=capsule_end,
+            radius=PLAYER_CAPSULE_RADIUS, half_height=PLAYER_CAPSULE_HALF_HEIGHT,
+            trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
+            trace_complex=False, actors_to_ignore=self.actors_to_ignore,
+            draw_debug_type=self.draw_debug_type, ignore_self=True)
+        if not hit_results:
+            return True
+        for hit_result in hit_results:
+            hit_result_info = hit_result.to_tuple()
+            if self.is_ignored_hit and self.is_ignored_hit(hit_result_info[9]):
+                continue
+            return False
+        return True
+
+    def generate(self, spawn_zone_counts):
+        """ Find ground-snapped spawn locations for each (spawn_zone, count) pair
+            return: obj List of (obj List unreal.Vector) : Capsule centers for each zone (in the order given)
+        """
+        start_time = time.time()
+        self.total_traces = 0
+
+        # 1. Propose candidates for every zone
+        zone_candidates = list()
+        for spawn_zone, count in spawn_zone_counts:
+            origin, extent = spawn_zone.get_actor_bounds(False)
+            top_z = origin.z + extent.z + self.trace_height
+            bottom_z = origin.z - extent.z - self.trace_depth
+            zone_candidates.append((spawn_zone, count, top_z, bottom_z, self.propose(spawn_zone, count)))
+
+        # 2. One batch of downward traces for all candidates
+        grounded = list()
+        for spawn_zone, count, top_z, bottom_z, candidates in zone_candidates:
+            zone_grounded = list()
+            for x, y in candidates:
+                ground = self.find_ground(x, y, top_z, bottom_z)
+                if not ground:
+                    continue
+                impact_point, impact_normal = ground
+                # Skip walls, cliffs and steep roofs
+                if impact_normal.z < MIN_GROUND_NORMAL_Z:
+                    continue
+                capsule_center = unreal.Vector(
+                    x, y, impact_point.z + PLAYER_CAPSULE_HALF_HEIGHT + GROUND_CLEARANCE)
+                zone_grounded.append(capsule_center)
+            grounded.append((spawn_zone, count, zone_grounded))
+
+        # 3. One batch of capsule-clearance checks, keeping only
+        #    as many spawns as each zone needs
+        layouts = list()
+        for spawn_zone, count, zone_grounded in grounded:
+            layout = list()
+            for capsule_center in zone_grounded:
+                if len(layout) >= count:
+                    break
+                # Keep player capsules from overlapping each other
+                too_close = False
+                for other in layout:
+                    if math.hypot(other.x - capsule_center.x, other.y - capsule_center.y) < PLAYER_CAPSULE_RADIUS * 2:
+                        too_close = True
+                        break
+                if too_close or not self.has_clearance(capsule_center):
+                    continue
+                layout.append(capsule_center)
+            if len(layout) < count:
+                print("[!] Only found room for %d/%d spawns in spawn zone: %s" % (
+                    len(layout), count, spawn_zone.get_name()))
+            layouts.append(layout)
+
+        elapsed = time.time() - start_time
+        print("[*] Generated spawn layouts for %d spawn zones (%d traces in %.3fs)" % (
+            len(layouts), self.total_traces, elapsed))
+        return layouts
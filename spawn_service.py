@@ -0,0 +1,150 @@
+# Unreal Python module
+# Batched actor spawning with a per-path Blueprint class cache.
+#
+# Loading a Blueprint class through EditorAssetLibrary is one of the
+# slower bridge calls we make, and setup_sandstorm_map.py used to do it
+# for *every* AICoverActor, supply crate and replacement target.
+# SpawnService loads each class path once, then spawns a whole list of
+# SpawnSpecs in a single editor transaction.
+import time
+from collections import namedtuple
+
+import unreal
+
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    STRING_TYPES = (str,)
+
+
+# A single actor to spawn.
+# actor_class: str (Blueprint asset path) or unreal.Class
+# location: unreal.Vector or [X, Y, Z]
+# rotation: unreal.Rotator or [Pitch, Yaw, Roll]
+# scale: unreal.Vector (optional)
+# label: str : Actor label shown in the World Outliner (optional)
+# properties: dict : Editor properties set after spawning (optional)
+# local_rotation: unreal.Rotator : Extra local rotation added after spawning (optional)
+# hidden: bool : Hide this actor in-game (optional)
+SpawnSpec = namedtuple("SpawnSpec", [
+    "actor_class", "location", "rotation", "scale", "label", "properties", "local_rotation", "hidden"])
+SpawnSpec.__new__.__defaults__ = (None, None, None, None, None, None, False)
+
+
+class BlueprintClassCache:
+    """ Load each Blueprint class path only once """
+
+    def __init__(self):
+        self.classes = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, actor_class):
+        """ Return the unreal.Class for a Blueprint asset path (or the class we were given) """
+        if not isinstance(actor_class, STRING_TYPES):
+            return actor_class
+        if actor_class in self.classes:
+            self.hits += 1
+            return self.classes[actor_class]
+        self.misses += 1
+        loaded_class = unreal.EditorAssetLibrary.load_blueprint_class(actor_class)
+        if not loaded_class:
+            print("[!] Failed to load Blueprint class: %s" % actor_class)
+        self.classes[actor_class] = loaded_class
+        return loaded_class
+
+    def clear(self):
+        self.classes.clear()
+
+
+class SpawnService:
+    """ Spawn lists of SpawnSpecs in one transaction, reusing loaded classes """
+
+    def __init__(self, class_cache=None, on_spawned=None):
+        self.class_cache = class_cache if class_cache else BlueprintClassCache()
+        # Optional callback(actors) run after every spawn (or batch of spawns),
+        # IE: to keep a cached snapshot of the world up to date
+        self.on_spawned = on_spawned
+        self.total_spawned = 0
+
+    def spawn(self, spec):
+        """ Spawn a single SpawnSpec (no transaction) and return the new actor """
+        actor = self.spawn_actor(spec)
+        if actor:
+            self.total_spawned += 1
+            if self.on_spawned:
+                self.on_spawned([actor])
+        return actor
+
+    def spawn_actor(self, spec):
+        """ Spawn a SpawnSpec without running on_spawned (see spawn) """
+        actor_class = self.class_cache.get(spec.actor_class)
+        if not actor_class:
+            return None
+
+        location = spec.location
+        if location is not None and not isinstance(location, unreal.Vector):
+            location = unreal.Vector(*location)
+        rotation = spec.rotation
+        if rotation is not None and not isinstance(rotation, unreal.Rotator):
+            rotation = unreal.Rotator(*rotation)
+
+        # Spawn the class!
+        if rotation is not None:
+            actor = unreal.EditorLevelLibrary.spawn_actor_from_class(
+                actor_class, location=location, rotation=rotation)
+        else:
+            actor = unreal.EditorLevelLibrary.spawn_actor_from_class(actor_class, location=location)
+        if not actor:
+            print("[!] Failed to spawn actor: %s" % spec.label)
+            return None
+
+        if spec.local_rotation:
+            actor.add_actor_local_rotation(spec.local_rotation, sweep=False, teleport=True)
+        if spec.scale:
+            actor.set_actor_scale3d(spec.scale)
+        if spec.label:
+            actor.set_actor_label(spec.label)
+        if spec.hidden:
+            actor.set_actor_hidden_in_game(True)
+
+        # Set all properties with a single bridge call
+        if spec.properties:
+            actor.set_editor_properties(spec.properties)
+
+        return actor
+
+    def spawn_batch(self, specs, description="Spawn Actors"):
+        """ Spawn all specs inside one ScopedEditorTransaction.
+            return: (list of spawned actors (None where spawning failed), dict of timings in seconds)
+        """
+        timings = {"load_classes": 0.0, "spawn": 0.0, "total": 0.0}
+        actors = list()
+        if not specs:
+            return actors, timings
+
+        start_time = time.time()
+
+        # Load every distinct class up front so the spawn loop
+        # doesn't pay for it
+        for spec in specs:
+            self.class_cache.get(spec.actor_class)
+        timings["load_classes"] = time.time() - start_time
+
+        spawn_start_time = time.time()
+        with unreal.ScopedEditorTransaction(description):
+            for spec in specs:
+                actors.append(self.spawn_actor(spec))
+        timings["spawn"] = time.time() - spawn_start_time
+        timings["total"] = time.time() - start_time
+
+        spawned_actors = [actor for actor in actors if actor]
+        self.total_spawned += len(spawned_actors)
+        if self.on_spawned:
+            self.on_spawned(spawned_actors)
+
+        print("[*] %s: spawned %d/%d actors in %.3fs (classes: %.3fs, spawn: %.3fs, class cache hits: %d, misses: %d)" % (
+            description, len(spawned_actors), len(specs), timings["total"], timings["load_classes"],
+            timings["spawn"], self.class_cache.hits, self.class_cache.misses))
+
+        return actors, timings
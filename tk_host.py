@@ -0,0 +1,135 @@
+# Unreal Python module
+# One (hidden) Tk root and one Slate tick callback shared by every Tk tool.
+#
+# Each Tk() root is its own Tcl interpreter, and each tool pumping its own
+# root from its own tick callback multiplies the per-frame cost (and roots
+# fight over focus and the default root). Tools instead ask the host for a
+# Toplevel window: a single TkScheduler pumps all of them at once, and the
+# host shares a per-frame time budget between the tools with work to do.
+#
+#   window = tk_host.get_host().add_window("My Tool", on_tick=my_tick, on_close=my_close)
+#
+# The host lives in this module, so it survives scripts being re-run from
+# the editor's Python console.
+import time
+import traceback
+
+try:
+    import Tkinter as tkinter
+except ImportError:
+    import tkinter
+
+from tk_scheduler import TkScheduler
+
+# The shared host (see get_host)
+host = None
+
+
+class HostedWindow:
+
+    def __init__(self, window, on_tick=None, on_close=None):
+        """
+        # window: obj tkinter.Toplevel : The tool's window
+        # on_tick: function : Takes (delta_seconds, budget_seconds), returns True while the tool is busy
+        # on_close: function : Called after the window is removed from the host
+        """
+        self.window = window
+        self.on_tick = on_tick
+        self.on_close = on_close
+        self.busy = False
+        # Time (seconds) spent in on_tick
+        self.tick_time = 0.0
+
+
+class TkHost:
+
+    def __init__(self, fps=60, frame_budget=0.008):
+        """
+        # fps: int : How often to pump Tk (at most) while a tool is in use
+        # frame_budget: float : Seconds per editor frame shared by the busy tools' on_tick
+        """
+        self.root = tkinter.Tk()
+        self.root.withdraw()
+        self.frame_budget = frame_budget
+        self.windows = list()
+        # Which tool ticks first, rotated every frame so none of them starves
+        self.next_index = 0
+        self.scheduler = TkScheduler(self.root, fps=fps)
+        self.scheduler.add_tick_callback(self.tick)
+
+    def is_alive(self):
+        try:
+            return bool(self.root.winfo_exists())
+        except tkinter.TclError:
+            return False
+
+    def add_window(self, title=None, on_tick=None, on_close=None):
+        """ Create a Toplevel window for a tool (and start pumping, if we weren't)
+            return: obj tkinter.Toplevel : The tool's window
+        """
+        window = tkinter.Toplevel(self.root)
+        if title:
+            window.title(title)
+        self.windows.append(HostedWindow(window, on_tick, on_close))
+        window.protocol("WM_DELETE_WINDOW", lambda: self.remove_window(window))
+        self.scheduler.start()
+        return window
+
+    def remove_window(self, window):
+        """ Destroy a tool's window. Once there are no windows left, we stop ticking """
+        for hosted in list(self.windows):
+            if hosted.window is window:
+                self.windows.remove(hosted)
+                try:
+                    window.destroy()
+                except tkinter.TclError:
+                    pass
+                if hosted.on_close:
+                    hosted.on_close()
+        if not self.windows:
+            self.scheduler.stop()
+
+    def request_redraw(self):
+        self.scheduler.request_redraw()
+
+    def tick(self, delta_seconds):
+        """ Tick every tool, splitting the frame budget between those that were busy last frame """
+        count = len(self.windows)
+        if not count:
+            return False
+        busy_count = max(1, sum(1 for hosted in self.windows if hosted.busy))
+        budget = self.frame_budget / busy_count
+        deadline = time.time() + self.frame_budget
+
+        busy = False
+        start_index = self.next_index % count
+        self.next_index = start_index + 1
+        for hosted in self.windows[start_index:] + self.windows[:start_index]:
+            if not hosted.on_tick:
+                continue
+            # Tools which were idle may still pick up work, but not past the frame's budget
+            remaining = deadline - time.time()
+            start_time = time.time()
+            try:
+                hosted.busy = bool(hosted.on_tick(delta_seconds, max(0.0, min(budget, remaining))))
+            except Exception:
+                print(traceback.format_exc())
+                print("[!] Tick of {} failed, no longer ticking it".format(hosted.window.title()))
+                hosted.on_tick = None
+                hosted.busy = False
+            hosted.tick_time += time.time() - start_time
+            busy = busy or hosted.busy
+        return busy
+
+    def print_stats(self):
+        for hosted in self.windows:
+            print("[*] {} spent {:.3f}s ticking".format(hosted.window.title(), hosted.tick_time))
+        self.scheduler.print_stats()
+
+
+def get_host():
+    """ Return the shared TkHost, creating it (again, if its root was destroyed) when needed """
+    global host
+    if host is None or not host.is_alive():
+        host = TkHost()
+    return host
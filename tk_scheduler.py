@@ -0,0 +1,143 @@
+# Unreal Python module
+# Pump a Tkinter root from the editor's Slate post-tick callback.
+#
+# Tk's mainloop() would block the editor, so Tk tools process their events
+# from a Slate tick instead. Rather than calling update() every frame, the
+# scheduler only processes events that are actually pending (one
+# dooneevent() at a time, within a time budget), and backs off to polling a
+# few times a second once the tool has gone idle. Tick callbacks doing work
+# for the tool (IE: a dependency scan) keep it awake, as do redraw requests.
+import atexit
+import time
+import traceback
+
+try:
+    import Tkinter as tkinter
+except ImportError:
+    import tkinter
+from _tkinter import ALL_EVENTS, DONT_WAIT
+
+import unreal
+
+
+class TkScheduler:
+
+    def __init__(self, root, fps=60, max_idle_interval=0.25, max_pump_seconds=0.004):
+        """
+        # root: obj tkinter.Tk : Root to pump
+        # fps: int : How often to pump (at most) while the tool is in use
+        # max_idle_interval: float : How long we may wait between pumps (seconds) once the tool is idle
+        # max_pump_seconds: float : How long we may spend processing Tk events each pump
+        """
+        self.root = root
+        self.active_interval = 1.0 / fps
+        self.max_idle_interval = max_idle_interval
+        self.max_pump_seconds = max_pump_seconds
+        self.interval = self.active_interval
+        self.tick_time = 0.0
+        self.tick_handle = None
+        self.tick_callbacks = list()
+        self.redraw_requested = False
+
+        # Pumps, Tk events processed and time spent (seconds) pumping
+        self.pump_count = 0
+        self.event_count = 0
+        self.pump_time = 0.0
+        self.max_pump_time = 0.0
+
+        # Closing the window (or the editor) stops the scheduler
+        root.protocol("WM_DELETE_WINDOW", self.close)
+        atexit.register(self.stop)
+
+    @property
+    def running(self):
+        return self.tick_handle is not None
+
+    def start(self):
+        if not self.running:
+            self.tick_handle = unreal.register_slate_post_tick_callback(self.tick)
+
+    def stop(self):
+        """ Tell the editor we're no longer handling ticks """
+        if self.running:
+            unreal.unregister_slate_post_tick_callback(self.tick_handle)
+            self.tick_handle = None
+
+    def close(self):
+        """ Stop pumping and destroy the root window """
+        self.stop()
+        try:
+            self.root.destroy()
+        except tkinter.TclError:
+            pass
+
+    def add_tick_callback(self, callback):
+        """ Call a function every editor frame (before pumping Tk)
+            # callback: function : Takes delta_seconds, returns True while it's busy
+                                   (which keeps the scheduler pumping at full rate)
+        """
+        self.tick_callbacks.append(callback)
+
+    def remove_tick_callback(self, callback):
+        if callback in self.tick_callbacks:
+            self.tick_callbacks.remove(callback)
+
+    def request_redraw(self):
+        """ Pump on the next frame, IE: after changing widgets from a tick callback """
+        self.redraw_requested = True
+
+    def tick(self, delta_seconds):
+        busy = False
+        for callback in list(self.tick_callbacks):
+            try:
+                busy = callback(delta_seconds) or busy
+            except Exception:
+                print(traceback.format_exc())
+                print("[!] Tick callback failed, removing it")
+                self.remove_tick_callback(callback)
+        if busy:
+            self.interval = self.active_interval
+
+        self.tick_time += delta_seconds
+        if self.tick_time < self.interval and not self.redraw_requested:
+            return
+        self.tick_time = 0.0
+        self.redraw_requested = False
+
+        try:
+            events = self.pump()
+        except tkinter.TclError:
+            # The root's gone
+            self.stop()
+            return
+
+        # Stay responsive while there's something going on, otherwise back off
+        if events or busy:
+            self.interval = self.active_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_idle_interval)
+
+    def pump(self):
+        """ Process pending Tk events (and idle tasks, IE: redraws) within our budget
+            return: int : Number of events processed
+        """
+        start_time = time.time()
+        deadline = start_time + self.max_pump_seconds
+        do_one_event = self.root.tk.dooneevent
+        events = 0
+        while do_one_event(ALL_EVENTS | DONT_WAIT):
+            events += 1
+            if time.time() > deadline:
+                break
+
+        pump_time = time.time() - start_time
+        self.pump_count += 1
+        self.event_count += events
+        self.pump_time += pump_time
+        self.max_pump_time = max(self.max_pump_time, pump_time)
+        return events
+
+    def print_stats(self):
+        print("[*] Pumped Tk {} times ({} events) in {:.3f}s (average {:.3f}ms, max {:.3f}ms)".format(
+            self.pump_count, self.event_count, self.pump_time,
+            1000.0 * self.pump_time / self.pump_count if self.pump_count else 0, 1000.0 * self.max_pump_time))
@@ -0,0 +1,104 @@
+# Unreal Python module
+# Batched line traces.
+#
+# Instead of tracing (and reacting to) one ray at a time, callers queue
+# up every ray they need with TraceScheduler.add, then run them all at
+# once. Rays are executed in batches (one progress frame per batch) with
+# debug drawing turned off by default, and each ray's hits are handed
+# back as plain TraceHit tuples so callers don't have to go back
+# through the Unreal bridge to read them.
+import time
+from collections import namedtuple
+
+import unreal
+
+# A single (filtered) hit of a traced ray
+# distance: float : Distance from the start of the ray to the hit
+# location: unreal.Vector : Location of the hit
+# impact_point: unreal.Vector : Point where the ray hit the surface
+# impact_normal: unreal.Vector : Normal of the surface we hit
+# actor: unreal.Actor : Actor we hit
+TraceHit = namedtuple("TraceHit", ["distance", "location", "impact_point", "impact_normal", "actor"])
+
+
+def to_vector(value):
+    return value if isinstance(value, unreal.Vector) else unreal.Vector(*value)
+
+
+class TraceScheduler:
+
+    def __init__(self, world=None, batch_size=1000, trace_channel=unreal.TraceTypeQuery.TRACE_TYPE_QUERY1,
+                 trace_complex=True, actors_to_ignore=None, is_ignored_hit=None,
+                 draw_debug_type=unreal.DrawDebugTrace.NONE):
+        """
+        # world: obj unreal.World : The world to trace in. If None, will use the currently open world.
+        # batch_size: int : How many rays to trace per progress frame
+        # actors_to_ignore: obj List unreal.Actor : Actors every ray should ignore
+        # is_ignored_hit: func(unreal.Actor) -> bool : Return True for hit actors we should drop from the results
+        # draw_debug_type: unreal.DrawDebugTrace : Use FOR_DURATION when debugging a handful of rays only!
+        """
+        self.world = world if world else unreal.EditorLevelLibrary.get_editor_world()
+        self.batch_size = max(1, batch_size)
+        self.trace_channel = trace_channel
+        self.trace_complex = trace_complex
+        self.actors_to_ignore = list(actors_to_ignore) if actors_to_ignore else []
+        self.is_ignored_hit = is_ignored_hit
+        self.draw_debug_type = draw_debug_type
+        self.rays = list()
+
+        # Stats for the last run()
+        self.total_traces = 0
+        self.elapsed = 0.0
+
+    def add(self, start, end):
+        """ Queue a ray (unreal.Vector or [X, Y, Z]) and return its index """
+        self.rays.append((start, end))
+        return len(self.rays) - 1
+
+    def trace(self, start, end):
+        """ Trace a single ray right away and return its filtered hits """
+        hit_results = unreal.SystemLibrary.line_trace_multi(
+            self.world,
+            start=to_vector(start), end=to_vector(end),
+            trace_channel=self.trace_channel,
+            trace_complex=self.trace_complex, actors_to_ignore=self.actors_to_ignore,
+            draw_debug_type=self.draw_debug_type, ignore_self=True)
+        hits = list()
+        if hit_results:
+            for hit_result in hit_results:
+                # 3. distance, 4. location, 5. impact_point, 7. impact_normal, 9. hit_actor
+                hit_result_info = hit_result.to_tuple()
+                if self.is_ignored_hit and self.is_ignored_hit(hit_result_info[9]):
+                    continue
+                hits.append(TraceHit(hit_result_info[3], hit_result_info[4], hit_result_info[5],
+                                     hit_result_info[7], hit_result_info[9]))
+        return hits
+
+    def run(self, description="Tracing rays ..."):
+        """ Trace every queued ray (in batches) and clear the queue
+            return: obj List (obj List TraceHit) : The hits of each ray, in the order the rays were added
+        """
+        rays = self.rays
+        self.rays = list()
+        results = list()
+        start_time = time.time()
+
+        total_batches = (len(rays) + self.batch_size - 1) // self.batch_size
+        with unreal.ScopedSlowTask(total_batches, description) as slow_task:
+            slow_task.make_dialog(True)
+            for batch_start in range(0, len(rays), self.batch_size):
+                if slow_task.should_cancel():
+                    break
+                for start, end in rays[batch_start:batch_start + self.batch_size]:
+                    results.append(self.trace(start, end))
+                slow_task.enter_progress_frame(1, "%s (%d/%d)" % (description, len(results), len(rays)))
+
+        # Rays we didn't get to (the user cancelled) hit nothing
+        results += [[] for _ in range(len(rays) - len(results))]
+
+        self.elapsed = time.time() - start_time
+        self.total_traces += len(rays)
+        print("[*] %s: %d traces in %.3fs (%.0f traces/s, %d traces total)" % (
+            description, len(rays), self.elapsed, len(rays) / self.elapsed if self.elapsed else 0,
+            self.total_traces))
+        return results
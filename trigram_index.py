@@ -0,0 +1,157 @@
+# Python module (no Unreal dependency)
+# Trigram index for instant substring/glob searches over asset paths.
+#
+# Every (lowercase) path is broken into its 3-character substrings, and we
+# keep a posting list of path IDs for each of them. A query only has to
+# intersect the posting lists of its own trigrams to find a handful of
+# candidates, which are then verified against the real query.
+#
+# Query syntax (case-insensitive):
+#   "rock"              paths containing "rock"
+#   "rock textures"     paths containing "rock" *and* "textures"
+#   "textures/*_n"      globs (*, ?, [...]) match anywhere in the path
+import array
+import re
+import time
+
+# Characters which make a query term a glob
+GLOB_CHARACTERS = "*?["
+
+
+def get_trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def is_glob(term):
+    return any(c in term for c in GLOB_CHARACTERS)
+
+
+def glob_to_regex(term):
+    """ Compile a glob term into a regex which can match anywhere in a path """
+    pattern = ""
+    i = 0
+    while i < len(term):
+        c = term[i]
+        if c == "*":
+            pattern += ".*"
+        elif c == "?":
+            pattern += "."
+        elif c == "[":
+            end = term.find("]", i + 1)
+            if end == -1:
+                pattern += re.escape(c)
+            else:
+                characters = term[i + 1:end].replace("\\", "\\\\")
+                if characters.startswith("!"):
+                    characters = "^" + characters[1:]
+                pattern += "[" + characters + "]"
+                i = end
+        else:
+            pattern += re.escape(c)
+        i += 1
+    return re.compile(pattern)
+
+
+def get_literals(term):
+    """ Return the literal (non-glob) runs of a glob term """
+    return [literal for literal in re.split(r"[*?]|\[[^\]]*\]", term) if literal]
+
+
+class TrigramIndex:
+
+    def __init__(self, paths):
+        """
+        # paths: obj List str : Paths to index (searches return them in this order, unless ranked)
+        """
+        start_time = time.time()
+        self.paths = list(paths)
+        self.lower_paths = [path.lower() for path in self.paths]
+        # Number of folders each path is in
+        self.depths = [path.strip("/").count("/") for path in self.paths]
+        self.ids = dict((path, path_id) for path_id, path in enumerate(self.paths))
+
+        # Trigram -> (ascending) IDs of the paths containing it
+        postings = dict()
+        for path_id, path in enumerate(self.lower_paths):
+            for trigram in get_trigrams(path):
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array.array("I")
+                posting.append(path_id)
+        self.postings = postings
+
+        self.build_time = time.time() - start_time
+        self.last_search_time = 0.0
+        print("[*] Indexed {} paths ({} trigrams) in {:.3f}s".format(
+            len(self.paths), len(self.postings), self.build_time))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_candidates(self, trigrams, candidates):
+        """ Intersect the posting lists of these trigrams (smallest first) with the candidates """
+        postings = list()
+        for trigram in trigrams:
+            posting = self.postings.get(trigram)
+            if posting is None:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        for posting in postings:
+            if candidates is None:
+                candidates = set(posting)
+            else:
+                candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, query, candidates=None, rank=None, sizes=None):
+        """ Return the paths matching every term of the query
+            # candidates: obj List str : Only search these paths, IE: the results of a shorter query
+            # rank: str : None (index order), "depth" (shallowest first), "size" (largest first)
+            #             or "candidates" (the order of the candidates)
+            # sizes: dict : Path -> size, used when ranking by size
+        """
+        start_time = time.time()
+        terms = query.lower().split()
+        candidate_ids = set(self.ids[path] for path in candidates if path in self.ids) \
+            if candidates is not None else None
+
+        # Narrow the candidates down with the trigrams of every term
+        # (glob terms contribute the trigrams of their literal runs)
+        matchers = list()
+        for term in terms:
+            if is_glob(term):
+                literals = get_literals(term)
+                matchers.append(glob_to_regex(term).search)
+            else:
+                literals = [term]
+                matchers.append(lambda path, term=term: term in path)
+            trigrams = set()
+            for literal in literals:
+                trigrams.update(get_trigrams(literal))
+            if trigrams:
+                candidate_ids = self.get_candidates(trigrams, candidate_ids)
+
+        if candidate_ids is None:
+            candidate_ids = range(len(self.paths))
+
+        # Verify the candidates against the actual terms
+        lower_paths = self.lower_paths
+        result_ids = [path_id for path_id in candidate_ids
+                      if all(matcher(lower_paths[path_id]) for matcher in matchers)]
+
+        if rank == "depth":
+            result_ids.sort(key=lambda path_id: (self.depths[path_id], path_id))
+        elif rank == "size" and sizes:
+            result_ids.sort(key=lambda path_id: (-sizes.get(self.paths[path_id], 0), path_id))
+        elif rank == "candidates" and candidates is not None:
+            result_ids = set(result_ids)
+            self.last_search_time = time.time() - start_time
+            return [path for path in candidates if self.ids.get(path) in result_ids]
+        else:
+            result_ids.sort()
+
+        self.last_search_time = time.time() - start_time
+        return [self.paths[path_id] for path_id in result_ids]
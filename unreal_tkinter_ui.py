@@ -1,38 +1,41 @@
 from Tkinter import *
+import os
+import sys
 import unreal
 
+# Make the helper modules next to this script importable
+# when it's run from the editor's Python console
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tk_host
+
 class UnrealApp:
 
     def __init__(self):
-        self.root = Tk()
+        # Don't create our own Tk() root; every tool gets a window of
+        # the shared host, which pumps all of them from one Unreal tick
+        self.host = tk_host.get_host()
+        self.root = self.host.add_window("UnrealApp", on_tick=self.tick)
 
         # Example text area
         textarea = Text(self.root)
         textarea.pack(expand=True, fill="both")
         textarea.insert(END, "Heya!")
 
-    def run(max_tick_time=0.16):
+    def tick(self, delta_seconds, budget_seconds):
+        # Do a little work each frame (within budget_seconds), and
+        # return True while there's more to do
+        return False
+
+    def run(self):
 
         # Don't use this; it'll block the UE4's Slate UI ticks
         # root.mainloop()
 
-        # Instead, do the below:
-        self.tick_handle = None
-        self.tick_time = 0
-
-        def tick(delta_seconds):
-            self.tick_time += delta_seconds
-            # TODO: Use FPS instead of a hardcoded number to delay ticks
-            if self.tick_time > max_tick_time:
-                try:
-                    self.root.update_idletasks()
-                    self.root.update()
-                except Exception:
-                    pass
-                self.tick_time = 0
-
-        # Setup our app to handle Unreal ticks to update the UI
-        self.tick_handle = unreal.register_slate_post_tick_callback(tick)
+        # Instead, the host pumps Tk from Unreal's ticks: up to 60 times
+        # a second while in use, backing off while every window is idle
+        # (closing the last window stops the ticks)
+        self.host.request_redraw()
 
 
 if __name__ == "__main__":
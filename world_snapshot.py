@@ -0,0 +1,123 @@
+# Unreal Python module
+# One enumeration of the world's actors, shared by every stage of a script run.
+#
+# setup_sandstorm_map.py used to call GameplayStatics.get_all_actors_of_class
+# (and copy its result) in each stage: once for every actor, again for the
+# StaticMeshActors when hiding mannequins, again for lights, notes, ...
+# A WorldSnapshot lists the world's actors once, then hands out per-class and
+# per-level views built from that list (each view is built once, on first use).
+#
+# The snapshot is patched as the script changes the world: add() spawned
+# actors (pass it as SpawnService's on_spawned callback), destroy_actor()
+# through it, and invalidate() it after moving actors to another level
+# (which replaces them with copies). Moving actors around inside a level
+# changes nothing we cache.
+import time
+
+import unreal
+
+
+class WorldSnapshot:
+    """ The actors of a world, listed once, with cached per-class and per-level views """
+
+    def __init__(self, world=None):
+        # If None, will use the currently open world (when the snapshot is first used)
+        self.world = world
+        self.actors = None
+        # unreal.Class -> [actors], level name -> [actors]
+        self.class_views = dict()
+        self.level_views = dict()
+        # Actor -> level name
+        self.level_names = dict()
+        # Destroyed actors not yet filtered out of our lists
+        self.destroyed = set()
+        self.enumerations = 0
+
+    def get_actors(self, actor_class=None, level_name=None):
+        """ Return the actors of a class (or a subclass) and/or (sub)level
+            # actor_class: class unreal.Actor : If None, will return actors of every class
+            # level_name: str : IE: "Bastogne_Skybox" (see get_level_name). If None, will return actors of every level
+            return: obj List unreal.Actor : Shared with the snapshot -- don't modify it
+        """
+        self.flush()
+        if self.actors is None:
+            self.enumerate()
+        if level_name is not None:
+            if level_name not in self.level_views:
+                self.level_views[level_name] = [
+                    actor for actor in self.actors if self.get_level_name(actor) == level_name]
+            actors = self.level_views[level_name]
+            return [actor for actor in actors if isinstance(actor, actor_class)] if actor_class else actors
+        if actor_class is None:
+            return self.actors
+        if actor_class not in self.class_views:
+            self.class_views[actor_class] = [actor for actor in self.actors if isinstance(actor, actor_class)]
+        return self.class_views[actor_class]
+
+    def get_persistent_level_name(self):
+        """ Return the level name (see get_level_name) of the world's persistent level """
+        world = self.world if self.world is not None else unreal.EditorLevelLibrary.get_editor_world()
+        return world.get_name()
+
+    def get_level_name(self, actor):
+        """ Return the name of an actor's (sub)level, IE: "Bastogne_Skybox", or None if we can't get it.
+            That's the name of the level's World: the Level objects themselves are all named "PersistentLevel"
+        """
+        if actor not in self.level_names:
+            try:
+                # Actor -> Level -> World
+                self.level_names[actor] = actor.get_outer().get_outer().get_name()
+            except Exception:
+                # (null ObjectInstance actors)
+                self.level_names[actor] = None
+        return self.level_names[actor]
+
+    def enumerate(self):
+        start_time = time.time()
+        world = self.world if self.world is not None else unreal.EditorLevelLibrary.get_editor_world()
+        self.actors = [actor for actor in unreal.GameplayStatics.get_all_actors_of_class(world, unreal.Actor) if actor]
+        self.enumerations += 1
+        print("[*] Listed %d actors in %.3fs" % (len(self.actors), time.time() - start_time))
+
+    def add(self, actors):
+        """ Add spawned actors to the snapshot (and to the views they belong in) """
+        if self.actors is None:
+            # (they'll be listed with everything else)
+            return
+        actors = [actor for actor in actors if actor]
+        # (new lists, as callers may be iterating over the ones we handed out)
+        self.actors = self.actors + actors
+        for actor_class, view in self.class_views.items():
+            self.class_views[actor_class] = view + [actor for actor in actors if isinstance(actor, actor_class)]
+        for level_name, view in self.level_views.items():
+            self.level_views[level_name] = view + [actor for actor in actors if self.get_level_name(actor) == level_name]
+
+    def remove(self, actors):
+        """ Remove actors from the snapshot (filtered out of every list on the next get_actors) """
+        if self.actors is not None:
+            self.destroyed.update(actor for actor in actors if actor)
+
+    def destroy_actor(self, actor):
+        """ Destroy an actor and remove it from the snapshot """
+        self.remove([actor])
+        return unreal.EditorLevelLibrary.destroy_actor(actor)
+
+    def flush(self):
+        if not self.destroyed:
+            return
+        destroyed = self.destroyed
+        self.destroyed = set()
+        self.actors = [actor for actor in self.actors if actor not in destroyed]
+        for views in (self.class_views, self.level_views):
+            for key, actors in views.items():
+                views[key] = [actor for actor in actors if actor not in destroyed]
+        for actor in destroyed:
+            self.level_names.pop(actor, None)
+
+    def invalidate(self):
+        """ Forget everything, IE: after moving actors to another level. The world is listed again on next use """
+        self.actors = None
+        self.class_views.clear()
+        self.level_views.clear()
+        self.level_names.clear()
+        self.destroyed.clear()